@@ -0,0 +1,140 @@
+"""
+Story Transformation - Batch Version
+
+Non-interactive: point it at a manifest of stories x target worlds and it
+runs them all. Each story's DNA is extracted once and reused for every world.
+
+Manifest (.jsonl, one object per line, or .csv with the same columns):
+    {"story_file": "data/ramayana_story.txt", "story_name": "Ramayana",
+     "world": "Cyberpunk Silicon Valley 2045 ...", "world_name": "Cyberpunk 2045"}
+
+Usage:
+    python batch.py manifest.jsonl --workers 8 --output-dir outputs/batch
+    python batch.py manifest.jsonl --output-dir outputs/batch --resume   # after a crash
+"""
+
+import argparse
+import os
+
+from dotenv import load_dotenv
+from rich.console import Console
+
+from src.batch_runner import BatchRunner, load_manifest
+from src.hedging import Hedger
+from src.llm_client import LLMClient
+from src.providers import router_from_env
+from src.response_cache import ResponseCache
+from src.retry_policy import retry_policy_from_env
+from src.stage_cache import StageCache
+from src.violation_log import JsonlSink
+
+load_dotenv()
+console = Console()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Batch story transformation")
+    parser.add_argument("manifest", help="Path to .jsonl or .csv manifest")
+    parser.add_argument("--workers", type=int, default=4, help="Max transformations in flight")
+    parser.add_argument("--output-dir", default="outputs/batch", help="Where per-job folders go")
+    parser.add_argument("--model", default=os.getenv("PRIMARY_MODEL", "llama-3.3-70b-versatile"))
+    parser.add_argument("--scene-mode", default=os.getenv("SCENE_MODE", "sequential"),
+                        choices=["sequential", "parallel"])
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream scenes and abort early on high-severity violations")
+    parser.add_argument("--no-repair", action="store_true",
+                        help="Always regenerate whole scenes instead of patching violations locally")
+    parser.add_argument("--context-budget", type=int, default=None,
+                        help="Token budget per scene prompt (rolling summary instead of last 2 scenes)")
+    parser.add_argument("--cache-path", default=os.getenv("LLM_CACHE_PATH"),
+                        help="SQLite response cache (optional)")
+    parser.add_argument("--stage-cache-dir", default=os.getenv("STAGE_CACHE_DIR"),
+                        help="DNA/rulebook stage cache directory (optional)")
+    parser.add_argument("--violation-log", default=os.getenv("VIOLATION_LOG_PATH"),
+                        help="Append every violation entry from every job to this JSONL file (optional)")
+    parser.add_argument("--dna-chunk-tokens", type=int,
+                        default=int(os.getenv("DNA_CHUNK_TOKENS")) if os.getenv("DNA_CHUNK_TOKENS") else None,
+                        help="Map-reduce DNA extraction over chunks of this size for long sources")
+    parser.add_argument("--hedge-percentile", type=float,
+                        default=float(os.getenv("HEDGE_PERCENTILE")) if os.getenv("HEDGE_PERCENTILE") else None,
+                        help="Send a duplicate scene request once one runs past this latency percentile (e.g. 0.9)")
+    parser.add_argument("--json-field-retries", type=int, default=int(os.getenv("JSON_FIELD_RETRIES", "1")),
+                        help="Follow-up calls for fields missing from malformed DNA/rulebook JSON")
+    parser.add_argument("--scene-candidates", type=int, default=int(os.getenv("SCENE_CANDIDATES", "1")),
+                        help="Sample this many versions of each scene at once and keep the cleanest")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue each job from the run journal in its output folder instead of starting over")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]ERROR[/red] Could not read manifest: {e}")
+        return 1
+    stories = len({job.story_file for job in jobs})
+    console.print(f"[green]OK[/green] Loaded {len(jobs)} jobs ({stories} stories) from {args.manifest}")
+
+    # One cache shared by every job's client, so identical prompts across jobs hit it
+    cache = ResponseCache(args.cache_path) if args.cache_path else None
+    # Same for the router - all jobs feed one set of latency/health stats
+    router = router_from_env(args.model)
+    if router:
+        console.print(f"[green]OK[/green] Routing across {', '.join(s.label for s in router.specs)}")
+    # And the hedger, so every job learns from the same latency history
+    hedger = Hedger(args.hedge_percentile) if args.hedge_percentile else None
+
+    def client_factory():
+        return LLMClient(model=args.model, cache=cache, backend=router, hedger=hedger)
+
+    runner = BatchRunner(
+        client_factory=client_factory,
+        workers=args.workers,
+        output_dir=args.output_dir,
+        transformer_kwargs={
+            "dna_temperature": float(os.getenv("DNA_TEMPERATURE", "0.3")),
+            "rulebook_temperature": float(os.getenv("RULEBOOK_TEMPERATURE", "0.4")),
+            "story_temperature": float(os.getenv("STORY_TEMPERATURE", "0.7")),
+            "max_retries": args.max_retries,
+            "scene_mode": args.scene_mode,
+            "stream_scenes": args.stream,
+            "local_repair": not args.no_repair,
+            "context_budget": args.context_budget,
+            "dna_chunk_tokens": args.dna_chunk_tokens,
+            "json_field_retries": args.json_field_retries,
+            "violation_sink": JsonlSink(args.violation_log) if args.violation_log else None,
+            "stage_cache": StageCache(args.stage_cache_dir) if args.stage_cache_dir else None,
+            "retry_policy": retry_policy_from_env(),
+            "scene_candidates": args.scene_candidates,
+        },
+        resume=args.resume
+    )
+
+    console.print(f"[yellow]Running with {args.workers} workers...[/yellow]")
+    summary = runner.run(jobs)
+
+    for row in summary["job_results"]:
+        if row["status"] == "ok":
+            resumed = f", {row['resumed_scenes']} from journal" if row.get("resumed_scenes") else ""
+            console.print(f"[green]OK[/green] #{row['job_id']} {row['story_name']} → {row['world_name']} "
+                          f"({row['scenes']} scenes{resumed}, {row['violations']} violations, {row['seconds']}s)")
+        else:
+            console.print(f"[red]FAILED[/red] #{row['job_id']} {row['story_name']} → {row['world_name']}: "
+                          f"{row['error']}")
+
+    console.print(
+        f"\n[bold cyan]Batch done:[/bold cyan] {summary['succeeded']}/{summary['jobs']} jobs in "
+        f"{summary['wall_seconds']}s ({summary['jobs_per_minute']} jobs/min, "
+        f"{summary['scenes_per_minute']} scenes/min), ~{summary['total_tokens']} tokens, "
+        f"{summary['total_violations']} violations"
+    )
+    console.print(f"Summary written to {os.path.join(args.output_dir, 'batch_summary.json')}")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,239 @@
+"""
+Constraint-checking microbenchmark.
+
+check_constraints runs once per attempt per scene, so in batch jobs it's the
+hot local loop. This times it over a grid of synthetic rulebooks (10 to
+10,000 character mappings + forbidden elements) and scene texts (1 KB to
+1 MB), and keeps the results as a JSON baseline so regressions show up.
+
+    python benchmarks/bench_constraints.py                  # full grid, compare to baseline
+    python benchmarks/bench_constraints.py --quick          # small corner of the grid
+    python benchmarks/bench_constraints.py --save-baseline  # overwrite the baseline
+    python benchmarks/bench_constraints.py --fail-on-regression 0.25
+
+Per grid cell it reports:
+  compile_ms      - building the enforcer (CompiledRulebook), paid once per rulebook
+  check_ms        - best-of-N time for one check_constraints call
+  mb_per_s        - text size / check_ms
+  alloc_blocks    - memory blocks allocated per call (tracemalloc)
+  alloc_peak_kib  - peak extra memory during one call
+
+Timings are machine-specific - compare baselines from the same box.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.constraint_enforcer import ConstraintEnforcer
+from src.models import CharacterMapping, Rulebook
+from src.rule_matcher import CompiledRulebook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "constraints.json")
+
+TERM_COUNTS = (10, 100, 1000, 10000)
+TEXT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+QUICK_TERM_COUNTS = (10, 1000)
+QUICK_TEXT_SIZES = (1_000, 100_000)
+
+# Filler vocabulary: mostly plain prose, with some tech words so the context
+# check is satisfied, like a real scene
+FILLER = (
+    "the", "city", "light", "rain", "she", "he", "walked", "through", "neon", "glass",
+    "towers", "quiet", "voice", "said", "again", "never", "before", "after", "across",
+    "data", "network", "corporation", "server", "signal", "memory", "window", "street",
+)
+SYLLABLES = ("ka", "vor", "len", "shi", "ta", "mir", "dro", "pel", "zan", "qu", "ri", "os")
+
+# One rule term dropped into the text roughly every this many characters
+HIT_EVERY = 2_000
+
+
+def _fake_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def make_rulebook(terms: int, seed: int = 0) -> Rulebook:
+    """Synthetic rulebook with `terms` character mappings and `terms` forbidden elements"""
+    rng = random.Random(seed)
+    names, forbidden = set(), set()
+    while len(names) < terms:
+        names.add(_fake_name(rng))
+    while len(forbidden) < terms:
+        words = [_fake_name(rng).lower() for _ in range(rng.randint(1, 2))]
+        forbidden.add(" ".join(words))
+    return Rulebook(
+        world_setting={"era": "2045"},
+        character_mappings=[
+            CharacterMapping(original=name, new_world=f"{name}-X", role="role", trait_preserved="trait")
+            for name in sorted(names)
+        ],
+        plot_translations={},
+        constraints=["Keep it grounded in tech and corporate settings"],
+        forbidden_elements=sorted(forbidden),
+    )
+
+
+def make_text(size: int, rulebook: Rulebook, seed: int = 0) -> str:
+    """About `size` chars of prose with a rule term every ~HIT_EVERY chars"""
+    rng = random.Random(seed)
+    terms = [m.original for m in rulebook.character_mappings] + list(rulebook.forbidden_elements)
+    words, length, next_hit = [], 0, HIT_EVERY // 4
+    while length < size:
+        if length >= next_hit:
+            word = rng.choice(terms)
+            next_hit += HIT_EVERY
+        else:
+            word = rng.choice(FILLER)
+            if rng.random() < 0.07:
+                word += "."
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size].ljust(size)
+
+
+def _time_call(fn, min_seconds: float, min_runs: int) -> float:
+    """Best single-call time over at least min_runs runs / min_seconds"""
+    best = float("inf")
+    runs, start = 0, time.perf_counter()
+    while runs < min_runs or time.perf_counter() - start < min_seconds:
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+        runs += 1
+    return best
+
+
+def _allocations(fn) -> tuple:
+    """(blocks allocated, peak extra bytes) for one call"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before_bytes, _ = tracemalloc.get_traced_memory()
+        before = tracemalloc.take_snapshot()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        tracemalloc.stop()
+    # Count blocks allocated by the call and still alive at the end (result
+    # objects) plus its temporaries, approximated by the positive block diff
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+    return blocks, max(peak - before_bytes, 0)
+
+
+def bench_cell(terms: int, size: int, min_seconds: float, min_runs: int) -> dict:
+    rulebook = make_rulebook(terms)
+    text = make_text(size, rulebook)
+
+    # Time the compile itself - the enforcer reuses compiled rulebooks, so
+    # later cells with the same rulebook would otherwise measure a cache hit
+    start = time.perf_counter()
+    CompiledRulebook(rulebook)
+    compile_seconds = time.perf_counter() - start
+    enforcer = ConstraintEnforcer(rulebook)
+
+    violations = enforcer.check_constraints(text)  # warm-up
+    check_seconds = _time_call(lambda: enforcer.check_constraints(text), min_seconds, min_runs)
+    blocks, peak = _allocations(lambda: enforcer.check_constraints(text))
+
+    return {
+        "terms": terms,
+        "text_bytes": len(text.encode("utf-8")),
+        "violations": len(violations),
+        "compile_ms": round(compile_seconds * 1000, 3),
+        "check_ms": round(check_seconds * 1000, 4),
+        "mb_per_s": round(len(text.encode("utf-8")) / 1e6 / check_seconds, 2),
+        "alloc_blocks": blocks,
+        "alloc_peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Cells whose throughput dropped by more than tolerance vs the baseline"""
+    old = {(r["terms"], r["text_bytes"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        prev = old.get((row["terms"], row["text_bytes"]))
+        if prev and row["mb_per_s"] < prev["mb_per_s"] * (1 - tolerance):
+            regressions.append((row, prev))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="check_constraints microbenchmark")
+    parser.add_argument("--quick", action="store_true", help="Run a 2x2 corner of the grid")
+    parser.add_argument("--terms", type=int, nargs="+", default=None, help="Override term counts")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help="Override text sizes (bytes)")
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="Time budget per cell")
+    parser.add_argument("--min-runs", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--fail-on-regression", type=float, default=None, metavar="TOLERANCE",
+                        help="Exit 1 if any cell's MB/s dropped more than this fraction (e.g. 0.25)")
+    parser.add_argument("--json-out", default=None, help="Also write results here")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    term_counts = args.terms or (QUICK_TERM_COUNTS if args.quick else TERM_COUNTS)
+    sizes = args.sizes or (QUICK_TEXT_SIZES if args.quick else TEXT_SIZES)
+
+    print(f"{'terms':>7}{'bytes':>10}{'viol':>7}{'compile ms':>12}{'check ms':>11}"
+          f"{'MB/s':>9}{'blocks':>8}{'peak KiB':>10}")
+    results = []
+    for terms in term_counts:
+        for size in sizes:
+            row = bench_cell(terms, size, args.min_seconds, args.min_runs)
+            results.append(row)
+            print(f"{row['terms']:>7}{row['text_bytes']:>10}{row['violations']:>7}{row['compile_ms']:>12.2f}"
+                  f"{row['check_ms']:>11.3f}{row['mb_per_s']:>9.2f}{row['alloc_blocks']:>8}"
+                  f"{row['alloc_peak_kib']:>10.1f}")
+
+    report = {
+        "machine": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        tolerance = args.fail_on_regression if args.fail_on_regression is not None else 0.25
+        regressions = compare(results, baseline, tolerance)
+        for row, prev in regressions:
+            print(f"REGRESSION terms={row['terms']} bytes={row['text_bytes']}: "
+                  f"{prev['mb_per_s']} -> {row['mb_per_s']} MB/s")
+        if not regressions:
+            print(f"No regressions vs {os.path.relpath(args.baseline, ROOT)} (tolerance {tolerance:.0%})")
+        if regressions and args.fail_on_regression is not None:
+            exit_code = 1
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
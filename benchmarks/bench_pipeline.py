@@ -0,0 +1,275 @@
+"""
+Offline pipeline benchmark.
+
+Runs the full transformation (StoryTransformer.transform: DNA -> rulebook ->
+scenes) on the bundled stories against a ReplayBackend, so numbers are
+reproducible and cost nothing. Reports wall time, LLM calls, tokens, retries
+and violations per stage, plus wall and CPU time for the whole run.
+
+Fixtures live in benchmarks/fixtures/<story>.jsonl:
+    # record real responses once (needs GROQ_API_KEY)
+    python benchmarks/bench_pipeline.py --record
+    # or build a Romeo & Juliet fixture from the committed outputs/ run
+    python benchmarks/bench_pipeline.py --seed-from-outputs
+
+    # then benchmark offline
+    python benchmarks/bench_pipeline.py --latency recorded --repeat 3
+    python benchmarks/bench_pipeline.py --latency 0.2 --violations 2 --json-out bench.json
+
+Only the default pipeline is benchmarked - sequential scenes, no rolling
+summaries - since that is what the fixtures hold. The committed
+romeo_juliet fixture is seeded, not recorded: its responses are the outputs/
+run, its usage is estimated locally and it has no latency. Ramayana needs
+--record.
+
+--violations N prepends an original character name to the first N scene
+responses, so the repair/retry path gets exercised too. With local repair on
+that is the first attempt of the first N scenes; with --no-repair the retries
+are scene responses as well and use up script entries.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from src.backends import (
+    ChatCompletionsBackend, LLMBackend, RecordingBackend, ReplayBackend, ReplayMiss, loose_key
+)
+from src.llm_client import LLMClient
+from src.story_transformer import StoryTransformer
+from src.tokens import estimate_tokens
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+
+STORIES = {
+    # key: (file, display name, an original character name to inject as a violation)
+    "romeo_juliet": ("data/romeo_juliet_story.txt", "Romeo & Juliet", "Romeo"),
+    "ramayana": ("data/ramayana_story.txt", "Ramayana", "Rama"),
+}
+
+# Same default world as run.py
+TARGET_WORLD = """Cyberpunk Silicon Valley 2045, during the race to develop
+        Artificial General Intelligence (AGI). Tech corporations have more power than governments.
+        Corporate espionage is rampant. The ethics of AI development are hotly contested."""
+TARGET_WORLD_NAME = "Cyberpunk 2045"
+
+
+class CountingBackend(LLMBackend):
+    """Counts calls into any backend so stages can be attributed"""
+
+    def __init__(self, inner: LLMBackend):
+        self.inner = inner
+        self.calls = 0
+
+    def create(self, **request):
+        self.calls += 1
+        return self.inner.create(**request)
+
+    async def acreate(self, **request):
+        self.calls += 1
+        return await self.inner.acreate(**request)
+
+
+def fixture_path(story: str) -> str:
+    return os.path.join(FIXTURE_DIR, f"{story}.jsonl")
+
+
+def make_transformer(story: str, backend: LLMBackend, args):
+    counter = CountingBackend(backend)
+    client = LLMClient(api_key="offline", model=args.model, backend=counter)
+    transformer = StoryTransformer(
+        llm_client=client,
+        max_retries=args.max_retries,
+        source_story_name=STORIES[story][1],
+        target_world_name=TARGET_WORLD_NAME,
+        stream_scenes=args.stream,
+        local_repair=not args.no_repair,
+    )
+    return transformer, counter
+
+
+def read_story(story: str) -> str:
+    with open(os.path.join(ROOT, STORIES[story][0]), "r") as f:
+        return f.read()
+
+
+def run_once(story: str, backend: LLMBackend, args) -> dict:
+    """One full transform(), broken down by stage from its performance metrics"""
+    transformer, counter = make_transformer(story, backend, args)
+    original_story = read_story(story)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = transformer.transform(original_story, TARGET_WORLD)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    metadata = result["metadata"]
+    performance = metadata.performance
+    stages = {}
+    for stage, seconds in performance.stage_seconds.items():
+        calls = [c for c in performance.calls if c.stage == stage]
+        stages[stage] = {
+            "wall_seconds": seconds,
+            "calls": len(calls),
+            "tokens": sum(c.prompt_tokens + c.completion_tokens for c in calls),
+        }
+    stages["scenes"]["retries"] = sum(performance.retries_per_scene)
+    stages["scenes"]["violations"] = metadata.total_violations
+    stages["total"] = {
+        "wall_seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "calls": counter.calls,
+        "tokens": transformer.llm_client.get_token_usage(),
+    }
+    return stages
+
+
+def summarize(runs: list) -> dict:
+    """Per-stage mean over repeats (plus min wall time, the least noisy number)"""
+    summary = {}
+    for stage in runs[0]:
+        rows = [run[stage] for run in runs]
+        summary[stage] = {key: round(sum(r[key] for r in rows) / len(rows), 4) for key in rows[0]}
+        summary[stage]["min_wall_seconds"] = min(r["wall_seconds"] for r in rows)
+    return summary
+
+
+class OutputsBackend(LLMBackend):
+    """
+    Answers the default pipeline's requests from the committed outputs/ run:
+    DNA, rulebook and scene N. Usage is estimated from the text, since the
+    run didn't keep it.
+    """
+
+    def __init__(self, dna: dict, rules: dict, scenes: list):
+        self.dna = dna
+        self.rules = rules
+        self.scenes = scenes
+
+    def create(self, **request):
+        if request.get("stream"):
+            raise ValueError("Seeding runs without --stream")
+        prompt = request["messages"][-1]["content"]
+        if request.get("response_format"):
+            content = json.dumps(self.dna if prompt.startswith("Analyze this story") else self.rules)
+        else:
+            scene = re.match(r"Write Scene (\d+)\b", prompt)
+            if scene is None:
+                raise ReplayMiss(f"outputs/ has no response for: {loose_key(request)[:120]}")
+            content = self.scenes[int(scene.group(1)) - 1]
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in request["messages"])
+        completion_tokens = estimate_tokens(content)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    async def acreate(self, **request):
+        return self.create(**request)
+
+
+def seed_from_outputs(path: str, args) -> int:
+    """
+    Build a Romeo & Juliet fixture from the committed outputs/ run by
+    recording a real transform() against OutputsBackend, so every record
+    holds the exact request the pipeline sends (full story, model,
+    temperature) and replays by exact key.
+    """
+    out = os.path.join(ROOT, "outputs")
+    with open(os.path.join(out, "story_dna.json")) as f:
+        dna = json.load(f)
+    with open(os.path.join(out, "transformation_rules.json")) as f:
+        rules = json.load(f)
+    with open(os.path.join(out, "final_story.md")) as f:
+        # Title block, scenes separated by ---, then the "## About" footer
+        parts = [part.strip() for part in f.read().split("\n---\n")[1:]]
+    scenes = [part for part in parts if part and not part.startswith("## ")]
+
+    if os.path.exists(path):
+        os.remove(path)
+    seed_args = argparse.Namespace(**{**vars(args), "stream": False, "no_repair": False, "violations": 0})
+    transformer, _ = make_transformer("romeo_juliet", RecordingBackend(OutputsBackend(dna, rules, scenes), path), seed_args)
+    transformer.transform(read_story("romeo_juliet"), TARGET_WORLD)
+    with open(path) as f:
+        return sum(1 for line in f if line.strip())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark (record/replay)")
+    parser.add_argument("--stories", nargs="+", choices=sorted(STORIES), default=sorted(STORIES))
+    parser.add_argument("--record", action="store_true",
+                        help="Run against the live API and (re)write the fixtures")
+    parser.add_argument("--seed-from-outputs", action="store_true",
+                        help="Write a romeo_juliet fixture built from outputs/ and exit")
+    parser.add_argument("--latency", default="0",
+                        help="Seconds of fake latency per call, or 'recorded'")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier for --latency recorded")
+    parser.add_argument("--violations", type=int, default=0,
+                        help="Inject an original character name into the first N scene responses")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--model", default=os.getenv("PRIMARY_MODEL", "llama-3.3-70b-versatile"))
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--no-repair", action="store_true")
+    parser.add_argument("--json-out", default=None, help="Also write results here")
+    return parser.parse_args()
+
+
+def main():
+    load_dotenv()
+    args = parse_args()
+
+    if args.seed_from_outputs:
+        path = fixture_path("romeo_juliet")
+        print(f"Wrote {seed_from_outputs(path, args)} records to {path}")
+        return 0
+
+    latency = args.latency if args.latency == "recorded" else float(args.latency)
+    results = {}
+
+    for story in args.stories:
+        path = fixture_path(story)
+        if args.record:
+            if os.path.exists(path):
+                os.remove(path)
+            from groq import Groq
+
+            live = ChatCompletionsBackend(Groq(api_key=os.getenv("GROQ_API_KEY")))
+            runs = [run_once(story, RecordingBackend(live, path), args)]
+            print(f"Recorded {path}")
+        else:
+            if not os.path.exists(path):
+                print(f"[skip] {story}: no fixture at {path} (run with --record first)")
+                continue
+            runs = []
+            for _ in range(args.repeat):
+                backend = ReplayBackend(path, latency=latency, latency_scale=args.latency_scale,
+                                        violation_script=[STORIES[story][2]] * args.violations)
+                runs.append(run_once(story, backend, args))
+        results[story] = summarize(runs)
+
+    for story, summary in results.items():
+        print(f"\n{story}")
+        print(f"  {'stage':<10}{'wall s':>10}{'cpu s':>10}{'calls':>8}{'tokens':>9}{'retries':>9}{'violations':>12}")
+        for stage, row in summary.items():
+            cpu = f"{row['cpu_seconds']:.3f}" if "cpu_seconds" in row else ""
+            print(f"  {stage:<10}{row['wall_seconds']:>10.3f}{cpu:>10}"
+                  f"{row['calls']:>8g}{row['tokens']:>9g}{row.get('retries', ''):>9}{row.get('violations', ''):>12}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
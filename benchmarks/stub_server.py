@@ -0,0 +1,145 @@
+"""
+Stub OpenAI-compatible chat completions server.
+
+For exercising the provider router (and the scheduler's backoff) without
+real providers. Start a couple with different behaviour and point
+LLM_PROVIDERS at them:
+
+    python benchmarks/stub_server.py --port 8101 --latency 0.05
+    python benchmarks/stub_server.py --port 8102 --latency 0.4 --error-rate 0.3
+
+    LLM_PROVIDERS="local:stub-fast@http://127.0.0.1:8101/v1,local:stub-slow@http://127.0.0.1:8102/v1"
+
+Serves POST /v1/chat/completions (and Groq's /openai/v1/... path), plain or
+streamed (SSE), with canned text - JSON-mode requests get --json-content.
+GET /v1/models answers too, for LLMClient.warm_up().
+"""
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *log_args):
+            if args.verbose:
+                super().log_message(fmt, *log_args)
+
+        def _send_json(self, status: int, payload: dict, headers: dict = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            # Model list - what LLMClient.warm_up() calls to open a connection
+            if not self.path.rstrip("/").endswith("/models"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            time.sleep(max(0.0, args.latency + random.uniform(-args.jitter, args.jitter)))
+            if random.random() < args.error_rate:
+                headers = {"Retry-After": str(args.retry_after)} if args.retry_after is not None else {}
+                self._send_json(args.error_status, {"error": {"message": "stub failure"}}, headers)
+                return
+
+            json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+            content = args.json_content if json_mode else args.content
+            prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+            usage = {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_chars // 4 + len(content) // 4,
+            }
+            model = request.get("model", "stub")
+
+            if request.get("stream"):
+                self._stream(content, usage, model)
+                return
+            self._send_json(200, {
+                "id": "stub-1",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def _stream(self, content: str, usage: dict, model: str):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def event(choices, extra=None):
+                chunk = {"id": "stub-1", "object": "chat.completion.chunk",
+                         "created": int(time.time()), "model": model, "choices": choices}
+                chunk.update(extra or {})
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            for i in range(0, len(content), args.chunk_chars):
+                event([{"index": 0, "delta": {"content": content[i:i + args.chunk_chars]},
+                        "finish_reason": None}])
+                time.sleep(args.chunk_delay)
+            event([], {"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before responding")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- random seconds on latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After on failures")
+    parser.add_argument("--content", default="The corporation's data network hummed through the night.")
+    parser.add_argument("--json-content", default='{"stub": true}')
+    parser.add_argument("--chunk-chars", type=int, default=16)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args))
+    print(f"Stub LLM server on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
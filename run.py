@@ -3,102 +3,381 @@ Story Transformation - Command Line Version
 
 Just run this if you don't want to mess with Jupyter notebooks.
 Does the same thing as story_transformation.ipynb but from the terminal.
+
+With no arguments it asks which story and world to use. Give it --story
+to run non-interactively (scripts, CI, cron):
+
+    python run.py --story data/ramayana_story.txt --name Ramayana --output-dir outputs/ramayana
+    python run.py --story my_story.txt --world "Wild West, 1870s" --world-name "Wild West" --check
+    python run.py --resume 20250101-120000-ramayana-1a2b3c
+
+Every run keeps a journal (DNA, rulebook, each accepted scene) under
+--journal-dir. If a run dies part-way, --resume <run-id> picks it up from
+the first missing scene instead of starting over.
+
+Options left out fall back to .env / environment variables, then defaults.
+Only the standard library is imported up front, so --help returns at once
+and --check validates everything without touching the API. For real runs
+the LLM client is built and connected on a background thread while the
+story is read and the pipeline modules load.
 """
 
+import argparse
 import os
 import sys
-from dotenv import load_dotenv
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.prompt import Prompt
+import threading
+from concurrent.futures import Future
 
-from src.llm_client import LLMClient
-from src.story_transformer import StoryTransformer
+DEFAULT_WORLD = """Cyberpunk Silicon Valley 2045, during the race to develop
+        Artificial General Intelligence (AGI). Tech corporations have more power than governments.
+        Corporate espionage is rampant. The ethics of AI development are hotly contested."""
+DEFAULT_WORLD_NAME = "Cyberpunk 2045"
 
-load_dotenv()
-console = Console()
+STORIES = {
+    "1": ("data/romeo_juliet_story.txt", "Romeo & Juliet"),
+    "2": ("data/ramayana_story.txt", "Ramayana"),
+}
 
 
-def main():
-    """Run the whole transformation pipeline"""
-    console.print(Panel(
-        "[bold cyan]Story Transformation System[/bold cyan]\n\n"
-        "Transform any classic story into a new world\n\n"
-        "Method: Constraint-Enforced Multi-Stage Transformation",
-        border_style="cyan",
-        title="Story Transformer"
-    ))
-    
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Transform a classic story into a new world",
+        epilog="Without --story the script asks for the story and world interactively."
+    )
+    parser.add_argument("--story", help="Source story file (runs without prompts)")
+    parser.add_argument("--name", help="Story name (default: from the file name)")
+    parser.add_argument("--world", help=f"Target world description (default: {DEFAULT_WORLD_NAME})")
+    parser.add_argument("--world-name", help="Short name for the target world")
+    parser.add_argument("--model", help="Model name (PRIMARY_MODEL)")
+    parser.add_argument("--provider", help="groq, openai or local (LLM_PROVIDER)")
+    parser.add_argument("--dna-temperature", type=float, help="Stage 1 temperature (DNA_TEMPERATURE)")
+    parser.add_argument("--rulebook-temperature", type=float, help="Stage 2 temperature (RULEBOOK_TEMPERATURE)")
+    parser.add_argument("--story-temperature", type=float, help="Stage 3 temperature (STORY_TEMPERATURE)")
+    parser.add_argument("--scene-mode", choices=["sequential", "parallel"], help="Stage 3 mode (SCENE_MODE)")
+    parser.add_argument("--output-dir", help="Where output files go (default: outputs, or the resumed run's)")
+    parser.add_argument("--journal-dir", help="Where run journals go (RUN_JOURNAL_DIR, default: outputs/journal)")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted run from its journal - story and world come from the journal")
+    parser.add_argument("--check", action="store_true",
+                        help="Validate the settings and story file, then exit without calling the API")
+    args = parser.parse_args(argv)
+    if args.world and not args.world_name:
+        parser.error("--world needs a --world-name to go with it")
+    return args
+
+
+def load_config(args) -> dict:
+    """Flags first, then .env / environment, then defaults"""
+    from dotenv import load_dotenv
+    from src.retry_policy import retry_policy_from_env
+    load_dotenv()
+
+    def flag_or_env(value, env: str, default: str):
+        return value if value is not None else os.getenv(env, default)
+
+    return {
+        "model": flag_or_env(args.model, "PRIMARY_MODEL", "llama-3.3-70b-versatile"),
+        "provider": flag_or_env(args.provider, "LLM_PROVIDER", "groq"),
+        "dna_temperature": float(flag_or_env(args.dna_temperature, "DNA_TEMPERATURE", "0.3")),
+        "rulebook_temperature": float(flag_or_env(args.rulebook_temperature, "RULEBOOK_TEMPERATURE", "0.4")),
+        "story_temperature": float(flag_or_env(args.story_temperature, "STORY_TEMPERATURE", "0.7")),
+        "max_retries": 2,
+        "scene_mode": flag_or_env(args.scene_mode, "SCENE_MODE", "sequential"),
+        "output_dir": args.output_dir or "outputs",
+        "journal_dir": flag_or_env(args.journal_dir, "RUN_JOURNAL_DIR", os.path.join("outputs", "journal")),
+        "cache_path": os.getenv("LLM_CACHE_PATH"),  # unset = no caching
+        "stage_cache_dir": os.getenv("STAGE_CACHE_DIR"),  # unset = always rerun stages 1-2
+        "stream_scenes": os.getenv("STREAM_SCENES", "false").lower() in ("1", "true", "yes"),
+        "local_repair": os.getenv("LOCAL_REPAIR", "true").lower() in ("1", "true", "yes"),
+        "context_budget": int(os.getenv("CONTEXT_BUDGET")) if os.getenv("CONTEXT_BUDGET") else None,
+        "hedge_percentile": float(os.getenv("HEDGE_PERCENTILE")) if os.getenv("HEDGE_PERCENTILE") else None,
+        "dna_chunk_tokens": int(os.getenv("DNA_CHUNK_TOKENS")) if os.getenv("DNA_CHUNK_TOKENS") else None,
+        "violation_log_path": os.getenv("VIOLATION_LOG_PATH"),  # unset = in-memory log only
+        "json_field_retries": int(os.getenv("JSON_FIELD_RETRIES", "1")),
+        "retry_policy": retry_policy_from_env(),  # RETRY_POLICY unset = regenerate on any violation
+        "scene_candidates": int(os.getenv("SCENE_CANDIDATES", "1")),
+    }
+
+
+def choose_interactively(console):
+    """Ask for story and target world - the original run.py flow"""
+    from rich.prompt import Prompt
+
     # Let user choose story and target world
     console.print("\n[bold yellow]Available Stories:[/bold yellow]")
     console.print("1. Romeo & Juliet (Shakespeare)")
     console.print("2. Ramayana (Ancient Indian Epic)")
     console.print("3. Custom story file\n")
-    
+
     choice = Prompt.ask("Select story", choices=["1", "2", "3"], default="1")
-    
-    if choice == "1":
-        story_file = "data/romeo_juliet_story.txt"
-        story_name = "Romeo & Juliet"
-    elif choice == "2":
-        story_file = "data/ramayana_story.txt"
-        story_name = "Ramayana"
+
+    if choice in STORIES:
+        story_file, story_name = STORIES[choice]
     else:
         story_file = Prompt.ask("Enter path to story file")
         story_name = Prompt.ask("Enter story name")
-    
+
     # Get target world
     console.print("\n[bold yellow]Target World Examples:[/bold yellow]")
     console.print("- Cyberpunk Silicon Valley 2045")
     console.print("- Medieval Fantasy Kingdom")
     console.print("- Space Opera (distant future)")
     console.print("- Wild West 1800s\n")
-    
+
     use_default = Prompt.ask("Use default (Cyberpunk 2045)?", choices=["y", "n"], default="y")
-    
+
     if use_default == "y":
-        target_world = """Cyberpunk Silicon Valley 2045, during the race to develop 
-        Artificial General Intelligence (AGI). Tech corporations have more power than governments. 
-        Corporate espionage is rampant. The ethics of AI development are hotly contested."""
-        target_world_name = "Cyberpunk 2045"
+        target_world = DEFAULT_WORLD
+        target_world_name = DEFAULT_WORLD_NAME
     else:
         target_world = Prompt.ask("Describe the target world")
         target_world_name = Prompt.ask("Enter a short name for this world (e.g., 'Medieval Fantasy')")
+    return story_file, story_name, target_world, target_world_name
+
+
+def story_name_from_path(path: str) -> str:
+    """data/romeo_juliet_story.txt -> "Romeo Juliet Story\""""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem.replace("_", " ").replace("-", " ").title()
+
+
+def check_settings(config: dict, story_file: str) -> list:
+    """Problems that would make a run fail early - empty list = good to go"""
+    from src.providers import API_KEY_ENV, PROVIDER_KINDS, parse_providers
+
+    problems = []
+    if not os.path.isfile(story_file):
+        problems.append(f"Story file not found: {story_file}")
+    elif not os.access(story_file, os.R_OK):
+        problems.append(f"Story file not readable: {story_file}")
+
+    for stage in ("dna", "rulebook", "story"):
+        temperature = config[f"{stage}_temperature"]
+        if not 0 <= temperature <= 2:
+            problems.append(f"{stage} temperature must be between 0 and 2, got {temperature}")
+    if config["scene_mode"] not in ("sequential", "parallel"):
+        problems.append(f"SCENE_MODE must be sequential or parallel, got '{config['scene_mode']}'")
+    if config["scene_candidates"] < 1:
+        problems.append(f"SCENE_CANDIDATES must be at least 1, got {config['scene_candidates']}")
+
+    try:
+        specs = parse_providers(os.getenv("LLM_PROVIDERS") or f"{config['provider']}:{config['model']}")
+    except ValueError as e:
+        specs = []
+        problems.append(str(e))
+    for spec in specs:
+        if spec.kind not in PROVIDER_KINDS:
+            problems.append(f"Unknown provider '{spec.kind}', expected one of {sorted(PROVIDER_KINDS)}")
+        elif spec.kind != "local" and spec.kind in API_KEY_ENV and not os.getenv(API_KEY_ENV[spec.kind]):
+            problems.append(f"{API_KEY_ENV[spec.kind]} is not set (needed for {spec.label})")
+
+    # Nearest existing parent of the output dir has to be writable
+    parent = os.path.abspath(config["output_dir"])
+    while not os.path.exists(parent):
+        parent = os.path.dirname(parent)
+    if not os.access(parent, os.W_OK):
+        problems.append(f"Can't write to {config['output_dir']}")
+    return problems
+
+
+def make_client(config: dict):
+    """Build the LLM client and open its connection - runs on a background thread"""
+    from src.llm_client import LLMClient
+    from src.providers import API_KEY_ENV, router_from_env
+    from src.response_cache import ResponseCache
+
+    api_key = os.getenv(API_KEY_ENV.get(config["provider"], "GROQ_API_KEY"))
+    cache = ResponseCache(config["cache_path"]) if config["cache_path"] else None
+    router = router_from_env(config["model"])  # LLM_PROVIDERS set = route across several
+    llm_client = LLMClient(
+        api_key=api_key,
+        model=config["model"],
+        provider=config["provider"],
+        cache=cache,
+        backend=router,
+        hedge_percentile=config["hedge_percentile"]
+    )
+    llm_client.warm_up()
+    return llm_client, router
+
+
+def open_journal(config: dict, run_id: str, console):
+    """Load a run's journal for --resume - None (after saying why) if it can't be used"""
+    from src.journal import JournalError, RunJournal, journal_path
+
+    try:
+        journal = RunJournal.open(journal_path(config["journal_dir"], run_id))
+    except (JournalError, OSError) as e:
+        console.print(f"[red]ERROR[/red] Can't resume {run_id}: {e}")
+        return None
+    total = journal.total_scenes
+    done = f"{len(journal.scenes)}/{total} scenes" if total else "no scenes yet"
+    console.print(f"[green]OK[/green] Resuming run {run_id} ({journal.run['story_name']} → "
+                  f"{journal.run['target_world_name']}, {done} done)")
+    return journal
+
+
+def resumed_settings(config: dict, args, journal) -> list:
+    """
+    Put the run's own model/provider/scene mode back into config - a resumed
+    run has to finish the way it started. A flag that asks for something
+    else is a problem rather than silently mixing two models in one story.
+    Settings that only come from the environment follow the journal.
+    """
+    problems = []
+    for key, flag in (("model", args.model), ("provider", args.provider), ("scene_mode", args.scene_mode)):
+        recorded = journal.run.get(key)
+        if recorded is None:
+            continue  # journal from before this was recorded
+        if flag is not None and flag != recorded:
+            problems.append(f"--{key.replace('_', '-')} {flag} doesn't match run {journal.run_id}, "
+                            f"which was started with {recorded} - drop the flag to resume it")
+        config[key] = recorded
+    return problems
+
+
+def resume_hint(console, journal):
+    """Tell the user how to pick the run back up - nothing that's done is lost"""
+    journal.close()
+    console.print(f"[yellow]Progress is saved in {journal.path}. "
+                  f"Resume with: python run.py --resume {journal.run_id}[/yellow]")
+
+
+def in_background(fn, *args) -> Future:
+    """Run fn on a daemon thread - a slow connect never holds up exiting"""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="llm-connect", daemon=True).start()
+    return future
+
+
+def main(argv=None) -> int:
+    """Run the whole transformation pipeline"""
+    args = parse_args(argv)
     
-    # Grab config from environment or use defaults
-    config = {
-        "model": os.getenv("PRIMARY_MODEL", "llama-3.3-70b-versatile"),
-        "provider": os.getenv("LLM_PROVIDER", "groq"),
-        "dna_temperature": float(os.getenv("DNA_TEMPERATURE", "0.3")),
-        "rulebook_temperature": float(os.getenv("RULEBOOK_TEMPERATURE", "0.4")),
-        "story_temperature": float(os.getenv("STORY_TEMPERATURE", "0.7")),
-        "max_retries": 2,
-    }
+    from rich.console import Console
+    from rich.panel import Panel
+    console = Console()
+    
+    try:
+        config = load_config(args)
+    except ValueError as e:
+        console.print(f"[red]ERROR[/red] Bad setting: {e}")
+        return 2
+    
+    if args.check and not args.resume:
+        story_file = args.story or STORIES["1"][0]
+        problems = check_settings(config, story_file)
+        for problem in problems:
+            console.print(f"[red]ERROR[/red] {problem}")
+        if problems:
+            return 1
+        console.print(f"[green]OK[/green] {story_file} → {args.world_name or DEFAULT_WORLD_NAME} "
+                    f"with {config['provider']}:{config['model']}, outputs to {config['output_dir']}/")
+        return 0
+    
+    journal = None
+    if args.resume:
+        journal = open_journal(config, args.resume, console)
+        if journal is None:
+            return 1
+        problems = resumed_settings(config, args, journal)
+        for problem in problems:
+            console.print(f"[red]ERROR[/red] {problem}")
+        if problems:
+            journal.close()
+            return 1
+        if args.check:
+            journal.close()
+            return 0
+        config["output_dir"] = args.output_dir or journal.run.get("output_dir", config["output_dir"])
+    elif args.story is None:
+        console.print(Panel(
+            "[bold cyan]Story Transformation System[/bold cyan]\n\n"
+            "Transform any classic story into a new world\n\n"
+            "Method: Constraint-Enforced Multi-Stage Transformation",
+            border_style="cyan",
+            title="Story Transformer"
+        ))
+    
+    # Connect while the user is choosing (or while we read the story) -
+    # building the SDK client and the TLS handshake are off the critical path
+    client_future = in_background(make_client, config)
+    
+    if journal is not None:
+        story_file = journal.run["story_file"]
+        story_name = journal.run["story_name"]
+        target_world = journal.run["target_world"]
+        target_world_name = journal.run["target_world_name"]
+    elif args.story is None:
+        story_file, story_name, target_world, target_world_name = choose_interactively(console)
+    else:
+        story_file = args.story
+        story_name = args.name or story_name_from_path(story_file)
+        target_world = args.world or DEFAULT_WORLD
+        target_world_name = args.world_name or DEFAULT_WORLD_NAME
+    
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from src.ingest import CHARS_PER_TOKEN
+    from src.journal import RunJournal, journal_path, new_run_id
+    from src.output_writer import SCENE_SEPARATOR
+    from src.stage_cache import StageCache
+    from src.story_transformer import StoryTransformer
+    from src.violation_log import JsonlSink
+    
+    # Check the story file - small ones are read now, long ones are streamed by Stage 1.
+    # A resumed run that already has its DNA doesn't need the source at all
+    story_text = None
+    if journal is None or journal.dna is None:
+        try:
+            story_size = os.path.getsize(story_file)
+            if not config["dna_chunk_tokens"] or story_size <= config["dna_chunk_tokens"] * CHARS_PER_TOKEN:
+                with open(story_file, "r") as f:
+                    story_text = f.read()
+            console.print(f"[green]OK[/green] Found original story ({story_size} bytes)")
+        except FileNotFoundError:
+            console.print(f"[red]ERROR[/red] {story_file} not found")
+            return 1
+    
+    if journal is None:
+        run_id = new_run_id(story_name)
+        try:
+            journal = RunJournal.create(
+                journal_path(config["journal_dir"], run_id),
+                run_id=run_id,
+                story_file=os.path.abspath(story_file),
+                story_name=story_name,
+                target_world=target_world,
+                target_world_name=target_world_name,
+                output_dir=config["output_dir"],
+                model=config["model"],
+                provider=config["provider"],
+                scene_mode=config["scene_mode"]
+            )
+        except OSError as e:
+            console.print(f"[red]ERROR[/red] Can't create the run journal in {config['journal_dir']}: {e}")
+            return 1
     
     # Set up LLM client
     try:
-        api_key = os.getenv("GROQ_API_KEY") if config["provider"] == "groq" else os.getenv("OPENAI_API_KEY")
-        llm_client = LLMClient(
-            api_key=api_key,
-            model=config["model"],
-            provider=config["provider"]
-        )
-        console.print(f"[green]OK[/green] LLM Client initialized ({config['provider'].upper()}: {config['model']})")
+        llm_client, router = client_future.result()
+        if router:
+            routes = ", ".join(spec.label for spec in router.specs)
+            console.print(f"[green]OK[/green] LLM Client initialized (routing across {routes})")
+        else:
+            console.print(f"[green]OK[/green] LLM Client initialized ({config['provider'].upper()}: {config['model']})")
     except Exception as e:
+        from src.providers import API_KEY_ENV
         console.print(f"[red]ERROR[/red] Error initializing LLM client: {e}")
-        api_key_name = "GROQ_API_KEY" if config["provider"] == "groq" else "OPENAI_API_KEY"
+        api_key_name = API_KEY_ENV.get(config["provider"], "GROQ_API_KEY")
         console.print(f"[yellow]WARNING[/yellow] Please check your {api_key_name} in .env file")
-        return
-    
-    # Read the story file
-    try:
-        with open(story_file, "r") as f:
-            original_story = f.read()
-        console.print(f"[green]OK[/green] Loaded original story ({len(original_story)} chars)")
-    except FileNotFoundError:
-        console.print(f"[red]ERROR[/red] {story_file} not found")
-        return
+        return 1
     
     # Set up the transformer
     transformer = StoryTransformer(
@@ -108,7 +387,18 @@ def main():
         story_temperature=config["story_temperature"],
         max_retries=config["max_retries"],
         source_story_name=story_name,
-        target_world_name=target_world_name
+        target_world_name=target_world_name,
+        scene_mode=config["scene_mode"],
+        stage_cache=StageCache(config["stage_cache_dir"]) if config["stage_cache_dir"] else None,
+        stream_scenes=config["stream_scenes"],
+        local_repair=config["local_repair"],
+        context_budget=config["context_budget"],
+        dna_chunk_tokens=config["dna_chunk_tokens"],
+        violation_sink=JsonlSink(config["violation_log_path"]) if config["violation_log_path"] else None,
+        json_field_retries=config["json_field_retries"],
+        journal=journal,
+        retry_policy=config["retry_policy"],
+        scene_candidates=config["scene_candidates"]
     )
     
     # Run the whole thing with progress bars
@@ -119,37 +409,67 @@ def main():
     ) as progress:
         # Stage 1: Pull out the core story elements
         task1 = progress.add_task("[cyan]Stage 1: Extracting Story DNA...", total=None)
+        resumed_dna = journal.dna is not None
         try:
-            dna = transformer.extract_dna(original_story)
+            if story_text is not None:
+                dna = transformer.extract_dna(story_text)
+            else:
+                dna = transformer.extract_dna_from_file(story_file)
             progress.update(task1, completed=True)
-            console.print(f"[green]OK[/green] Extracted {len(dna.themes)} themes, "
+            cached_note = (" (from run journal)" if resumed_dna
+                           else " (from stage cache)" if "dna" in transformer.cached_stages else "")
+            console.print(f"[green]OK[/green]{cached_note} Extracted {len(dna.themes)} themes, "
                         f"{len(dna.characters)} characters, {len(dna.plot_beats)} plot beats")
         except Exception as e:
             console.print(f"[red]ERROR[/red] Error in DNA extraction: {e}")
-            return
-        
+            resume_hint(console, journal)
+            return 1
+    
         # Stage 2: Figure out how to map everything
         task2 = progress.add_task("[cyan]Stage 2: Building Transformation Rulebook...", total=None)
+        resumed_rulebook = journal.rulebook is not None
         try:
             rulebook = transformer.build_rulebook(dna, target_world)
             progress.update(task2, completed=True)
-            console.print(f"[green]OK[/green] Created {len(rulebook.constraints)} constraints, "
+            cached_note = (" (from run journal)" if resumed_rulebook
+                           else " (from stage cache)" if "rulebook" in transformer.cached_stages else "")
+            console.print(f"[green]OK[/green]{cached_note} Created {len(rulebook.constraints)} constraints, "
                         f"{len(rulebook.character_mappings)} character mappings")
         except Exception as e:
             console.print(f"[red]ERROR[/red] Error in rulebook building: {e}")
-            return
-        
-        # Stage 3: Actually write the story (with validation)
+            resume_hint(console, journal)
+            return 1
+    
+        # Stage 3: Actually write the story (with validation). Each scene is
+        # written to the output dir as it's finished (out-of-order ones to
+        # pending_scenes_*.jsonl until their turn), so a crash keeps what's done
         task3 = progress.add_task("[cyan]Stage 3: Generating Story with Constraint Enforcement...", total=None)
+        writer = transformer.make_writer(config["output_dir"])
         try:
             console.print("\n")
-            story = transformer.generate_story(dna, rulebook)
+            writer.write_dna(dna)
+            writer.write_rulebook(rulebook)
+            writer.begin_story()
+            scenes = {}
+            for scene in transformer.generate_story_iter(dna, rulebook):
+                writer.add_scene(scene)
+                scenes[scene.scene_number] = scene.text
+                if scene.resumed:
+                    console.print(f"  Scene {scene.scene_number}/{len(dna.plot_beats)} restored from journal")
+                else:
+                    console.print(f"  Scene {scene.scene_number}/{len(dna.plot_beats)} done "
+                                f"({scene.attempts} attempt{'s' if scene.attempts > 1 else ''}, {scene.seconds:.1f}s)")
+            story = SCENE_SEPARATOR.join(scenes[i] for i in sorted(scenes))
             progress.update(task3, completed=True)
             console.print(f"\n[green]OK[/green] Generated {len(dna.plot_beats)} scenes "
                         f"({len(story.split())} words)")
-        except Exception as e:
-            console.print(f"[red]ERROR[/red] Error in story generation: {e}")
-            return
+        except (Exception, KeyboardInterrupt) as e:
+            writer.close()
+            reason = "Interrupted" if isinstance(e, KeyboardInterrupt) else f"Error in story generation: {e}"
+            console.print(f"[red]ERROR[/red] {reason}")
+            console.print(f"[yellow]Finished scenes so far are in {writer.path('final_story', 'md')}[/yellow]")
+            resume_hint(console, journal)
+            return 130 if isinstance(e, KeyboardInterrupt) else 1
     
     # Check how many violations we caught
     violation_summary = transformer.enforcer.get_violation_summary()
@@ -167,52 +487,97 @@ def main():
                 "violations_detected": violation_summary["total_violations"],
                 "scenes_with_violations": violation_summary["scenes_with_violations"],
                 "model_used": config["model"],
-                "total_tokens": llm_client.get_token_usage()
+                "total_tokens": llm_client.get_token_usage(),
+                **llm_client.get_token_breakdown(),
+                "retry_policy": transformer.retry_stats(),
+                "performance": transformer.metrics.snapshot(transformer.scene_attempts).model_dump()
             }
         }
-        
-        transformer.save_outputs(result, "outputs")
-        console.print("[green]OK[/green] Saved all outputs to outputs/")
+    
+        writer.finish(result, transformer.metrics.snapshot(transformer.scene_attempts))
+        console.print(f"[green]OK[/green] Saved all outputs to {config['output_dir']}/")
     except Exception as e:
         console.print(f"[red]ERROR[/red] Error saving outputs: {e}")
-        return
+        resume_hint(console, journal)
+        return 1
+    journal.close()
     
-    # Create safe filename for display
-    safe_story_name = "".join(c if c.isalnum() or c in (' ', '-') else '' for c in story_name)
-    safe_story_name = safe_story_name.replace(' ', '_').lower()
+    cache_stats = llm_client.get_cache_stats()
+    cache_line = (
+        f"\n  • Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"(~{cache_stats['tokens_saved']} tokens saved)"
+        if cache_stats else ""
+    )
+    scheduler_stats = llm_client.get_scheduler_stats()
+    if scheduler_stats["retries"] or scheduler_stats["throttled_seconds"]:
+        cache_line += (
+            f"\n  • Rate limits: {scheduler_stats['retries']} retries "
+            f"({scheduler_stats['rate_limited']} × 429), "
+            f"{scheduler_stats['throttled_seconds'] + scheduler_stats['backoff_seconds']:.1f}s waiting"
+        )
+    token_breakdown = llm_client.get_token_breakdown()
+    if token_breakdown["prefix_reused_tokens"]:
+        cache_line += (
+            f"\n  • Prompt prefix: ~{token_breakdown['prefix_reused_tokens']} tokens resent as a shared "
+            f"prefix ({token_breakdown['cached_prompt_tokens']} served from the provider's cache)"
+        )
+    hedge_stats = llm_client.get_hedge_stats()
+    if hedge_stats.get("hedged"):
+        cache_line += (
+            f"\n  • Hedging: {hedge_stats['hedged']}/{hedge_stats['calls']} calls hedged, "
+            f"hedge won {hedge_stats['hedge_wins']}, {hedge_stats['hedge_tokens']} extra tokens"
+        )
+    if token_breakdown["candidate_tokens"]:
+        cache_line += f"\n  • Scene candidates: {token_breakdown['candidate_tokens']} tokens on unused samples"
+    
+    retry_stats = result["metadata"]["retry_policy"]
+    kept = retry_stats["accepted_with_warnings"] + retry_stats["accepted_over_budget"]
+    retry_line = (
+        f"{retry_stats['regenerations']} ({retry_stats['llm_calls_per_scene']} LLM calls per scene"
+        + (f", {kept} kept with warnings" if kept else "") + ")"
+    )
+    
+    stage_times = ", ".join(
+        f"{stage} {seconds:.1f}s" for stage, seconds in transformer.metrics.stage_seconds.items()
+    )
     
     # Show summary of what happened
     console.print("\n")
     console.print(Panel(
         f"""[bold green]Transformation Complete![/bold green]
-
+    
 [bold cyan]Story:[/bold cyan] {story_name} → {target_world_name}
-
+    
 [bold cyan]Outputs:[/bold cyan]
-  • outputs/story_dna_{safe_story_name}.json
-  • outputs/transformation_rules_{safe_story_name}.json
-  • outputs/final_story_{safe_story_name}.md ({len(story.split())} words)
-  • outputs/constraint_log_{safe_story_name}.json
-  • outputs/metadata_{safe_story_name}.json
-
+  • {writer.path('story_dna', 'json')}
+  • {writer.path('transformation_rules', 'json')}
+  • {writer.path('final_story', 'md')} ({len(story.split())} words)
+  • {writer.path('constraint_log', 'json')}
+  • {writer.path('metadata', 'json')}
+  • {writer.path('metrics', 'prom')}
+  • {journal.path} (run {journal.run_id})
+    
 [bold cyan]Statistics:[/bold cyan]
   • Scenes generated: {len(dna.plot_beats)}
   • Violations detected: {violation_summary["total_violations"]}
   • Scenes with violations: {violation_summary["scenes_with_violations"]}
+  • Scene regenerations: {retry_line}
   • Success rate (first try): {((len(dna.plot_beats) - violation_summary["scenes_with_violations"]) / len(dna.plot_beats) * 100):.1f}%
-
+    
 [bold cyan]Performance:[/bold cyan]
-  • Total tokens: ~{llm_client.get_token_usage()}
-  • Estimated cost: ${llm_client.estimate_cost():.4f}
-
+  • Total tokens: ~{llm_client.get_token_usage()} ({llm_client.prompt_tokens} prompt / {llm_client.completion_tokens} completion)
+  • Stage times: {stage_times}
+  • Estimated cost: ${llm_client.estimate_cost():.4f}{cache_line}
+    
 [bold yellow]Next:[/bold yellow]
-  • Read outputs/final_story_{safe_story_name}.md
-  • Review outputs/constraint_log_{safe_story_name}.json
-  • Check outputs/metadata_{safe_story_name}.json""",
+  • Read {writer.path('final_story', 'md')}
+  • Review {writer.path('constraint_log', 'json')}
+  • Check {writer.path('metadata', 'json')}""",
         title="Success",
         border_style="green"
     ))
-
+    return 0
+    
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Story Transformation - Service Version
+
+Keeps one warm LLM client and a pool of workers running, and takes jobs
+over a local HTTP/JSON API instead of one process per story.
+
+Usage:
+    python serve.py --port 8765 --workers 2
+
+    curl -X POST localhost:8765/jobs -d '{"story_file": "data/ramayana_story.txt",
+        "story_name": "Ramayana", "world": "Cyberpunk Silicon Valley 2045",
+        "world_name": "Cyberpunk 2045", "priority": "interactive"}'
+    curl localhost:8765/jobs/<id>              # poll
+    curl -N localhost:8765/jobs/<id>/events    # server-sent events, per scene
+"""
+
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from rich.console import Console
+
+from src.hedging import Hedger
+from src.llm_client import LLMClient
+from src.providers import router_from_env
+from src.response_cache import ResponseCache
+from src.retry_policy import retry_policy_from_env
+from src.service import TransformService
+from src.stage_cache import StageCache
+from src.violation_log import JsonlSink
+
+load_dotenv()
+console = Console()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Story transformation service")
+    parser.add_argument("--host", default=os.getenv("SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8765")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVICE_WORKERS", "2")),
+                        help="Transformations running at once")
+    parser.add_argument("--output-dir", default="outputs/service", help="Where per-job folders go")
+    parser.add_argument("--model", default=os.getenv("PRIMARY_MODEL", "llama-3.3-70b-versatile"))
+    parser.add_argument("--scene-mode", default=os.getenv("SCENE_MODE", "sequential"),
+                        choices=["sequential", "parallel"])
+    parser.add_argument("--max-retries", type=int, default=2, help="Scene regenerations on violations")
+    parser.add_argument("--cache-path", default=os.getenv("LLM_CACHE_PATH"),
+                        help="SQLite response cache shared by all jobs (optional)")
+    parser.add_argument("--stage-cache-dir", default=os.getenv("STAGE_CACHE_DIR"),
+                        help="DNA/rulebook stage cache directory (optional)")
+    parser.add_argument("--violation-log", default=os.getenv("VIOLATION_LOG_PATH"),
+                        help="Append every violation entry from every job to this JSONL file (optional)")
+    parser.add_argument("--hedge-percentile", type=float,
+                        default=float(os.getenv("HEDGE_PERCENTILE")) if os.getenv("HEDGE_PERCENTILE") else None,
+                        help="Send a duplicate scene request once one runs past this latency percentile (e.g. 0.9)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    router = router_from_env(args.model)
+    llm_client = LLMClient(
+        model=args.model,
+        cache=ResponseCache(args.cache_path) if args.cache_path else None,
+        backend=router,
+        hedger=Hedger(args.hedge_percentile) if args.hedge_percentile else None
+    )
+    service = TransformService(
+        llm_client,
+        workers=args.workers,
+        output_dir=args.output_dir,
+        transformer_kwargs={
+            "dna_temperature": float(os.getenv("DNA_TEMPERATURE", "0.3")),
+            "rulebook_temperature": float(os.getenv("RULEBOOK_TEMPERATURE", "0.4")),
+            "story_temperature": float(os.getenv("STORY_TEMPERATURE", "0.7")),
+            "max_retries": args.max_retries,
+            "scene_mode": args.scene_mode,
+            "stream_scenes": os.getenv("STREAM_SCENES", "false").lower() in ("1", "true", "yes"),
+            "local_repair": os.getenv("LOCAL_REPAIR", "true").lower() in ("1", "true", "yes"),
+            "context_budget": int(os.getenv("CONTEXT_BUDGET")) if os.getenv("CONTEXT_BUDGET") else None,
+            "dna_chunk_tokens": int(os.getenv("DNA_CHUNK_TOKENS")) if os.getenv("DNA_CHUNK_TOKENS") else None,
+            "json_field_retries": int(os.getenv("JSON_FIELD_RETRIES", "1")),
+            "violation_sink": JsonlSink(args.violation_log) if args.violation_log else None,
+            "stage_cache": StageCache(args.stage_cache_dir) if args.stage_cache_dir else None,
+            "retry_policy": retry_policy_from_env(),
+            "scene_candidates": int(os.getenv("SCENE_CANDIDATES", "1")),
+        }
+    )
+
+    backend = f"routing across {', '.join(s.label for s in router.specs)}" if router else args.model
+    console.print(f"[green]OK[/green] Serving on http://{args.host}:{args.port} "
+                  f"({args.workers} workers, {backend})")
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        console.print("[yellow]Stopped[/yellow]")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,20 +4,47 @@ Story Transformation System - Modular Implementation
 This package contains all the modular components for the story transformation system.
 """
 
-from src.models import (
-    Character,
-    PlotBeat,
-    StoryDNA,
-    CharacterMapping,
-    Rulebook,
-    ConstraintViolation,
-    TransformationMetadata
-)
-
-from src.llm_client import LLMClient
-from src.prompts import PromptTemplates
-from src.constraint_enforcer import ConstraintEnforcer
-from src.story_transformer import StoryTransformer
+import importlib
+
+# Public name -> module it lives in. Nothing is imported until it's used, so
+# `import src.providers` (or run.py --help) doesn't pull in every component.
+_EXPORTS = {
+    'Character': 'src.models',
+    'PlotBeat': 'src.models',
+    'StoryDNA': 'src.models',
+    'CharacterMapping': 'src.models',
+    'Rulebook': 'src.models',
+    'ConstraintViolation': 'src.models',
+    'TransformationMetadata': 'src.models',
+    'CallMetrics': 'src.models',
+    'PerformanceMetrics': 'src.models',
+    'LLMClient': 'src.llm_client',
+    'LLMBackend': 'src.backends',
+    'RecordingBackend': 'src.backends',
+    'ReplayBackend': 'src.backends',
+    'ResponseCache': 'src.response_cache',
+    'StageCache': 'src.stage_cache',
+    'MetricsRecorder': 'src.metrics',
+    'PromptTemplates': 'src.prompts',
+    'ConstraintEnforcer': 'src.constraint_enforcer',
+    'StoryTransformer': 'src.story_transformer',
+    'RunJournal': 'src.journal',
+    'RetryPolicy': 'src.retry_policy',
+    'SeverityRetryPolicy': 'src.retry_policy',
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'src' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
 
 __all__ = [
     # Data models
@@ -28,12 +55,23 @@ __all__ = [
     'Rulebook',
     'ConstraintViolation',
     'TransformationMetadata',
+    'CallMetrics',
+    'PerformanceMetrics',
     
     # Core components
     'LLMClient',
+    'LLMBackend',
+    'RecordingBackend',
+    'ReplayBackend',
+    'ResponseCache',
+    'StageCache',
+    'MetricsRecorder',
     'PromptTemplates',
     'ConstraintEnforcer',
     'StoryTransformer',
+    'RunJournal',
+    'RetryPolicy',
+    'SeverityRetryPolicy',
 ]
 
 __version__ = '1.0.0'
@@ -0,0 +1,343 @@
+"""
+Pluggable backends for LLMClient.
+
+A backend is whatever actually answers a chat-completions request. The
+default one talks to Groq (or any OpenAI-compatible SDK client). The other
+two exist so the pipeline can be benchmarked and regression-tested without
+live API calls: RecordingBackend saves real request/response pairs to a
+fixture file, and ReplayBackend plays them back - optionally with fake
+latency and scripted violations injected into scenes.
+"""
+
+import abc
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class LLMBackend(abc.ABC):
+    """
+    Interface LLMClient talks to. Both methods take OpenAI-style request
+    kwargs (model, messages, temperature, ...) and return an OpenAI-shaped
+    completion - or, with stream=True, an iterator of chunks. Both are
+    abstract: parallel scenes, candidates and batch jobs all go through
+    acreate, so a sync-only backend fails when it's built, not mid-run.
+    """
+
+    @abc.abstractmethod
+    def create(self, **request):
+        """Answer one request"""
+
+    @abc.abstractmethod
+    async def acreate(self, **request):
+        """Async version of create - stream=True gives an async iterator of chunks"""
+
+    def warm_up(self):
+        """Open connections ahead of the first request (nothing to do by default)"""
+
+
+_POOL: Dict[tuple, object] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def pooled_client(cls, **kwargs):
+    """
+    One SDK client per class + settings for the whole process. Each SDK
+    client owns an HTTP connection pool, so sharing it means every
+    transformer reuses the same warm connections instead of opening its own.
+    """
+    key = (cls.__module__, cls.__qualname__, tuple(sorted(kwargs.items())))
+    with _POOL_LOCK:
+        if key not in _POOL:
+            _POOL[key] = cls(**kwargs)
+        return _POOL[key]
+
+
+class ChatCompletionsBackend(LLMBackend):
+    """
+    Backend for SDK clients with a .chat.completions.create method (Groq,
+    OpenAI, anything OpenAI-compatible). The async client is built lazily
+    from async_factory so sync-only runs never pay for it.
+    """
+
+    def __init__(
+        self,
+        client,
+        async_client=None,
+        async_factory: Optional[Callable] = None
+    ):
+        self.client = client
+        self._async_client = async_client
+        self._async_factory = async_factory
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            if self._async_factory is None:
+                raise RuntimeError("No async client configured for this backend")
+            self._async_client = self._async_factory()
+        return self._async_client
+
+    def create(self, **request):
+        return self.client.chat.completions.create(**request)
+
+    def warm_up(self, timeout: float = 5.0):
+        # Cheapest authenticated call there is - leaves a live TLS connection
+        # in the client's pool for the first real request to pick up
+        self.client.with_options(timeout=timeout).models.list()
+
+    async def acreate(self, **request):
+        return await self.async_client.chat.completions.create(**request)
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def request_key(request: Dict) -> str:
+    """Exact match key - everything that affects the response"""
+    keyed = {k: request.get(k) for k in
+             ("model", "messages", "temperature", "max_tokens", "response_format", "seed")}
+    blob = json.dumps(keyed, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def loose_key(request: Dict) -> str:
+    """
+    Fallback key - kind of request (JSON or not) plus the first line of the
+    prompt, e.g. "text|Write Scene 3 for our cyberpunk transformation...".
+    Lets a replay survive small prompt changes and correction prompts.
+    """
+    prompt = request["messages"][-1]["content"]
+    first_line = prompt.strip().split("\n", 1)[0]
+    kind = "json" if request.get("response_format") else "text"
+    return f"{kind}|{first_line}"
+
+
+def _completion(content: str, usage: Dict):
+    """Minimal OpenAI-shaped completion object"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+        usage=SimpleNamespace(**usage),
+    )
+
+
+def _stream_chunks(content: str, usage: Dict, chunk_chars: int = 24) -> List:
+    """Split content into OpenAI-shaped stream chunks, usage on the last one"""
+    chunks = [
+        SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + chunk_chars]))],
+            usage=None,
+        )
+        for i in range(0, len(content), chunk_chars)
+    ]
+    chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(**usage)))
+    return chunks
+
+
+def chunk_usage(chunk):
+    """
+    Streamed usage shows up on the last chunk - Groq puts it under
+    x_groq, OpenAI-style servers under usage.
+    """
+    usage = getattr(chunk, "usage", None)
+    if usage is None:
+        usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+    return usage
+
+
+def _usage_dict(usage) -> Dict:
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+    }
+
+
+class RecordingBackend(LLMBackend):
+    """
+    Wraps a real backend and appends every request/response pair (with usage
+    and latency) to a JSONL fixture. Streams are recorded once they finish.
+    """
+
+    def __init__(self, inner: LLMBackend, fixture_path: str):
+        self.inner = inner
+        self.fixture_path = fixture_path
+        self._lock = threading.Lock()
+        if os.path.dirname(fixture_path):
+            os.makedirs(os.path.dirname(fixture_path), exist_ok=True)
+
+    def _write(self, request: Dict, content: str, usage: Dict, latency: float):
+        record = {
+            "key": request_key(request),
+            "loose_key": loose_key(request),
+            "request": {k: v for k, v in request.items() if k != "stream"},
+            "content": content,
+            "usage": usage,
+            "latency": round(latency, 4),
+        }
+        with self._lock:
+            with open(self.fixture_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def create(self, **request):
+        start = time.perf_counter()
+        response = self.inner.create(**request)
+        if request.get("stream"):
+            return self._record_stream(request, response, start)
+        self._write(request, response.choices[0].message.content,
+                    _usage_dict(getattr(response, "usage", None)), time.perf_counter() - start)
+        return response
+
+    def warm_up(self):
+        self.inner.warm_up()
+
+    def _record_stream(self, request: Dict, response, start: float) -> Iterator:
+        parts = []
+        usage = None
+        for chunk in response:
+            usage = chunk_usage(chunk) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        self._write(request, "".join(parts), _usage_dict(usage), time.perf_counter() - start)
+
+    async def acreate(self, **request):
+        start = time.perf_counter()
+        response = await self.inner.acreate(**request)
+        if request.get("stream"):
+            return self._arecord_stream(request, response, start)
+        self._write(request, response.choices[0].message.content,
+                    _usage_dict(getattr(response, "usage", None)), time.perf_counter() - start)
+        return response
+
+    async def _arecord_stream(self, request: Dict, response, start: float):
+        parts = []
+        usage = None
+        async for chunk in response:
+            usage = chunk_usage(chunk) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        self._write(request, "".join(parts), _usage_dict(usage), time.perf_counter() - start)
+
+
+class ReplayMiss(KeyError):
+    """No recorded response matches this request"""
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Answers requests from a recorded fixture - no network.
+
+    Lookup is exact-match first, then the loose key (request kind + first
+    prompt line). Repeated lookups of the same key walk through the recorded
+    responses in order and then stick on the last one.
+
+    latency: fixed seconds to sleep per call, or "recorded" to replay the
+    latency measured while recording (times latency_scale).
+    violation_script: one entry per plain-text (scene-like) response; a string
+    entry gets prepended to that response, None leaves it alone. Lets you
+    force e.g. "Romeo" into the first attempt of scene 2 to exercise retries.
+    """
+
+    def __init__(
+        self,
+        fixture_path: str,
+        latency=None,
+        latency_scale: float = 1.0,
+        violation_script: Optional[List[Optional[str]]] = None,
+        strict: bool = False
+    ):
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.violation_script = list(violation_script or [])
+        self.strict = strict
+        self.calls = 0
+
+        self._exact: Dict[str, List[Dict]] = {}
+        self._loose: Dict[str, List[Dict]] = {}
+        self._served: Dict[str, int] = {}
+        self._text_responses = 0
+        self._lock = threading.Lock()
+
+        with open(fixture_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._exact.setdefault(record["key"], []).append(record)
+                    self._loose.setdefault(record["loose_key"], []).append(record)
+
+    def _lookup(self, request: Dict) -> Dict:
+        with self._lock:
+            self.calls += 1
+            exact = request_key(request)
+            records = self._exact.get(exact)
+            served_key = "exact:" + exact
+            if records is None and not self.strict:
+                loose = loose_key(request)
+                records = self._loose.get(loose)
+                served_key = "loose:" + loose
+            if records is None:
+                raise ReplayMiss(f"No recorded response for: {loose_key(request)[:120]}")
+            n = self._served.get(served_key, 0)
+            self._served[served_key] = n + 1
+            record = records[min(n, len(records) - 1)]
+
+            content = record["content"]
+            if not request.get("response_format"):
+                if self._text_responses < len(self.violation_script):
+                    injected = self.violation_script[self._text_responses]
+                    if injected:
+                        content = f"{injected} {content}"
+                self._text_responses += 1
+            return {"content": content, "usage": record["usage"], "latency": record.get("latency", 0.0)}
+
+    def _delay(self, record: Dict) -> float:
+        if self.latency == "recorded":
+            return record["latency"] * self.latency_scale
+        return float(self.latency or 0.0)
+
+    def create(self, **request):
+        record = self._lookup(request)
+        delay = self._delay(record)
+        if delay:
+            time.sleep(delay)
+        if request.get("stream"):
+            return iter(_stream_chunks(record["content"], record["usage"]))
+        return _completion(record["content"], record["usage"])
+
+    async def acreate(self, **request):
+        record = self._lookup(request)
+        delay = self._delay(record)
+        if delay:
+            await asyncio.sleep(delay)
+        if request.get("stream"):
+            return _AsyncChunks(_stream_chunks(record["content"], record["usage"]))
+        return _completion(record["content"], record["usage"])
+
+
+class _AsyncChunks:
+    """Async iterator over pre-built chunks, with the close() streams have"""
+
+    def __init__(self, chunks: List):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
@@ -0,0 +1,231 @@
+"""
+Batch mode - transform a whole catalogue of stories into several worlds.
+
+Reads a manifest (JSONL or CSV) of story file / story name / world rows,
+extracts each story's DNA once, fans it out to all of that story's target
+worlds, and runs the jobs through a bounded pool of async workers. Every job
+gets its own output directory plus there's one aggregate summary at the end.
+
+Each job also keeps a run journal in its directory. With resume=True a
+rerun picks every job up where it stopped - DNA, rulebook and finished
+scenes come from the journal, so a crash costs at most the scenes that
+were in flight.
+"""
+
+import asyncio
+import csv
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from src.journal import JournalError, RunJournal
+from src.llm_client import LLMClient
+from src.models import StoryDNA
+from src.output_writer import safe_filename
+from src.story_transformer import StoryTransformer
+
+JOURNAL_FILE = "run_journal.jsonl"
+
+
+class BatchJob(BaseModel):
+    """One row of the manifest - a story going into one world"""
+    job_id: int = Field(description="Position in the manifest (1-based)")
+    story_file: str = Field(description="Path to the source story")
+    story_name: str = Field(description="Display name of the story")
+    world: str = Field(description="Target world description")
+    world_name: str = Field(description="Short name for the world")
+
+
+def load_manifest(path: str) -> List[BatchJob]:
+    """
+    Load jobs from a .jsonl or .csv manifest. Columns/keys: story_file,
+    world (required), story_name, world_name (optional). Relative story
+    paths are resolved against the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    for n, row in enumerate(rows, 1):
+        story_file = row.get("story_file") or ""
+        if story_file and not os.path.isabs(story_file):
+            story_file = os.path.join(base_dir, story_file)
+        default_name = os.path.splitext(os.path.basename(story_file))[0]
+        try:
+            jobs.append(BatchJob(
+                job_id=n,
+                story_file=story_file,
+                story_name=row.get("story_name") or default_name,
+                world=row.get("world") or "",
+                world_name=row.get("world_name") or f"world_{n}",
+            ))
+        except ValidationError as e:
+            raise ValueError(f"{path}: bad manifest row {n}: {e}") from e
+        if not jobs[-1].story_file or not jobs[-1].world:
+            raise ValueError(f"{path}: row {n} needs both 'story_file' and 'world'")
+    return jobs
+
+
+class BatchRunner:
+    """
+    Runs BatchJobs with at most `workers` transformations in flight.
+
+    client_factory builds a fresh LLMClient per job (and per DNA extraction)
+    so token counts stay per-job; pass a factory that shares a ResponseCache
+    if you want cross-job caching. transformer_kwargs go straight to every
+    StoryTransformer (temperatures, scene_mode, stage_cache, ...).
+    resume continues each job from the journal in its output directory
+    instead of starting it over.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], LLMClient],
+        workers: int = 4,
+        output_dir: str = "outputs/batch",
+        transformer_kwargs: Optional[Dict] = None,
+        resume: bool = False
+    ):
+        self.client_factory = client_factory
+        self.workers = workers
+        self.output_dir = output_dir
+        self.transformer_kwargs = transformer_kwargs or {}
+        self.resume = resume
+
+    def run(self, jobs: List[BatchJob]) -> Dict:
+        """Blocking entry point - runs the whole batch and returns the summary"""
+        return asyncio.run(self.arun(jobs))
+
+    async def arun(self, jobs: List[BatchJob]) -> Dict:
+        start = time.perf_counter()
+        slots = asyncio.Semaphore(self.workers)
+        dna_tasks: Dict[str, asyncio.Task] = {}
+        dna_tokens: Dict[str, int] = {}
+
+        async def extract(job: BatchJob) -> StoryDNA:
+            async with slots:
+                client = self.client_factory()
+                transformer = self._make_transformer(client, job)
+                try:
+                    return await transformer.aextract_dna_from_file(job.story_file)
+                finally:
+                    dna_tokens[job.story_file] = client.get_token_usage()
+
+        async def get_dna(job: BatchJob) -> StoryDNA:
+            # Every job for the same story awaits the same extraction
+            if job.story_file not in dna_tasks:
+                dna_tasks[job.story_file] = asyncio.ensure_future(extract(job))
+            return await dna_tasks[job.story_file]
+
+        async def run_job(job: BatchJob) -> Dict:
+            row = {
+                "job_id": job.job_id,
+                "story_name": job.story_name,
+                "world_name": job.world_name,
+                "output_dir": self._job_dir(job),
+            }
+            job_start = time.perf_counter()
+            client = None
+            journal = None
+            try:
+                journal = self._open_journal(job)
+                row["resumed_scenes"] = len(journal.scenes)
+                # Wait for DNA outside the worker slot, otherwise jobs waiting
+                # on an extraction could hold every slot and deadlock it
+                dna = journal.dna or await get_dna(job)
+                async with slots:
+                    job_start = time.perf_counter()
+                    client = self.client_factory()
+                    transformer = self._make_transformer(client, job, journal)
+                    result = await transformer.atransform_from_dna(dna, job.world)
+                    transformer.save_outputs(result, row["output_dir"])
+                metadata = result["metadata"]
+                row.update({
+                    "status": "ok",
+                    "scenes": metadata.total_scenes,
+                    "words": len(result["story"].split()),
+                    "violations": metadata.total_violations,
+                    "regenerations": metadata.retry_policy["regenerations"],
+                    "stage_seconds": metadata.performance.stage_seconds if metadata.performance else {},
+                })
+            except Exception as e:
+                row.update({"status": "failed", "error": f"{type(e).__name__}: {e}"})
+            finally:
+                if journal:
+                    journal.close()
+            row["tokens"] = client.get_token_usage() if client else 0
+            row["seconds"] = round(time.perf_counter() - job_start, 2)
+            return row
+
+        rows = await asyncio.gather(*[run_job(job) for job in jobs])
+        summary = self._summarize(rows, dna_tokens, time.perf_counter() - start)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, "batch_summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    def _make_transformer(
+        self, client: LLMClient, job: BatchJob, journal: Optional[RunJournal] = None
+    ) -> StoryTransformer:
+        return StoryTransformer(
+            llm_client=client,
+            source_story_name=job.story_name,
+            target_world_name=job.world_name,
+            journal=journal,
+            **self.transformer_kwargs
+        )
+
+    def _open_journal(self, job: BatchJob) -> RunJournal:
+        """This job's journal - the existing one when resuming and it's for the same job, else a new one"""
+        path = os.path.join(self._job_dir(job), JOURNAL_FILE)
+        if self.resume and os.path.isfile(path):
+            try:
+                journal = RunJournal.open(path)
+            except JournalError:
+                pass  # damaged beyond its last line - start the job over
+            else:
+                if journal.run.get("story_file") == job.story_file and journal.run.get("target_world") == job.world:
+                    return journal
+                journal.close()  # manifest changed under this job number
+        return RunJournal.create(
+            path,
+            run_id=os.path.basename(self._job_dir(job)),
+            job_id=job.job_id,
+            story_file=job.story_file,
+            story_name=job.story_name,
+            target_world=job.world,
+            target_world_name=job.world_name
+        )
+
+    def _job_dir(self, job: BatchJob) -> str:
+        name = f"{job.job_id:04d}_{safe_filename(job.story_name)}__{safe_filename(job.world_name)}"
+        return os.path.join(self.output_dir, name)
+
+    @staticmethod
+    def _summarize(rows: List[Dict], dna_tokens: Dict[str, int], wall_seconds: float) -> Dict:
+        ok = [r for r in rows if r["status"] == "ok"]
+        minutes = wall_seconds / 60 if wall_seconds > 0 else 0
+        total_scenes = sum(r["scenes"] for r in ok)
+        total_tokens = sum(r["tokens"] for r in rows) + sum(dna_tokens.values())
+        return {
+            "jobs": len(rows),
+            "succeeded": len(ok),
+            "failed": len(rows) - len(ok),
+            "dna_extractions": len(dna_tokens),
+            "wall_seconds": round(wall_seconds, 2),
+            "jobs_per_minute": round(len(ok) / minutes, 2) if minutes else 0.0,
+            "scenes_per_minute": round(total_scenes / minutes, 2) if minutes else 0.0,
+            "total_scenes": total_scenes,
+            "total_tokens": total_tokens,
+            "total_violations": sum(r["violations"] for r in ok),
+            "total_regenerations": sum(r["regenerations"] for r in ok),
+            "job_results": rows,
+        }
@@ -7,8 +7,69 @@ Took me a while to realize this was the right approach vs. trying to write
 the "perfect prompt."
 """
 
-from typing import List, Dict
+import re
+from typing import Callable, List, Dict, Optional, Tuple
+from src import metrics
 from src.models import Rulebook, ConstraintViolation
+from src.rule_matcher import (
+    StreamingMatcher,
+    compile_rulebook,
+    RuleMatch,
+    ANACHRONISMS,
+    ANACHRONISM,
+    CHARACTER,
+    FORBIDDEN,
+    TECH,
+)
+from src.retry_policy import RetryPolicy
+from src.structured import load_json
+from src.violation_log import ViolationLog
+
+
+# Sentence ends: terminal punctuation (plus closing quotes/brackets) before
+# whitespace, or a line break
+_SENTENCE_END = re.compile(r'[.!?]+["\'\u201d\u2019)\]]*(?=\s|$)|\n+')
+
+
+def _sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of each sentence, without surrounding whitespace"""
+    spans = []
+    start = 0
+    for m in _SENTENCE_END.finditer(text):
+        spans.append((start, m.end()))
+        start = m.end()
+    spans.append((start, len(text)))
+    
+    trimmed = []
+    for start, end in spans:
+        segment = text[start:end]
+        if not segment.strip():
+            continue
+        lead = len(segment) - len(segment.lstrip())
+        trail = len(segment) - len(segment.rstrip())
+        trimmed.append((start + lead, end - trail))
+    return trimmed
+
+
+class _CheckOnce:
+    """
+    accept hook for hedged calls that keeps its verdicts, so the text that
+    wins doesn't get checked a second time. One per generate call - a hedged
+    call can judge both copies, and parallel scenes share the enforcer.
+    """
+    
+    def __init__(self, check: Callable[[str], List[ConstraintViolation]]):
+        self._check = check
+        self._seen: Dict[str, List[ConstraintViolation]] = {}
+    
+    def accept(self, text: str) -> bool:
+        """Prefer the copy with no violations"""
+        return not self.violations(text)
+    
+    def violations(self, text: str) -> List[ConstraintViolation]:
+        if text not in self._seen:
+            self._seen[text] = self._check(text)
+        return self._seen[text]
 
 
 class ConstraintEnforcer:
@@ -20,10 +81,36 @@ class ConstraintEnforcer:
     specific feedback about what went wrong.
     """
     
-    def __init__(self, rulebook: Rulebook):
-        """Initialize with the rulebook to validate against"""
+    # In streaming mode, a violation this bad kills the stream right away
+    ABORT_SEVERITIES = ("high",)
+    
+    # Violations a sentence-level rewrite can fix (context needs the whole scene)
+    SENTENCE_FIXABLE = ("character_name_violation", "forbidden_element", "world_physics_violation")
+    
+    # If the bad sentences are more than this share of the scene, just regenerate
+    MAX_REWRITE_SHARE = 0.5
+    
+    def __init__(
+        self,
+        rulebook: Rulebook,
+        local_repair: bool = True,
+        violations_log: Optional[ViolationLog] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        """
+        Initialize with the rulebook to validate against.
+        local_repair tries cheap fixes (name substitution, sentence rewrites)
+        before falling back to regenerating the whole scene.
+        violations_log lets the caller size the in-memory log or give it a
+        JSONL sink; by default it keeps the last 200 entries in memory.
+        retry_policy decides whether what's left after local repair is worth
+        a regeneration (see src/retry_policy.py); default = retry on anything.
+        """
         self.rulebook = rulebook
-        self.violations_log = []  # track everything for debugging
+        self.local_repair = local_repair
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.matcher = compile_rulebook(rulebook)  # compile once per distinct rulebook, reuse everywhere
+        self.violations_log = violations_log or ViolationLog()  # track everything for debugging
         
     def check_constraints(self, text: str) -> List[ConstraintViolation]:
         """
@@ -34,12 +121,35 @@ class ConstraintEnforcer:
         string matching ended up being faster and good enough for this demo.
         Could revisit for production.
         """
+        with metrics.validation():
+            return self.violations_from_matches(self.matcher.find_matches(text))
+    
+    def find_matches(self, text: str) -> List[RuleMatch]:
+        """Raw rule hits with offsets - handy for highlighting or local fixes"""
+        return self.matcher.find_matches(text)
+    
+    def violations_from_matches(
+        self,
+        matches: List[RuleMatch],
+        include_context: bool = True
+    ) -> List[ConstraintViolation]:
+        """
+        Turn matcher hits into violations. Order is the same as the old
+        check-by-check loop: names, forbidden, anachronisms, context.
+        include_context=False skips the "no tech terms" check, which only
+        makes sense once the whole text is in.
+        """
+        hits = {}
+        for match in matches:
+            hits.setdefault(match.category, set()).add(match.term)
+        
         violations = []
         
         # Character name check - catches most violations (was ~30% before I added this)
         # Simple but effective - if I see "Rama" in cyberpunk text, something's wrong
+        found_names = hits.get(CHARACTER, set())
         for mapping in self.rulebook.character_mappings:
-            if mapping.original in text:
+            if mapping.original in found_names:
                 violations.append(ConstraintViolation(
                     type="character_name_violation",
                     severity="high",
@@ -48,9 +158,10 @@ class ConstraintEnforcer:
                 ))
         
         # Forbidden elements - things that don't belong in target world
-        # TODO: might need word boundary check for edge cases (like "magical" in "image-ical")
+        # Word boundaries now, so "magic" no longer fires inside "image-ical" style words
+        found_forbidden = hits.get(FORBIDDEN, set())
         for forbidden in self.rulebook.forbidden_elements:
-            if forbidden.lower() in text.lower():
+            if forbidden in found_forbidden:
                 violations.append(ConstraintViolation(
                     type="forbidden_element",
                     severity="high",
@@ -60,13 +171,9 @@ class ConstraintEnforcer:
         
         # World physics - check for anachronisms
         # In a 2045 tech world, words like "divine" or "blessed" are red flags
-        # Hardcoded list works fine but could pull from config in v2
-        anachronisms = [
-            "divine", "gods", "supernatural", "mystical", 
-            "enchanted", "blessed", "cursed", "magical"
-        ]
-        for term in anachronisms:
-            if term.lower() in text.lower():
+        found_anachronisms = hits.get(ANACHRONISM, set())
+        for term in ANACHRONISMS:
+            if term in found_anachronisms:
                 violations.append(ConstraintViolation(
                     type="world_physics_violation",
                     severity="medium",
@@ -76,20 +183,14 @@ class ConstraintEnforcer:
         
         # Context check - make sure it's grounded in the target world
         # This one's a bit loose but catches scenes that drift too abstract
-        for constraint in self.rulebook.constraints:
-            if "corporate" in constraint.lower() or "tech" in constraint.lower():
-                tech_terms = [
-                    "company", "corporation", "corp", "tech", "startup", 
-                    "ai", "algorithm", "data", "software", "hardware",
-                    "code", "digital", "cyber", "network"
-                ]
-                if not any(term in text.lower() for term in tech_terms):
-                    violations.append(ConstraintViolation(
-                        type="context_violation",
-                        severity="low",
-                        detail=f"Missing corporate/tech context",
-                        suggestion="Add tech elements to ground it in 2045 Silicon Valley"
-                    ))
+        if include_context and TECH not in hits:
+            for _ in range(self.matcher.tech_constraint_count):
+                violations.append(ConstraintViolation(
+                    type="context_violation",
+                    severity="low",
+                    detail=f"Missing corporate/tech context",
+                    suggestion="Add tech elements to ground it in 2045 Silicon Valley"
+                ))
         
         return violations
     
@@ -99,7 +200,10 @@ class ConstraintEnforcer:
         base_prompt: str,
         scene_number: int,
         temperature: float = 0.7,
-        max_retries: int = 2
+        max_retries: int = 2,
+        stream: bool = False,
+        system: Optional[str] = None,
+        candidates: int = 1
     ) -> tuple[str, int]:
         """
         Generate text and validate it. If violations found, regenerate with feedback.
@@ -110,62 +214,451 @@ class ConstraintEnforcer:
         3. If violations, add them to prompt and regenerate
         4. Log everything for transparency
         
+        With stream=True the text is checked as it arrives and the stream is
+        cut as soon as a high-severity violation shows up, so the retry starts
+        straight away. The last attempt always runs to completion so we never
+        hand back half a scene.
+        
+        system (the per-rulebook scene rules) goes out unchanged on every
+        attempt; retries only change the user message, so the shared prefix
+        stays cacheable on the provider side.
+        
         Returns: (generated_text, attempts_taken)
-        """
-        from src.prompts import PromptTemplates
         
+        What happens to a scene that still has violations is up to
+        retry_policy: regenerate (possibly at another temperature or with
+        another model), or keep it and note why in the violation log.
+        
+        With candidates > 1 every attempt samples that many scenes at once
+        and carries on with the least bad one (see _best_candidate), so a
+        correction round trip is only needed when all of them fail. It
+        takes the place of stream for those attempts.
+        """
         prompt = base_prompt
+        attempt_temperature, attempt_model = temperature, None
         
         for attempt in range(max_retries + 1):
-            generated_text = llm_client.generate(
-                prompt=prompt,
-                temperature=temperature
-            )
-            
-            violations = self.check_constraints(generated_text)
+            aborted = False
+            if candidates > 1:
+                generated_text, violations = self._best_candidate(llm_client.generate_candidates(
+                    prompt=prompt,
+                    n=candidates,
+                    temperature=attempt_temperature,
+                    check=self.check_constraints,
+                    system=system,
+                    model=attempt_model
+                ))
+            elif stream:
+                generated_text, violations, aborted = self._stream_attempt(
+                    llm_client, prompt, attempt_temperature, system=system, model=attempt_model,
+                    allow_abort=attempt < max_retries and self.retry_policy.can_retry()
+                )
+            else:
+                checked = _CheckOnce(self.check_constraints)
+                generated_text = llm_client.generate(
+                    prompt=prompt,
+                    temperature=attempt_temperature,
+                    accept=checked.accept,
+                    system=system,
+                    model=attempt_model
+                )
+                violations = checked.violations(generated_text)
             
             if not violations:
                 # Clean generation, we're done
                 return generated_text, attempt + 1
             
-            # Log what went wrong for debugging
-            self.violations_log.append({
-                "scene": scene_number,
-                "attempt": attempt + 1,
-                "violations": [v.model_dump() for v in violations],
-                "text_preview": generated_text[:200] + "..."
-            })
+            remaining, draft = violations, None
+            if self.local_repair and not aborted:
+                repaired, remaining, method = self.repair(
+                    llm_client, generated_text, violations, attempt_temperature, attempt_model
+                )
+                if not remaining:
+                    self._log_violations(scene_number, attempt + 1, violations,
+                                         generated_text, repaired_by=method)
+                    return repaired, attempt + 1
+                generated_text = draft = repaired  # partly fixed is still better to fall back on
+            
+            decision = self.retry_policy.decide(remaining, attempt + 1, max_retries, aborted)
+            self._log_violations(scene_number, attempt + 1, violations, generated_text, aborted,
+                                 accepted=None if decision.retry else decision.reason)
+            if not decision.retry:
+                return generated_text, attempt + 1
             
-            if attempt < max_retries:
-                # Build correction prompt with specific violation details
-                prompt = PromptTemplates.constraint_correction(
-                    base_prompt,
-                    [v.model_dump() for v in violations]
+            prompt = self._correction_prompt(base_prompt, remaining, draft)
+            attempt_temperature, attempt_model = self.retry_policy.settings_for(attempt + 1, temperature)
+        
+        # The policy stops at max_retries, so this is only a safety net
+        return generated_text, max_retries + 1
+    
+    async def agenerate_with_enforcement(
+        self,
+        llm_client,
+        base_prompt: str,
+        scene_number: int,
+        temperature: float = 0.7,
+        max_retries: int = 2,
+        stream: bool = False,
+        system: Optional[str] = None,
+        candidates: int = 1
+    ) -> tuple[str, int]:
+        """Async version of generate_with_enforcement - same loop, awaits the LLM"""
+        prompt = base_prompt
+        attempt_temperature, attempt_model = temperature, None
+        
+        for attempt in range(max_retries + 1):
+            aborted = False
+            if candidates > 1:
+                generated_text, violations = self._best_candidate(await llm_client.agenerate_candidates(
+                    prompt=prompt,
+                    n=candidates,
+                    temperature=attempt_temperature,
+                    check=self.check_constraints,
+                    system=system,
+                    model=attempt_model
+                ))
+            elif stream:
+                generated_text, violations, aborted = await self._astream_attempt(
+                    llm_client, prompt, attempt_temperature, system=system, model=attempt_model,
+                    allow_abort=attempt < max_retries and self.retry_policy.can_retry()
                 )
+            else:
+                checked = _CheckOnce(self.check_constraints)
+                generated_text = await llm_client.agenerate(
+                    prompt=prompt,
+                    temperature=attempt_temperature,
+                    accept=checked.accept,
+                    system=system,
+                    model=attempt_model
+                )
+                violations = checked.violations(generated_text)
+            
+            if not violations:
+                return generated_text, attempt + 1
+            
+            remaining, draft = violations, None
+            if self.local_repair and not aborted:
+                repaired, remaining, method = await self.arepair(
+                    llm_client, generated_text, violations, attempt_temperature, attempt_model
+                )
+                if not remaining:
+                    self._log_violations(scene_number, attempt + 1, violations,
+                                         generated_text, repaired_by=method)
+                    return repaired, attempt + 1
+                generated_text = draft = repaired
+            
+            decision = self.retry_policy.decide(remaining, attempt + 1, max_retries, aborted)
+            self._log_violations(scene_number, attempt + 1, violations, generated_text, aborted,
+                                 accepted=None if decision.retry else decision.reason)
+            if not decision.retry:
+                return generated_text, attempt + 1
+            
+            prompt = self._correction_prompt(base_prompt, remaining, draft)
+            attempt_temperature, attempt_model = self.retry_policy.settings_for(attempt + 1, temperature)
         
-        # If we get here, we hit max retries. Return what we have.
-        # In practice with good prompts, this rarely happens.
         return generated_text, max_retries + 1
     
-    def get_violation_summary(self) -> Dict:
-        """Get summary statistics of violations caught"""
-        total_violations = sum(len(log["violations"]) for log in self.violations_log)
-        scenes_with_violations = len(self.violations_log)
-        
-        # Group by violation type
-        violation_types = {}
-        for log in self.violations_log:
-            for violation in log["violations"]:
-                vtype = violation["type"]
-                violation_types[vtype] = violation_types.get(vtype, 0) + 1
-        
-        return {
-            "total_violations": total_violations,
-            "scenes_with_violations": scenes_with_violations,
-            "violation_types": violation_types,
-            "detailed_log": self.violations_log
+    def repair(
+        self,
+        llm_client,
+        text: str,
+        violations: List[ConstraintViolation],
+        temperature: float = 0.7,
+        model: Optional[str] = None
+    ) -> Tuple[str, List[ConstraintViolation], Optional[str]]:
+        """
+        Try to fix a scene without regenerating it:
+        1. Swap original character names for their new ones (free)
+        2. Rewrite just the offending sentences with a small LLM call
+        
+        Returns (text, violations_left, method) - method is "substitution",
+        "sentence_rewrite" or None if nothing was tried. temperature and
+        model are the current attempt's, so a retry policy's escalation
+        applies to the rewrite call too.
+        """
+        text, violations, method = self._substitute_step(text, violations)
+        if not violations:
+            return text, violations, method
+        
+        plan = self._rewrite_plan(text, violations)
+        if plan is None:
+            return text, violations, method
+        spans, prompt, max_tokens = plan
+        response = llm_client.generate_json(
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            model=model
+        )
+        return self._finish_rewrite(text, violations, method, spans, response)
+    
+    async def arepair(
+        self,
+        llm_client,
+        text: str,
+        violations: List[ConstraintViolation],
+        temperature: float = 0.7,
+        model: Optional[str] = None
+    ) -> Tuple[str, List[ConstraintViolation], Optional[str]]:
+        """Async version of repair"""
+        text, violations, method = self._substitute_step(text, violations)
+        if not violations:
+            return text, violations, method
+        
+        plan = self._rewrite_plan(text, violations)
+        if plan is None:
+            return text, violations, method
+        spans, prompt, max_tokens = plan
+        response = await llm_client.agenerate_json(
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            model=model
+        )
+        return self._finish_rewrite(text, violations, method, spans, response)
+    
+    def substitute_names(self, text: str) -> str:
+        """
+        Replace original character names with their new-world names.
+        Possessives come along for free ("Rama's" -> "Ram Chen's") since only
+        the name itself is swapped; ALL-CAPS names get an ALL-CAPS replacement.
+        Lowercase hits are left alone - "will" isn't necessarily "Will".
+        """
+        new_names = {m.original: m.new_world for m in self.rulebook.character_mappings}
+        parts = []
+        pos = 0
+        for hit in self.matcher.find_matches(text, exact_names=False):
+            if hit.category != CHARACTER or hit.start < pos:
+                continue  # not a name, or overlaps one we already replaced
+            found = text[hit.start:hit.end]
+            replacement = new_names[hit.term]
+            if found != hit.term:
+                if found != hit.term.upper():
+                    continue
+                replacement = replacement.upper()
+            parts.append(text[pos:hit.start])
+            parts.append(replacement)
+            pos = hit.end
+        parts.append(text[pos:])
+        return "".join(parts)
+    
+    def _substitute_step(
+        self,
+        text: str,
+        violations: List[ConstraintViolation]
+    ) -> Tuple[str, List[ConstraintViolation], Optional[str]]:
+        if not any(v.type == "character_name_violation" for v in violations):
+            return text, violations, None
+        text = self.substitute_names(text)
+        return text, self.check_constraints(text), "substitution"
+    
+    def _rewrite_plan(
+        self,
+        text: str,
+        violations: List[ConstraintViolation]
+    ) -> Optional[Tuple[List[Tuple[int, int]], str, int]]:
+        """
+        Work out which sentences to send for a rewrite. None means a local
+        rewrite can't help (e.g. missing tech context) or isn't worth it.
+        """
+        from src.prompts import PromptTemplates
+        
+        if any(v.type not in self.SENTENCE_FIXABLE for v in violations):
+            return None
+        hit_starts = [
+            m.start for m in self.matcher.find_matches(text)
+            if m.category in (CHARACTER, FORBIDDEN, ANACHRONISM)
+        ]
+        spans = [
+            span for span in _sentence_spans(text)
+            if any(span[0] <= start < span[1] for start in hit_starts)
+        ]
+        if not spans:
+            return None
+        chars = sum(end - start for start, end in spans)
+        if chars > len(text) * self.MAX_REWRITE_SHARE:
+            return None
+        
+        prompt = PromptTemplates.sentence_rewrite(
+            sentences=[text[start:end] for start, end in spans],
+            violations=[v.model_dump() for v in violations],
+            character_mappings=[m.model_dump() for m in self.rulebook.character_mappings],
+            forbidden=self.rulebook.forbidden_elements
+        )
+        # Rewrites are about as long as the input; ~4 chars per token plus JSON overhead
+        max_tokens = chars // 2 + 100
+        return spans, prompt, max_tokens
+    
+    def _finish_rewrite(
+        self,
+        text: str,
+        violations: List[ConstraintViolation],
+        method: Optional[str],
+        spans: List[Tuple[int, int]],
+        response: str
+    ) -> Tuple[str, List[ConstraintViolation], Optional[str]]:
+        """Splice rewritten sentences back in and re-check"""
+        try:
+            rewritten = load_json(response).get("sentences")
+        except (ValueError, AttributeError):
+            rewritten = None
+        if not isinstance(rewritten, list) or len(rewritten) != len(spans):
+            return text, violations, method  # model didn't follow the format
+        
+        # Back to front so earlier offsets stay valid
+        for (start, end), sentence in sorted(zip(spans, rewritten), reverse=True):
+            text = text[:start] + str(sentence).strip() + text[end:]
+        return text, self.check_constraints(text), "sentence_rewrite"
+    
+    def _stream_attempt(
+        self,
+        llm_client,
+        prompt: str,
+        temperature: float,
+        allow_abort: bool,
+        system: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Tuple[str, List[ConstraintViolation], bool]:
+        """
+        One streamed attempt. Returns (text, violations, aborted) - if aborted
+        the text is only what arrived before we pulled the plug.
+        """
+        matcher = StreamingMatcher(self.matcher)
+        matches = []
+        chunks = llm_client.stream(prompt=prompt, temperature=temperature, system=system, model=model)
+        try:
+            for chunk in chunks:
+                violations = self._feed_chunk(matcher, matches, chunk, allow_abort)
+                if violations:
+                    return matcher.text, violations, True
+        finally:
+            chunks.close()  # no-op if finished, otherwise cancels the HTTP stream
+        return matcher.text, self._finish_stream(matcher, matches), False
+    
+    async def _astream_attempt(
+        self,
+        llm_client,
+        prompt: str,
+        temperature: float,
+        allow_abort: bool,
+        system: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Tuple[str, List[ConstraintViolation], bool]:
+        """Async version of _stream_attempt"""
+        matcher = StreamingMatcher(self.matcher)
+        matches = []
+        chunks = llm_client.astream(prompt=prompt, temperature=temperature, system=system, model=model)
+        try:
+            async for chunk in chunks:
+                violations = self._feed_chunk(matcher, matches, chunk, allow_abort)
+                if violations:
+                    return matcher.text, violations, True
+        finally:
+            await chunks.aclose()
+        return matcher.text, self._finish_stream(matcher, matches), False
+    
+    def _feed_chunk(
+        self,
+        matcher: StreamingMatcher,
+        matches: List[RuleMatch],
+        chunk: str,
+        allow_abort: bool
+    ) -> List[ConstraintViolation]:
+        """Check a streamed chunk - returns violations only if we should abort"""
+        with metrics.validation():
+            found = matcher.feed(chunk)
+            if not found:
+                return []
+            matches.extend(found)
+            return self._abort_violations(matches, allow_abort)
+    
+    def _finish_stream(
+        self,
+        matcher: StreamingMatcher,
+        matches: List[RuleMatch]
+    ) -> List[ConstraintViolation]:
+        with metrics.validation():
+            matches.extend(matcher.finish())
+            return self.violations_from_matches(matches)
+    
+    @staticmethod
+    def _best_candidate(
+        checked: List[Tuple[str, List[ConstraintViolation]]]
+    ) -> Tuple[str, List[ConstraintViolation]]:
+        """
+        Of (text, violations) samples: fewest high-severity violations, then
+        fewest medium, then fewest low - one high is worse than any number
+        of lows. Ties go to the sample that finished first.
+        """
+        return min(checked, key=lambda item: tuple(
+            sum(1 for v in item[1] if v.severity == severity) for severity in ("high", "medium", "low")
+        ))
+    
+    def _abort_violations(
+        self,
+        matches: List[RuleMatch],
+        allow_abort: bool
+    ) -> List[ConstraintViolation]:
+        """Violations so far if any is bad enough to stop the stream, else []"""
+        if not allow_abort:
+            return []
+        violations = self.violations_from_matches(matches, include_context=False)
+        if any(v.severity in self.ABORT_SEVERITIES for v in violations):
+            return violations
+        return []
+    
+    def _log_violations(
+        self,
+        scene_number: int,
+        attempt: int,
+        violations: List[ConstraintViolation],
+        generated_text: str,
+        aborted: bool = False,
+        repaired_by: Optional[str] = None,
+        accepted: Optional[str] = None
+    ):
+        """Log what went wrong for debugging"""
+        entry = {
+            "scene": scene_number,
+            "attempt": attempt,
+            "violations": [v.model_dump() for v in violations],
+            "text_preview": generated_text[:200] + "..."
         }
+        if aborted:
+            entry["aborted_early"] = True  # stream was cut at this point
+        if repaired_by:
+            entry["repaired_by"] = repaired_by  # fixed locally, no regeneration
+        if accepted:
+            entry["accepted"] = accepted  # kept with these violations - the retry policy's reason
+        self.violations_log.record(entry)
+    
+    def _correction_prompt(
+        self,
+        base_prompt: str,
+        violations: List[ConstraintViolation],
+        draft: Optional[str] = None
+    ) -> str:
+        """
+        Build correction prompt with specific violation details. draft is
+        the locally repaired scene, if repair ran - the retry revises it
+        instead of starting over.
+        """
+        from src.prompts import PromptTemplates
+        
+        return PromptTemplates.constraint_correction(
+            base_prompt,
+            [v.model_dump() for v in violations],
+            draft
+        )
+    
+    def get_violation_summary(self) -> Dict:
+        """
+        Get summary statistics of violations caught. Counts come from
+        running counters, so this is cheap however much has been logged;
+        detailed_log only has the most recent entries.
+        """
+        return self.violations_log.summary()
     
     def clear_log(self):
         """Clear violation log (useful for multiple runs)"""
-        self.violations_log = []
+        self.violations_log.clear()
@@ -0,0 +1,120 @@
+"""
+Context manager for sequential scene generation.
+
+Passing the raw last 2 scenes meant prompts grew with scene length, and
+anything older than 2 scenes was just gone. This keeps a rolling compressed
+summary of everything older plus the most recent scene text verbatim, and
+trims the whole thing to a token budget so prompts stay the same size no
+matter how many plot beats there are.
+"""
+
+import re
+from typing import List, Optional
+
+from src.prompts import PromptTemplates
+from src.tokens import estimate_tokens
+
+
+def _trim_front(text: str, max_tokens: int) -> str:
+    """Keep the END of text within max_tokens, cutting at a sentence start if possible"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    keep = text[-max_tokens * 4:]
+    while keep and estimate_tokens(keep) > max_tokens:
+        keep = keep[len(keep) // 10 or 1:]
+    sentence = re.search(r"[.!?]\s+", keep)
+    if sentence and sentence.end() < len(keep) // 2:
+        keep = keep[sentence.end():]
+    return "..." + keep
+
+
+class StoryContext:
+    """
+    Rolling story memory: summary of older scenes + verbatim recent tail.
+
+    add_scene() pushes a finished scene. Once the verbatim tail goes over
+    tail_tokens, the oldest scenes get folded into the summary with one small
+    LLM call (summary capped around summary_tokens). render() returns the
+    context block trimmed to whatever token budget the caller has left.
+    """
+
+    def __init__(
+        self,
+        llm_client,
+        tail_tokens: int = 900,
+        summary_tokens: int = 350,
+        temperature: float = 0.3
+    ):
+        self.llm_client = llm_client
+        self.tail_tokens = tail_tokens
+        self.summary_tokens = summary_tokens
+        self.temperature = temperature
+
+        self.summary = ""
+        self.tail: List[str] = []
+        self.scenes_summarized = 0
+
+    def add_scene(self, scene_text: str):
+        """Push a finished scene, summarizing older ones if the tail is too big"""
+        to_fold = self._push(scene_text)
+        if to_fold:
+            self.summary = self.llm_client.generate(
+                prompt=self._summary_prompt(to_fold),
+                temperature=self.temperature,
+                max_tokens=self.summary_tokens
+            ).strip()
+
+    async def aadd_scene(self, scene_text: str):
+        """Async version of add_scene"""
+        to_fold = self._push(scene_text)
+        if to_fold:
+            summary = await self.llm_client.agenerate(
+                prompt=self._summary_prompt(to_fold),
+                temperature=self.temperature,
+                max_tokens=self.summary_tokens
+            )
+            self.summary = summary.strip()
+
+    def _push(self, scene_text: str) -> List[str]:
+        """Add to the tail and pop off whatever no longer fits (always keeps the newest)"""
+        self.tail.append(scene_text)
+        to_fold = []
+        while len(self.tail) > 1 and estimate_tokens("\n\n".join(self.tail)) > self.tail_tokens:
+            to_fold.append(self.tail.pop(0))
+        self.scenes_summarized += len(to_fold)
+        return to_fold
+
+    def _summary_prompt(self, scenes: List[str]) -> str:
+        return PromptTemplates.rolling_summary(
+            previous_summary=self.summary,
+            new_scenes=scenes,
+            max_words=int(self.summary_tokens * 0.6)
+        )
+
+    def render(self, max_tokens: Optional[int] = None) -> str:
+        """Context block for the next scene prompt, trimmed to max_tokens"""
+        if not self.summary and not self.tail:
+            return "This is the opening scene."
+
+        header = "STORY SO FAR (summary of earlier scenes):\n"
+        tail_label = "MOST RECENT SCENE:" if len(self.tail) == 1 else "MOST RECENT SCENES:"
+        summary = self.summary
+        tail_text = "\n\n".join(self.tail)
+
+        if max_tokens is not None:
+            # Recent text matters most: the tail always gets at least 3/4 of
+            # the budget and the summary gets trimmed to whatever is left
+            labels = estimate_tokens(header) + estimate_tokens(tail_label)
+            room = max_tokens - labels
+            tail_budget = max(room - estimate_tokens(summary), (room * 3) // 4)
+            tail_text = _trim_front(tail_text, tail_budget)
+            summary = _trim_front(summary, room - estimate_tokens(tail_text))
+
+        blocks = []
+        if summary:
+            blocks.append(header + summary)
+        if tail_text:
+            blocks.append(f"{tail_label}\n{tail_text}")
+        return "\n\n".join(blocks)
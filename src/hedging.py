@@ -0,0 +1,212 @@
+"""
+Hedged requests - trim tail latency by racing a duplicate.
+
+With 6+ scene calls per story plus retries, one slow completion decides
+how long the whole transform takes. The Hedger learns the latency
+distribution of recent calls (per kind of call) and, when a request is
+still running past the chosen percentile, sends a second copy. Whichever
+comes back first with an acceptable answer wins; the other one is cancelled
+(async) or left to finish in the background and ignored (sync - a blocking
+HTTP call can't be interrupted from another thread).
+
+Tokens burned by the losing copy are reported separately through on_loser,
+so the latency win can be weighed against what it costs.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    percentile: hedge once a call runs longer than this share of recent
+    calls of the same kind took (0.9 = slowest 10% get a hedge).
+    kinds: which calls to hedge - plain "text" (scenes) by default, since
+    the big JSON stage calls are few and expensive to duplicate.
+    No hedging until min_samples latencies of that kind have been seen.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.9,
+        kinds: Iterable[str] = ("text",),
+        min_samples: int = 8,
+        window: int = 200,
+        min_delay: float = 0.0,
+        max_workers: int = 16
+    ):
+        if not 0 < percentile < 1:
+            raise ValueError(f"percentile must be between 0 and 1, got {percentile}")
+        self.percentile = percentile
+        self.kinds = tuple(kinds)
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._stats = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    def observe(self, kind: str, latency: float):
+        with self._lock:
+            self._latencies.setdefault(kind, deque(maxlen=self.window)).append(latency)
+
+    def delay_for(self, kind: str) -> Optional[float]:
+        """How long to wait before hedging this kind of call, None = don't"""
+        if kind not in self.kinds:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get(kind, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = max(0, math.ceil(self.percentile * len(samples)) - 1)
+        return max(self.min_delay, samples[index])
+
+    def _count(self, hedged: bool, hedge_won: bool = False):
+        with self._lock:
+            self._stats["calls"] += 1
+            if hedged:
+                self._stats["hedged"] += 1
+            if hedge_won:
+                self._stats["hedge_wins"] += 1
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+            return self._pool
+
+    def run(
+        self,
+        send: Callable[[], T],
+        kind: str,
+        accept: Optional[Callable[[T], bool]] = None,
+        on_loser: Optional[Callable[[Optional[T]], None]] = None
+    ) -> Tuple[T, bool]:
+        """
+        Call send(), hedging if it runs long. Returns (response, hedged).
+        accept lets the caller reject a response that came back first (e.g.
+        a scene full of violations) in favour of the other copy; if neither
+        is acceptable the first one back is returned anyway.
+        """
+        delay = self.delay_for(kind)
+        started = time.perf_counter()
+        if delay is None:
+            response = send()
+            self.observe(kind, time.perf_counter() - started)
+            self._count(hedged=False)
+            return response, False
+
+        pool = self._get_pool()
+        primary = pool.submit(send)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            self.observe(kind, time.perf_counter() - started)
+            self._count(hedged=False)
+            return primary.result(), False
+
+        hedge = pool.submit(send)
+        primary.add_done_callback(lambda _: self.observe(kind, time.perf_counter() - started))
+        winner, fallback = self._pick(wait_for=[primary, hedge], accept=accept)
+        chosen = winner or fallback
+        loser = hedge if chosen is primary else primary
+        self._count(hedged=True, hedge_won=chosen is hedge)
+        if on_loser:
+            # The loser may still be running - settle its tokens whenever it's done
+            loser.add_done_callback(lambda f: on_loser(None if f.exception() else f.result()))
+        return chosen.result(), True
+
+    @staticmethod
+    def _pick(wait_for, accept) -> Tuple[Optional[Future], Optional[Future]]:
+        """(first acceptable future, first successful one) - raises if both failed"""
+        pending = set(wait_for)
+        fallback = None
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=wait_for.index):
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                if accept is None or accept(future.result()):
+                    return future, fallback or future
+                fallback = fallback or future
+        if fallback is None:
+            raise error
+        return None, fallback
+
+    async def arun(
+        self,
+        send: Callable[[], Awaitable[T]],
+        kind: str,
+        accept: Optional[Callable[[T], bool]] = None,
+        on_loser: Optional[Callable[[Optional[T]], None]] = None
+    ) -> Tuple[T, bool]:
+        """Async version of run - the losing copy really gets cancelled"""
+        delay = self.delay_for(kind)
+        started = time.perf_counter()
+        if delay is None:
+            response = await send()
+            self.observe(kind, time.perf_counter() - started)
+            self._count(hedged=False)
+            return response, False
+
+        primary = asyncio.ensure_future(send())
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                self.observe(kind, time.perf_counter() - started)
+                self._count(hedged=False)
+                return primary.result(), False
+
+            hedge = asyncio.ensure_future(send())
+            tasks = [primary, hedge]
+            pending = set(tasks)
+            chosen = fallback = None
+            error = None
+            while pending and chosen is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif accept is None or accept(task.result()):
+                        chosen = task
+                        break
+                    else:
+                        fallback = fallback or task
+            chosen = chosen or fallback
+            if chosen is None:
+                raise error
+
+            # Primary's latency is at least as long as it has been running
+            self.observe(kind, time.perf_counter() - started)
+            self._count(hedged=True, hedge_won=chosen is hedge)
+            if on_loser:
+                loser = hedge if chosen is primary else primary
+                finished = loser.done() and not loser.cancelled() and loser.exception() is None
+                on_loser(loser.result() if finished else None)
+            return chosen.result(), True
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            delays = {kind: None for kind in self.kinds}
+        for kind in delays:
+            delay = self.delay_for(kind)
+            delays[kind] = round(delay, 3) if delay is not None else None
+        stats["hedge_delay"] = delays
+        return stats
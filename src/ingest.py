@@ -0,0 +1,187 @@
+"""
+Chunked ingestion for novel-length sources.
+
+DNA extraction used to put the whole story into one prompt, which is fine
+for the condensed stories in data/ but falls over once a source is bigger
+than the model's context window. For those we map-reduce instead:
+
+- split the source into paragraph-aligned chunks (files are memory-mapped
+  and cut in place, so a novel never has to be read into one string)
+- extract partial DNA from every chunk concurrently
+- merge the partials locally into one StoryDNA - characters deduplicated by
+  name, themes by frequency, plot beats kept in story order
+
+The merge is plain Python, no extra LLM call, so Stage 1 takes about as
+long as the slowest chunk rather than growing with the length of the book.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+from collections import Counter
+from typing import Iterator, List, Sequence
+
+from src.models import PlotBeat, StoryDNA
+
+# Matches the ~4 chars/token floor in tokens.estimate_tokens
+CHARS_PER_TOKEN = 4
+
+# Where to cut a chunk, best first: paragraph break, line break, space
+_STR_SEPARATORS = ("\n\n", "\n", " ")
+_BYTE_SEPARATORS = (b"\n\n", b"\n", b" ")
+
+
+def _chunk_bounds(buf, target: int, separators, align=None) -> Iterator[tuple]:
+    """
+    (start, end) spans of at most ~target units, cut at the last separator
+    in the second half of each window. Works on str, bytes and mmap alike.
+    align(buf, start, end) fixes up a hard cut when there's no separator.
+    """
+    size = len(buf)
+    start = 0
+    while start < size:
+        end = min(size, start + target)
+        if end < size:
+            for separator in separators:
+                cut = buf.rfind(separator, start + target // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+            else:
+                if align:
+                    end = align(buf, start, end)
+        yield start, end
+        start = end
+
+
+def split_story(text: str, chunk_tokens: int) -> List[str]:
+    """Split an in-memory story into paragraph-aligned chunks of ~chunk_tokens"""
+    target = chunk_tokens * CHARS_PER_TOKEN
+    return [
+        text[start:end]
+        for start, end in _chunk_bounds(text, target, _STR_SEPARATORS)
+        if text[start:end].strip()
+    ]
+
+
+def _utf8_boundary(buf, start: int, end: int) -> int:
+    """Move a hard cut back so it doesn't land inside a UTF-8 sequence"""
+    cut = end
+    while cut > start + 1 and buf[cut] & 0xC0 == 0x80:
+        cut -= 1
+    return cut if cut > start else end
+
+
+def iter_file_chunks(path: str, chunk_tokens: int) -> Iterator[str]:
+    """
+    Chunks of a story file, decoded one at a time from a memory map.
+    Only the chunks currently being worked on are ever held as str.
+    """
+    target = chunk_tokens * CHARS_PER_TOKEN
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for start, end in _chunk_bounds(buf, target, _BYTE_SEPARATORS, align=_utf8_boundary):
+                text = buf[start:end].decode("utf-8", errors="replace")
+                if text.strip():
+                    yield text
+
+
+def estimate_file_chunks(path: str, chunk_tokens: int) -> int:
+    """Roughly how many chunks iter_file_chunks will produce"""
+    target = chunk_tokens * CHARS_PER_TOKEN
+    return max(1, -(-os.path.getsize(path) // target))
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file, read in blocks - stands in for the text in cache keys"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _name_key(name: str) -> str:
+    return re.sub(r"\s+", " ", name).strip().casefold()
+
+
+def _pick_evenly(items: Sequence, count: int) -> List:
+    """count items spread across the sequence, always keeping first and last"""
+    if len(items) <= count:
+        return list(items)
+    if count == 1:
+        return [items[0]]
+    step = (len(items) - 1) / (count - 1)
+    return [items[round(i * step)] for i in range(count)]
+
+
+def merge_dna(partials: Sequence[StoryDNA], max_beats: int = 7, max_themes: int = 5) -> StoryDNA:
+    """
+    Reduce per-chunk DNA (in story order) into one StoryDNA.
+
+    - characters: one entry per name (case/whitespace-insensitive), the
+      first description wins; ordered by how many chunks they appear in so
+      the main cast comes first
+    - themes: the max_themes most common, ties in order of appearance;
+      empty if no chunk named one (StoryTransformer falls back to a default)
+    - plot beats: story order, repeats dropped, thinned evenly to max_beats
+      (that's the scene count) and re-numbered into three acts by position
+    - emotional arc: opening, middle and closing chunks' arcs chained
+    - conflict type: the most common one
+    """
+    if not partials:
+        raise ValueError("merge_dna needs at least one partial DNA")
+    if len(partials) == 1:
+        return partials[0]
+
+    characters = {}
+    appearances = Counter()
+    for dna in partials:
+        for character in dna.characters:
+            key = _name_key(character.name)
+            if not key:
+                continue
+            characters.setdefault(key, character)
+            appearances[key] += 1
+    order = {key: i for i, key in enumerate(characters)}
+    cast = sorted(characters, key=lambda key: (-appearances[key], order[key]))
+
+    theme_counts = Counter()
+    theme_text = {}
+    for dna in partials:
+        for theme in dna.themes:
+            key = _name_key(theme)
+            if not key:
+                continue
+            theme_text.setdefault(key, theme.strip())
+            theme_counts[key] += 1
+    themes = [theme_text[key] for key, _ in theme_counts.most_common(max_themes)]
+
+    beats = []
+    seen_beats = set()
+    for dna in partials:
+        for beat in dna.plot_beats:
+            key = _name_key(beat.beat_name)
+            if key in seen_beats:
+                continue
+            seen_beats.add(key)
+            beats.append(beat)
+    beats = _pick_evenly(beats, max_beats)
+    beats = [
+        PlotBeat(**{**beat.model_dump(), "act": 1 + min(2, 3 * i // len(beats))})
+        for i, beat in enumerate(beats)
+    ]
+
+    arcs = [dna.emotional_arc.strip().rstrip(".") for dna in partials if dna.emotional_arc.strip()]
+    conflicts = Counter(dna.conflict_type.strip() for dna in partials if dna.conflict_type.strip())
+
+    return StoryDNA(
+        themes=themes,
+        characters=[characters[key] for key in cast],
+        plot_beats=beats,
+        emotional_arc="; then ".join(_pick_evenly(arcs, 3)) + "." if arcs else "",
+        conflict_type=conflicts.most_common(1)[0][0] if conflicts else "",
+    )
@@ -0,0 +1,180 @@
+"""
+Per-run journal - everything a run has paid for, on disk as it happens.
+
+OutputWriter keeps finished scenes in final_story_*.md, but that file is
+for reading, not for picking a run back up: it has no DNA, no attempts and
+no violation entries per scene. The journal is one JSONL file per run:
+
+    {"type": "run", "run_id": ..., "story_file": ..., "target_world": ...}
+    {"type": "dna", "dna": {...}}
+    {"type": "rulebook", "rulebook": {...}}
+    {"type": "synopses", "synopses": [...]}      (parallel mode only)
+    {"type": "scene", "scene": {...}}            (one per accepted scene)
+
+Every record is flushed and fsynced before the pipeline moves on, so a
+crash, a rate limit or Ctrl-C loses at most the scene that was in flight.
+Opening a journal again replays it (dropping a half-written last line) and
+StoryTransformer(journal=...) skips every stage and scene already in it.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from src.models import Rulebook, SceneResult, StoryDNA
+from src.output_writer import safe_filename
+
+JOURNAL_VERSION = 1
+
+
+class JournalError(ValueError):
+    """Journal file is missing, not a journal, or damaged before its last line"""
+
+
+def new_run_id(story_name: str) -> str:
+    """20250101-120000-ramayana-1a2b3c - sortable by start time, unique enough per machine"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_filename(story_name)[:32]}-{uuid.uuid4().hex[:6]}"
+
+
+def journal_path(journal_dir: str, run_id: str) -> str:
+    return os.path.join(journal_dir, f"{run_id}.jsonl")
+
+
+class RunJournal:
+    """
+    Append-only journal for one run. Thread-safe - parallel scene mode
+    records scenes from several threads.
+
+    Use RunJournal.create for a new run and RunJournal.open to resume one.
+    The replayed state is on the object: run (the header fields), dna,
+    rulebook, synopses and scenes (scene number -> SceneResult).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.run: Dict = {}
+        self.dna: Optional[StoryDNA] = None
+        self.rulebook: Optional[Rulebook] = None
+        self.synopses: Optional[List[str]] = None
+        self.scenes: Dict[int, SceneResult] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, path: str, **run_info) -> "RunJournal":
+        """Start a new journal at path (replacing any file there) with a header record"""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        journal = cls(path)
+        journal._file = open(path, "w", encoding="utf-8")
+        journal.run = dict(run_info)
+        journal._append({"type": "run", "version": JOURNAL_VERSION, "created": time.time(), **run_info})
+        _fsync_dir(directory)  # so the new file itself survives a power cut
+        return journal
+
+    @classmethod
+    def open(cls, path: str) -> "RunJournal":
+        """Replay an existing journal and reopen it for appending"""
+        if not os.path.isfile(path):
+            raise JournalError(f"No run journal at {path}")
+        journal = cls(path)
+        good_bytes = journal._replay()
+        journal._file = open(path, "a", encoding="utf-8")
+        journal._file.truncate(good_bytes)  # drop a torn last record, if any
+        return journal
+
+    @property
+    def run_id(self) -> Optional[str]:
+        return self.run.get("run_id")
+
+    @property
+    def total_scenes(self) -> Optional[int]:
+        return len(self.dna.plot_beats) if self.dna else None
+
+    @property
+    def complete(self) -> bool:
+        return self.dna is not None and self.rulebook is not None and len(self.scenes) >= self.total_scenes
+
+    def record_dna(self, dna: StoryDNA):
+        self.dna = dna
+        self._append({"type": "dna", "dna": dna.model_dump()})
+
+    def record_rulebook(self, rulebook: Rulebook):
+        self.rulebook = rulebook
+        self._append({"type": "rulebook", "rulebook": rulebook.model_dump()})
+
+    def record_synopses(self, synopses: List[str]):
+        self.synopses = list(synopses)
+        self._append({"type": "synopses", "synopses": self.synopses})
+
+    def record_scene(self, scene: SceneResult):
+        """One accepted scene with its attempts and violation entries"""
+        self.scenes[scene.scene_number] = scene
+        self._append({"type": "scene", "scene": scene.model_dump(exclude={"resumed"})})
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                raise JournalError(f"Run journal {self.path} is closed")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _replay(self) -> int:
+        """Load every complete record; returns the byte length of the good part"""
+        good_bytes = 0
+        with open(self.path, "rb") as f:
+            lines = f.readlines()
+        for n, line in enumerate(lines, 1):
+            last = n == len(lines)
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("no newline")
+                record = json.loads(line)
+                self._apply(record)
+            except (ValueError, KeyError) as e:
+                if last:
+                    break  # crashed mid-write - everything before it is fine
+                raise JournalError(f"{self.path}: record {n} is damaged ({e})") from e
+            good_bytes += len(line)
+        if not self.run:
+            raise JournalError(f"{self.path} is not a run journal (no header record)")
+        return good_bytes
+
+    def _apply(self, record: Dict):
+        kind = record.get("type")
+        if kind == "run":
+            self.run = {k: v for k, v in record.items() if k not in ("type", "version", "created")}
+        elif kind == "dna":
+            self.dna = StoryDNA.model_validate(record["dna"])
+        elif kind == "rulebook":
+            self.rulebook = Rulebook.model_validate(record["rulebook"])
+        elif kind == "synopses":
+            self.synopses = [str(s) for s in record["synopses"]]
+        elif kind == "scene":
+            scene = SceneResult.model_validate({**record["scene"], "resumed": True})
+            self.scenes[scene.scene_number] = scene
+        # Unknown record types are skipped, so older code can read newer journals
+
+
+def _fsync_dir(directory: str):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # not supported on this platform (e.g. Windows)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -3,72 +3,841 @@ LLM Client for Groq API integration.
 Handles API calls and token tracking.
 """
 
+import asyncio
+import contextvars
 import os
-from typing import Dict, Optional
-from groq import Groq
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from src import metrics
+from src.backends import LLMBackend, chunk_usage
+from src.tokens import estimate_tokens
+from src.hedging import Hedger
+from src.providers import API_KEY_ENV, ProviderSpec, build_backend
+from src.response_cache import ResponseCache
+from src.scheduler import RateLimitScheduler, default_scheduler
+
 
 class LLMClient:
     """
     Simple wrapper around Groq API for story generation.
     Tracks tokens so I know how much each transformation costs.
+    
+    Every call is also reported to the active metrics recorder (if any) with
+    its latency, time to first token and prompt/completion tokens.
     """
     
     def __init__(
         self, 
         api_key: Optional[str] = None, 
         model: Optional[str] = None,
-        provider: Optional[str] = None
+        provider: Optional[str] = None,
+        max_concurrency: int = 8,
+        timeout: Optional[float] = None,
+        async_client=None,
+        cache: Optional[ResponseCache] = None,
+        seed: Optional[int] = None,
+        backend: Optional[LLMBackend] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        hedge_percentile: Optional[float] = None,
+        hedger: Optional[Hedger] = None
     ):
-        """Set up the LLM client - loads API key from .env if not provided"""
+        """
+        Set up the LLM client - loads API key from .env if not provided.
+        
+        max_concurrency caps how many calls can be in flight at once and
+        timeout is the default per-call limit (seconds) for the async methods.
+        async_client can be any OpenAI-compatible async client; by default we
+        build an AsyncGroq the first time it's needed.
+        
+        cache is an optional ResponseCache - identical requests (same model,
+        messages, temperature, max_tokens, response_format and seed) are then
+        answered from disk, and identical requests already in flight are
+        shared instead of sent twice. seed is passed to the API if set.
+        
+        provider picks a kind from the provider registry (groq, openai,
+        local - see src/providers.py); default is LLM_PROVIDER or groq.
+        backend swaps out what actually answers requests entirely - e.g. a
+        RouterBackend over several providers, or a ReplayBackend for offline
+        benchmarks. SDK clients are pooled per API key for the whole process.
+        
+        scheduler enforces RPM/TPM budgets and retries 429/5xx with backoff.
+        By default every client shares the process-wide one, so parallel
+        transformers split the provider's limit instead of fighting over it.
+        
+        hedge_percentile (e.g. 0.9) turns on hedged requests for scene
+        calls: if one runs past that percentile of recent latencies, a
+        duplicate is sent and the first good answer wins. Tokens burned by
+        the losing copies are counted in hedge_tokens, not total_tokens.
+        Pass a hedger instead to share the latency history between clients.
+        
+        Every generate/stream method takes an optional system message. Put
+        whatever is the same across calls there (e.g. the per-rulebook scene
+        rules) so providers that cache prompt prefixes can reuse it; how many
+        prompt tokens went out as an already-sent prefix is tracked in
+        prefix_reused_tokens, and what the provider says it served from its
+        cache in cached_prompt_tokens.
+        """
         load_dotenv()
-        self.provider = "groq"  # Could support others later
-        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.provider = provider or os.getenv("LLM_PROVIDER", "groq")
+        self.api_key = api_key or os.getenv(API_KEY_ENV.get(self.provider, "GROQ_API_KEY"))
         self.model = model or os.getenv("PRIMARY_MODEL", "llama-3.3-70b-versatile")
-        self.client = Groq(api_key=self.api_key)
+        if backend is None:
+            # SDK retries are off in every registered provider - the scheduler
+            # owns retry/backoff so a 429 pauses every caller at once
+            backend = build_backend(
+                ProviderSpec(kind=self.provider, model=self.model, api_key=self.api_key),
+                async_client=async_client
+            )
+        self.backend = backend
+        self.scheduler = scheduler or default_scheduler()
+        self.hedger = hedger or (Hedger(hedge_percentile) if hedge_percentile else None)
+        self.hedge_tokens = 0
+        self.candidate_tokens = 0
         self.total_tokens = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prefix_reused_tokens = 0
+        self.cached_prompt_tokens = 0
+        self._usage_lock = threading.Lock()  # parallel scene mode uses threads
+        self._sent_prefixes: "OrderedDict[int, None]" = OrderedDict()  # recent system messages
+        
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = None
+        self._semaphore_loop = None
+        
+        self.cache = cache
+        self.seed = seed
+        self._inflight: Dict[str, Future] = {}  # sync callers sharing one request
+        self._inflight_lock = threading.Lock()
+        self._ainflight: Dict[str, asyncio.Task] = {}  # same thing for async callers
+        self._awaiters: Dict[str, int] = {}
     
-    def generate(
-        self, 
-        prompt: str, 
-        temperature: float = 0.7,
-        max_tokens: Optional[int] = None,
-        response_format: Optional[Dict] = None
-    ) -> str:
-        """Send prompt to LLM and get response"""
+    def _build_request(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        response_format: Optional[Dict],
+        system: Optional[str] = None,
+        model: Optional[str] = None,
+        seed: Optional[int] = None
+    ) -> Dict:
+        """Request kwargs shared by the sync and async paths - model/seed override the client's for one call"""
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
         kwargs = {
-            "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
+            "model": model or self.model,
+            "messages": messages,
             "temperature": temperature,
         }
         if max_tokens:
             kwargs["max_tokens"] = max_tokens
         if response_format:
             kwargs["response_format"] = response_format
-        response = self.client.chat.completions.create(**kwargs)
+        seed = seed if seed is not None else self.seed
+        if seed is not None:
+            kwargs["seed"] = seed
+        return kwargs
+    
+    @staticmethod
+    def _call_kind(kwargs: Dict) -> str:
+        if kwargs.get("stream"):
+            return "stream"
+        return "json" if kwargs.get("response_format") else "text"
+    
+    def _count_tokens(self, prompt_tokens: int, completion_tokens: int, total_tokens: int):
+        with self._usage_lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.total_tokens += total_tokens
+    
+    def _count_prefix(self, kwargs: Dict, usage) -> tuple:
+        """
+        (reused prefix tokens, provider-cached prompt tokens) for a call that
+        went out. The first is our own estimate - the system message was sent
+        before, so a prefix-caching provider could skip it; the second is what
+        the provider reported (OpenAI-style prompt_tokens_details), if anything.
+        """
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        reused = 0
+        system = kwargs["messages"][0] if kwargs["messages"][0]["role"] == "system" else None
+        with self._usage_lock:
+            if system is not None:
+                key = hash(system["content"])
+                if key in self._sent_prefixes:
+                    self._sent_prefixes.move_to_end(key)
+                    reused = estimate_tokens(system["content"])
+                else:
+                    self._sent_prefixes[key] = None
+                    if len(self._sent_prefixes) > 64:
+                        self._sent_prefixes.popitem(last=False)
+            self.prefix_reused_tokens += reused
+            self.cached_prompt_tokens += cached
+        return reused, cached
+    
+    def _scheduled_create(self, kwargs: Dict):
+        """Backend call through the rate-limit scheduler"""
+        return self.scheduler.call(
+            lambda: self.backend.create(**kwargs),
+            self.scheduler.estimate_request_tokens(kwargs)
+        )
+    
+    async def _scheduled_acreate(self, kwargs: Dict):
+        """Async backend call through the rate-limit scheduler"""
+        return await self.scheduler.acall(
+            lambda: self.backend.acreate(**kwargs),
+            self.scheduler.estimate_request_tokens(kwargs)
+        )
+    
+    def _dispatch(self, kwargs: Dict, accept: Optional[Callable[[str], bool]] = None):
+        """Non-streamed send, hedged if hedging is on. Returns (response, hedged)"""
+        if self.hedger is None:
+            return self._scheduled_create(kwargs), False
+        # The loser settles on a pool thread, so carry the metrics context over
+        context = contextvars.copy_context()
+        return self.hedger.run(
+            lambda: self._scheduled_create(kwargs),
+            kind=self._call_kind(kwargs),
+            accept=self._accept_response(accept),
+            on_loser=lambda response: context.run(self._count_hedge_loser, kwargs, response)
+        )
+    
+    async def _adispatch(self, kwargs: Dict, accept: Optional[Callable[[str], bool]] = None):
+        """Async version of _dispatch"""
+        if self.hedger is None:
+            return await self._scheduled_acreate(kwargs), False
+        return await self.hedger.arun(
+            lambda: self._scheduled_acreate(kwargs),
+            kind=self._call_kind(kwargs),
+            accept=self._accept_response(accept),
+            on_loser=lambda response: self._count_hedge_loser(kwargs, response)
+        )
+    
+    @staticmethod
+    def _accept_response(accept: Optional[Callable[[str], bool]]):
+        if accept is None:
+            return None
+        return lambda response: accept(response.choices[0].message.content)
+    
+    @staticmethod
+    def _loser_tokens(kwargs: Dict, response) -> int:
+        """
+        Tokens spent on a response nobody used. A cancelled call never
+        reports usage, so charge it the prompt (what the provider already read).
+        """
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            return usage.total_tokens
+        return sum(estimate_tokens(m["content"]) for m in kwargs["messages"])
+    
+    def _count_hedge_loser(self, kwargs: Dict, response):
+        """Tokens spent on the copy that lost the race"""
+        tokens = self._loser_tokens(kwargs, response)
+        with self._usage_lock:
+            self.hedge_tokens += tokens
+        metrics.record_hedge_tokens(tokens)
+    
+    def _count_candidate_loser(self, kwargs: Dict, response):
+        """Tokens spent on a candidate sample that came in after one was picked"""
+        tokens = self._loser_tokens(kwargs, response)
+        with self._usage_lock:
+            self.candidate_tokens += tokens
+        metrics.record_candidate_tokens(tokens)
+    
+    def _record_response(self, response, kwargs: Dict, started: float, hedged: bool = False) -> str:
+        """Count tokens, report the call and pull the text out of a completion"""
+        prompt_tokens = completion_tokens = 0
         if hasattr(response, 'usage'):
-            self.total_tokens += response.usage.total_tokens
+            usage = response.usage
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            self._count_tokens(prompt_tokens, completion_tokens, usage.total_tokens)
+        reused, cached = self._count_prefix(kwargs, getattr(response, "usage", None))
+        metrics.record_call(
+            kind=self._call_kind(kwargs),
+            latency=time.perf_counter() - started,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            hedged=hedged,
+            reused_prefix_tokens=reused,
+            cached_prompt_tokens=cached
+        )
         return response.choices[0].message.content
     
+    def _record_cache_hit(self, kwargs: Dict, started: float):
+        metrics.record_call(
+            kind=self._call_kind(kwargs),
+            latency=time.perf_counter() - started,
+            cached=True
+        )
+    
+    @staticmethod
+    def _response_tokens(response) -> int:
+        return response.usage.total_tokens if hasattr(response, 'usage') else 0
+    
+    @staticmethod
+    def _chunk_usage(chunk):
+        return chunk_usage(chunk)
+    
+    def _record_stream(
+        self,
+        kwargs: Dict,
+        text: str,
+        usage,
+        started: float,
+        first_token_at: Optional[float]
+    ):
+        """
+        Count tokens for a stream. If it was cut off early the API never
+        sends usage, so fall back to estimate_tokens - the same estimate the
+        scheduler and context budget use.
+        """
+        if usage is not None:
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            total_tokens = usage.total_tokens
+        else:
+            prompt_tokens = sum(estimate_tokens(m["content"]) for m in kwargs["messages"])
+            completion_tokens = estimate_tokens(text)
+            total_tokens = prompt_tokens + completion_tokens
+        self._count_tokens(prompt_tokens, completion_tokens, total_tokens)
+        reused, cached = self._count_prefix(kwargs, usage)
+        metrics.record_call(
+            kind="stream",
+            latency=time.perf_counter() - started,
+            ttft=(first_token_at - started) if first_token_at is not None else None,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            reused_prefix_tokens=reused,
+            cached_prompt_tokens=cached
+        )
+    
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        if not chunk.choices:
+            return ""
+        return chunk.choices[0].delta.content or ""
+    
+    def generate(
+        self, 
+        prompt: str, 
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict] = None,
+        accept: Optional[Callable[[str], bool]] = None,
+        system: Optional[str] = None,
+        model: Optional[str] = None,
+        seed: Optional[int] = None
+    ) -> str:
+        """
+        Send prompt to LLM and get response. accept only matters when a
+        hedged call races two copies: a copy whose text fails accept loses
+        to the other one if that passes. model and seed replace the client's
+        for this call.
+        """
+        kwargs = self._build_request(prompt, temperature, max_tokens, response_format, system, model, seed)
+        if self.cache is None:
+            started = time.perf_counter()
+            response, hedged = self._dispatch(kwargs, accept)
+            return self._record_response(response, kwargs, started, hedged)
+        return self._generate_cached(kwargs, accept)
+    
+    def _generate_cached(self, kwargs: Dict, accept: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Cache lookup, then either join an identical in-flight request
+        (another thread got there first) or send it ourselves and store it.
+        """
+        started = time.perf_counter()
+        key = self.cache.make_key(kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._record_cache_hit(kwargs, started)
+            return cached
+        
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self.cache.record_coalesced()
+            text = future.result()
+            self._record_cache_hit(kwargs, started)
+            return text
+        
+        try:
+            response, hedged = self._dispatch(kwargs, accept)
+            text = self._record_response(response, kwargs, started, hedged)
+            self.cache.put(key, text, self._response_tokens(response))
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
     def generate_json(
         self,
         prompt: str,
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        model: Optional[str] = None
     ) -> str:
         """Same as generate but forces JSON output format"""
         return self.generate(
             prompt=prompt,
             temperature=temperature,
             max_tokens=max_tokens,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            model=model
         )
     
+    def generate_candidates(
+        self,
+        prompt: str,
+        n: int,
+        temperature: float = 0.7,
+        check: Optional[Callable[[str], Any]] = None,
+        system: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> List[Tuple[str, Any]]:
+        """
+        n samples of the same prompt, all sent at once, each run through
+        check(text) once as it comes in. Returns [(text, check result)] in
+        the order they finished - as soon as one checks out clean (a falsy
+        result), or once all n are in. Each sample gets its own seed so they
+        actually differ. Samples still running after the pick are ignored
+        like a losing hedge - their tokens go to candidate_tokens, not
+        total_tokens - and ones that hadn't gone out yet never do.
+        Candidates skip the response cache, like streams. Providers' own n=
+        parameter isn't used: Groq doesn't support it.
+        """
+        if n < 1:
+            raise ValueError(f"n must be at least 1, got {n}")
+        requests = [
+            self._build_request(prompt, temperature, None, None, system, model, self._candidate_seed(i))
+            for i in range(n)
+        ]
+        picked = threading.Event()
+        
+        def sample(kwargs: Dict):
+            if picked.is_set():
+                return None  # one was picked before this one went out
+            return self._dispatch(kwargs)
+        
+        started = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=n)
+        futures = {pool.submit(contextvars.copy_context().run, sample, kwargs): kwargs for kwargs in requests}
+        results, errors, used = [], [], set()
+        try:
+            for future in as_completed(futures):
+                used.add(future)
+                try:
+                    response, hedged = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                text = self._record_response(response, futures[future], started, hedged)
+                results.append((text, check(text) if check else None))
+                if check is not None and not results[-1][1]:
+                    break
+        finally:
+            picked.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            for future, kwargs in futures.items():
+                if future not in used:
+                    # Settles on a pool thread, so carry the metrics context over
+                    context = contextvars.copy_context()
+                    future.add_done_callback(
+                        lambda done, kwargs=kwargs, context=context: context.run(self._settle_candidate, done, kwargs)
+                    )
+        if not results:
+            raise errors[0]
+        return results
+    
+    def _settle_candidate(self, future: Future, kwargs: Dict):
+        """Charge an unused candidate to candidate_tokens once it finishes (if it went out at all)"""
+        if future.cancelled() or future.exception() is not None or future.result() is None:
+            return
+        self._count_candidate_loser(kwargs, future.result()[0])
+    
+    async def agenerate_candidates(
+        self,
+        prompt: str,
+        n: int,
+        temperature: float = 0.7,
+        check: Optional[Callable[[str], Any]] = None,
+        system: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> List[Tuple[str, Any]]:
+        """
+        Async version of generate_candidates. Every sample takes a
+        concurrency slot and has its own timeout, like agenerate, so n
+        samples never go over max_concurrency. Samples still running after
+        the pick get cancelled; only the ones that had been sent are charged.
+        """
+        if n < 1:
+            raise ValueError(f"n must be at least 1, got {n}")
+        timeout = timeout if timeout is not None else self.timeout
+        sent = set()
+        picked = False
+        
+        async def sample(i: int, kwargs: Dict):
+            def wanted() -> bool:
+                if picked:
+                    return False  # one was picked while this one waited for a slot
+                sent.add(i)
+                return True
+            reply = await self._asend(kwargs, timeout, wanted=wanted)
+            if reply is None:
+                return None
+            # Checked here, before the next waiter gets this slot, so it's
+            # known whether that one is still wanted
+            verdict = check(reply[0].choices[0].message.content) if check else None
+            if check is not None and not verdict:
+                nonlocal picked
+                picked = True
+            return reply, verdict
+        
+        tasks = {}
+        for i in range(n):
+            kwargs = self._build_request(prompt, temperature, None, None, system, model, self._candidate_seed(i))
+            tasks[asyncio.ensure_future(sample(i, kwargs))] = (i, kwargs)
+        results, errors, used = [], [], set()
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    used.add(task)
+                    try:
+                        outcome = task.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    if outcome is None:
+                        continue
+                    (response, started, hedged), verdict = outcome
+                    text = self._record_response(response, tasks[task][1], started, hedged)
+                    results.append((text, verdict))
+                    if check is not None and not verdict:
+                        pending = set()
+                        break
+        finally:
+            for task, (i, kwargs) in tasks.items():
+                if task in used:
+                    continue
+                if not task.done():
+                    task.cancel()
+                    if i in sent:  # still waiting for a slot costs nothing
+                        self._count_candidate_loser(kwargs, None)
+                elif not task.cancelled() and task.exception() is None and task.result() is not None:
+                    self._count_candidate_loser(kwargs, task.result()[0][0])
+        if not results:
+            raise errors[0]
+        return results
+    
+    def _candidate_seed(self, i: int) -> Optional[int]:
+        """First sample is the same request a single call would send, the rest vary the seed"""
+        if i == 0:
+            return None
+        return (self.seed or 0) + i
+    
+    def stream(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        system: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Streamed completion - yields text chunks as they arrive. Closing the
+        generator early (break / .close()) closes the HTTP stream, so we stop
+        paying for tokens we're going to throw away. Streams skip the cache.
+        """
+        kwargs = self._build_request(prompt, temperature, max_tokens, None, system, model)
+        kwargs["stream"] = True
+        started = time.perf_counter()
+        first_token_at = None
+        response = self._scheduled_create(kwargs)
+        parts = []
+        usage = None
+        try:
+            for chunk in response:
+                usage = self._chunk_usage(chunk) or usage
+                text = self._chunk_text(chunk)
+                if text:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(text)
+                    yield text
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+            self._record_stream(kwargs, "".join(parts), usage, started, first_token_at)
+    
+    async def astream(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        system: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Async version of stream. Holds a concurrency slot for the whole
+        stream; timeout covers the entire stream, not just the first chunk.
+        Use aclose() (or break out of async for) to cancel early.
+        """
+        kwargs = self._build_request(prompt, temperature, max_tokens, None, system, model)
+        kwargs["stream"] = True
+        timeout = timeout if timeout is not None else self.timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        
+        def remaining():
+            return None if deadline is None else max(0.0, deadline - loop.time())
+        
+        async with self._get_semaphore():
+            started = time.perf_counter()
+            first_token_at = None
+            response = await asyncio.wait_for(
+                self._scheduled_acreate(kwargs),
+                timeout=remaining()
+            )
+            parts = []
+            usage = None
+            chunks = response.__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining())
+                    except StopAsyncIteration:
+                        break
+                    usage = self._chunk_usage(chunk) or usage
+                    text = self._chunk_text(chunk)
+                    if text:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        parts.append(text)
+                        yield text
+            finally:
+                if hasattr(response, 'close'):
+                    await response.close()
+                self._record_stream(kwargs, "".join(parts), usage, started, first_token_at)
+    
+    @property
+    def client(self):
+        """Underlying sync SDK client (None for non-SDK backends like replay)"""
+        return getattr(self.backend, "client", None)
+    
+    @property
+    def async_client(self):
+        """Async SDK client - only built if someone actually uses the async API"""
+        return getattr(self.backend, "async_client", None)
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """
+        One semaphore per event loop - asyncio primitives can't be shared
+        across loops, and callers may use asyncio.run() more than once.
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    async def agenerate(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        accept: Optional[Callable[[str], bool]] = None,
+        system: Optional[str] = None,
+        model: Optional[str] = None,
+        seed: Optional[int] = None
+    ) -> str:
+        """
+        Async version of generate. Waits for a concurrency slot, then sends
+        the request. Raises asyncio.TimeoutError if the call takes longer than
+        timeout (or the client default); cancelling the task cancels the request.
+        """
+        kwargs = self._build_request(prompt, temperature, max_tokens, response_format, system, model, seed)
+        timeout = timeout if timeout is not None else self.timeout
+        if self.cache is None:
+            response, started, hedged = await self._asend(kwargs, timeout, accept)
+            return self._record_response(response, kwargs, started, hedged)
+        return await self._agenerate_cached(kwargs, timeout, accept)
+    
+    async def _asend(
+        self,
+        kwargs: Dict,
+        timeout: Optional[float],
+        accept: Optional[Callable[[str], bool]] = None,
+        wanted: Optional[Callable[[], bool]] = None
+    ):
+        """
+        Send once a slot is free - returns (response, time it was sent, hedged).
+        A hedge copy rides on the same slot; the timeout covers both copies.
+        wanted is asked once the slot is free; if it says no, nothing is
+        sent and None comes back.
+        """
+        async with self._get_semaphore():
+            if wanted is not None and not wanted():
+                return None
+            started = time.perf_counter()
+            response, hedged = await asyncio.wait_for(
+                self._adispatch(kwargs, accept),
+                timeout=timeout
+            )
+            return response, started, hedged
+    
+    async def _agenerate_cached(
+        self,
+        kwargs: Dict,
+        timeout: Optional[float],
+        accept: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """
+        Async cache path. The real request runs as a shared task so identical
+        concurrent calls all await the same one; it only gets cancelled once
+        every caller waiting on it has gone away.
+        """
+        started = time.perf_counter()
+        key = self.cache.make_key(kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._record_cache_hit(kwargs, started)
+            return cached
+        
+        task = self._ainflight.get(key)
+        if task is not None and task.get_loop() is not asyncio.get_running_loop():
+            task = None  # left over from a different event loop
+        if task is None:
+            task = asyncio.ensure_future(self._afetch_and_store(key, kwargs, timeout, accept))
+            self._ainflight[key] = task
+            self._awaiters[key] = 0
+            task.add_done_callback(lambda t: self._forget_inflight(key, t))
+            leader = True
+        else:
+            self.cache.record_coalesced()
+            leader = False
+        
+        self._awaiters[key] += 1
+        try:
+            text = await asyncio.shield(task)
+            if not leader:
+                self._record_cache_hit(kwargs, started)
+            return text
+        except asyncio.CancelledError:
+            if not task.done() and self._awaiters.get(key) == 1:
+                task.cancel()  # we were the last one waiting, stop the request
+            raise
+        finally:
+            if key in self._awaiters and self._ainflight.get(key) is task:
+                self._awaiters[key] -= 1
+    
+    async def _afetch_and_store(
+        self,
+        key: str,
+        kwargs: Dict,
+        timeout: Optional[float],
+        accept: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        response, started, hedged = await self._asend(kwargs, timeout, accept)
+        text = self._record_response(response, kwargs, started, hedged)
+        self.cache.put(key, text, self._response_tokens(response))
+        return text
+    
+    def _forget_inflight(self, key: str, task: asyncio.Task):
+        if self._ainflight.get(key) is task:
+            del self._ainflight[key]
+            self._awaiters.pop(key, None)
+    
+    async def agenerate_json(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """Async version of generate_json"""
+        return await self.agenerate(
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            timeout=timeout,
+            model=model
+        )
+    
+    def warm_up(self) -> bool:
+        """
+        Open the provider connection now (DNS, TCP, TLS) so the first real
+        call doesn't pay for it. Costs no tokens; False if it didn't work,
+        in which case the first call just connects as usual.
+        """
+        try:
+            self.backend.warm_up()
+            return True
+        except Exception:
+            return False
+    
+    def preconnect(self) -> threading.Thread:
+        """warm_up on a background thread - join() it if you need to wait"""
+        thread = threading.Thread(target=self.warm_up, name="llm-preconnect", daemon=True)
+        thread.start()
+        return thread
+    
     def get_token_usage(self) -> int:
         """Track how many tokens we've used so far"""
         return self.total_tokens
     
+    def get_token_breakdown(self) -> Dict[str, int]:
+        """Lifetime tokens split into prompt vs completion"""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "hedge_tokens": self.hedge_tokens,
+            "candidate_tokens": self.candidate_tokens,
+            "prefix_reused_tokens": self.prefix_reused_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+        }
+    
+    def get_hedge_stats(self) -> Dict:
+        """Hedged calls, how often the hedge won, current delays (empty if off)"""
+        if self.hedger is None:
+            return {}
+        stats = self.hedger.get_stats()
+        stats["hedge_tokens"] = self.hedge_tokens
+        return stats
+    
+    def get_scheduler_stats(self) -> Dict:
+        """Retries, 429s and time spent waiting on rate budgets"""
+        return self.scheduler.get_stats()
+    
+    def get_cache_stats(self) -> Dict:
+        """Cache hit/miss counters (empty dict if caching is off)"""
+        return self.cache.get_stats() if self.cache else {}
+    
     def estimate_cost(self) -> float:
         """Groq is free right now so cost is always zero"""
         return 0.0  
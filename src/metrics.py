@@ -0,0 +1,327 @@
+"""
+Performance instrumentation for the pipeline.
+
+A MetricsRecorder collects per-stage wall time, one record per LLM call
+(latency, time to first token, prompt vs completion tokens) and time spent
+in local constraint checks. The transformer owns one per run and makes it
+"active" while a stage runs; LLMClient and ConstraintEnforcer report into
+whatever recorder is active through the module-level hooks below, so one
+client can be shared by several transformers (batch mode) and each run
+still gets its own numbers.
+
+The result ends up in TransformationMetadata.performance and can be
+exported with to_json() or to_openmetrics().
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from src.models import CallMetrics, PerformanceMetrics
+
+# Active recorder + stage for the current thread / asyncio task. ContextVars
+# follow asyncio tasks automatically; thread pools need copy_context().run
+_recorder: ContextVar[Optional["MetricsRecorder"]] = ContextVar("metrics_recorder", default=None)
+_stage: ContextVar[str] = ContextVar("metrics_stage", default="other")
+
+
+class MetricsRecorder:
+    """Thread-safe collector for one transformation run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stage_seconds: Dict[str, float] = {}
+            self.calls: List[CallMetrics] = []
+            self.validation_seconds = 0.0
+            self.validation_checks = 0
+            self.hedge_tokens = 0
+            self.candidate_tokens = 0
+            self.json_repairs: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a pipeline stage and attribute every call inside it to that stage"""
+        recorder_token = _recorder.set(self)
+        stage_token = _stage.set(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _stage.reset(stage_token)
+            _recorder.reset(recorder_token)
+            with self._lock:
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + elapsed
+
+    def add_call(self, call: CallMetrics):
+        with self._lock:
+            self.calls.append(call)
+
+    def add_validation(self, seconds: float):
+        with self._lock:
+            self.validation_seconds += seconds
+            self.validation_checks += 1
+
+    def add_hedge_tokens(self, tokens: int):
+        with self._lock:
+            self.hedge_tokens += tokens
+
+    def add_candidate_tokens(self, tokens: int):
+        with self._lock:
+            self.candidate_tokens += tokens
+
+    def add_json_repair(self, kind: str):
+        with self._lock:
+            self.json_repairs[kind] = self.json_repairs.get(kind, 0) + 1
+
+    def snapshot(self, scene_attempts: Optional[List[int]] = None) -> PerformanceMetrics:
+        """Everything recorded so far as a PerformanceMetrics model"""
+        with self._lock:
+            calls = list(self.calls)
+            return PerformanceMetrics(
+                stage_seconds={k: round(v, 4) for k, v in self.stage_seconds.items()},
+                validation_seconds=round(self.validation_seconds, 4),
+                validation_checks=self.validation_checks,
+                prompt_tokens=sum(c.prompt_tokens for c in calls),
+                completion_tokens=sum(c.completion_tokens for c in calls),
+                retries_per_scene=[a - 1 for a in (scene_attempts or [])],
+                hedge_tokens=self.hedge_tokens,
+                candidate_tokens=self.candidate_tokens,
+                prefix_reused_tokens=sum(c.reused_prefix_tokens for c in calls),
+                cached_prompt_tokens=sum(c.cached_prompt_tokens for c in calls),
+                json_repairs=dict(self.json_repairs),
+                calls=calls,
+            )
+
+
+# ---------------------------------------------------------------------------
+# Hooks - no-ops unless a recorder is active
+# ---------------------------------------------------------------------------
+
+def active() -> Optional[MetricsRecorder]:
+    return _recorder.get()
+
+
+def record_call(
+    kind: str,
+    latency: float,
+    ttft: Optional[float] = None,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    cached: bool = False,
+    hedged: bool = False,
+    reused_prefix_tokens: int = 0,
+    cached_prompt_tokens: int = 0
+):
+    """
+    Report one LLM call. For non-streamed calls the first token only shows
+    up with the whole response, so ttft defaults to the full latency.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return
+    recorder.add_call(CallMetrics(
+        stage=_stage.get(),
+        kind=kind,
+        latency_seconds=round(latency, 4),
+        ttft_seconds=round(latency if ttft is None else ttft, 4),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached=cached,
+        hedged=hedged,
+        reused_prefix_tokens=reused_prefix_tokens,
+        cached_prompt_tokens=cached_prompt_tokens,
+    ))
+
+
+def record_hedge_tokens(tokens: int):
+    """Tokens spent on the losing copy of a hedged call"""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add_hedge_tokens(tokens)
+
+
+def record_candidate_tokens(tokens: int):
+    """Tokens spent on scene candidates that came in after one was picked"""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add_candidate_tokens(tokens)
+
+
+def record_json_repair(kind: str):
+    """A malformed structured response was fixed (kind: local / field_request)"""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add_json_repair(kind)
+
+
+@contextmanager
+def validation() -> Iterator[None]:
+    """Time a local constraint check"""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_validation(time.perf_counter() - start)
+
+
+def timed_stage(name: str):
+    """
+    Decorator for StoryTransformer stage methods (sync or async) - runs the
+    method inside self.metrics.stage(name). For generators only the time
+    spent producing each item counts, not the time the consumer holds it.
+    """
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def async_gen_wrapper(self, *args, **kwargs):
+                agen = fn(self, *args, **kwargs)
+                try:
+                    while True:
+                        with self.metrics.stage(name):
+                            try:
+                                item = await agen.__anext__()
+                            except StopAsyncIteration:
+                                return
+                        yield item
+                finally:
+                    await agen.aclose()
+            return async_gen_wrapper
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(self, *args, **kwargs):
+                gen = fn(self, *args, **kwargs)
+                try:
+                    while True:
+                        with self.metrics.stage(name):
+                            try:
+                                item = next(gen)
+                            except StopIteration:
+                                return
+                        yield item
+                finally:
+                    gen.close()
+            return gen_wrapper
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(self, *args, **kwargs):
+                with self.metrics.stage(name):
+                    return await fn(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(name):
+                return fn(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def to_json(performance: PerformanceMetrics, indent: int = 2) -> str:
+    return json.dumps(performance.model_dump(), indent=indent)
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def to_openmetrics(performance: PerformanceMetrics, prefix: str = "story", **labels) -> str:
+    """
+    OpenMetrics text exposition of a run. Extra labels (e.g. story="Ramayana")
+    go on every sample so several runs can be scraped side by side.
+    """
+    lines = []
+
+    def family(name: str, kind: str, help_text: str):
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+
+    def sample(name: str, value, **extra):
+        lines.append(f"{prefix}_{name}{_labels(**labels, **extra)} {value}")
+
+    family("stage_seconds", "gauge", "Wall time per pipeline stage.")
+    for stage, seconds in performance.stage_seconds.items():
+        sample("stage_seconds", seconds, stage=stage)
+
+    # Calls grouped by stage/kind/cached
+    groups: Dict[tuple, List[CallMetrics]] = {}
+    for call in performance.calls:
+        groups.setdefault((call.stage, call.kind, call.cached), []).append(call)
+
+    family("llm_calls", "counter", "LLM calls made.")
+    for (stage, kind, cached), calls in groups.items():
+        sample("llm_calls_total", len(calls), stage=stage, kind=kind, cached=str(cached).lower())
+
+    family("llm_latency_seconds", "summary", "Total latency per LLM call.")
+    for (stage, kind, cached), calls in groups.items():
+        group = {"stage": stage, "kind": kind, "cached": str(cached).lower()}
+        sample("llm_latency_seconds_count", len(calls), **group)
+        sample("llm_latency_seconds_sum", round(sum(c.latency_seconds for c in calls), 4), **group)
+
+    family("llm_ttft_seconds", "summary", "Time to first token per LLM call.")
+    for (stage, kind, cached), calls in groups.items():
+        group = {"stage": stage, "kind": kind, "cached": str(cached).lower()}
+        sample("llm_ttft_seconds_count", len(calls), **group)
+        sample("llm_ttft_seconds_sum", round(sum(c.ttft_seconds or 0.0 for c in calls), 4), **group)
+
+    family("llm_tokens", "counter", "Tokens used, by stage and type.")
+    by_stage: Dict[str, List[int]] = {}
+    for call in performance.calls:
+        totals = by_stage.setdefault(call.stage, [0, 0])
+        totals[0] += call.prompt_tokens
+        totals[1] += call.completion_tokens
+    for stage, (prompt, completion) in by_stage.items():
+        sample("llm_tokens_total", prompt, stage=stage, type="prompt")
+        sample("llm_tokens_total", completion, stage=stage, type="completion")
+
+    family("llm_hedged_calls", "counter", "LLM calls that raced a hedge copy.")
+    sample("llm_hedged_calls_total", sum(1 for c in performance.calls if c.hedged))
+    family("llm_hedge_tokens", "counter", "Tokens spent on losing hedge copies.")
+    sample("llm_hedge_tokens_total", performance.hedge_tokens)
+    family("llm_candidate_tokens", "counter", "Tokens spent on scene candidates that came in after the pick.")
+    sample("llm_candidate_tokens_total", performance.candidate_tokens)
+
+    family("llm_prefix_reused_tokens", "counter", "Prompt tokens sent as an already-sent system prefix.")
+    sample("llm_prefix_reused_tokens_total", performance.prefix_reused_tokens)
+    family("llm_cached_prompt_tokens", "counter", "Prompt tokens the provider served from its prefix cache.")
+    sample("llm_cached_prompt_tokens_total", performance.cached_prompt_tokens)
+
+    family("json_repairs", "counter", "Structured responses fixed locally or by a field re-request.")
+    for kind, count in sorted(performance.json_repairs.items()):
+        sample("json_repairs_total", count, kind=kind)
+
+    family("validation_seconds", "counter", "Time spent in local constraint checks.")
+    sample("validation_seconds_total", performance.validation_seconds)
+    family("validation_checks", "counter", "Local constraint checks run.")
+    sample("validation_checks_total", performance.validation_checks)
+
+    family("scene_retries", "counter", "Regenerations per scene.")
+    for scene, retries in enumerate(performance.retries_per_scene, 1):
+        sample("scene_retries_total", retries, scene=scene)
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
@@ -57,6 +57,47 @@ class ConstraintViolation(BaseModel):
     suggestion: Optional[str] = Field(default=None, description="How to fix it")
 
 
+class SceneResult(BaseModel):
+    """One finished scene, as yielded by generate_story_iter"""
+    scene_number: int
+    beat_name: str
+    text: str
+    attempts: int = Field(description="Generations it took, 1 = first try")
+    violations: List[Dict] = Field(default_factory=list, description="Violation log entries for this scene")
+    seconds: float = Field(description="Wall time for the scene, retries included")
+    resumed: bool = Field(default=False, description="Loaded from the run journal instead of generated")
+
+
+class CallMetrics(BaseModel):
+    """One LLM call as the client saw it"""
+    stage: str = Field(description="Pipeline stage the call belonged to")
+    kind: str = Field(description="text, json or stream")
+    latency_seconds: float = Field(description="Request sent to last token")
+    ttft_seconds: Optional[float] = Field(default=None, description="Time to first token")
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached: bool = Field(default=False, description="Answered by the response cache")
+    hedged: bool = Field(default=False, description="A hedge copy was raced against it")
+    reused_prefix_tokens: int = Field(default=0, description="Prompt tokens in a system prefix sent before")
+    cached_prompt_tokens: int = Field(default=0, description="Prompt tokens the provider reported as cached")
+
+
+class PerformanceMetrics(BaseModel):
+    """Where a run spent its time and tokens"""
+    stage_seconds: Dict[str, float] = Field(description="Wall time per stage")
+    validation_seconds: float = Field(description="Time in local constraint checks")
+    validation_checks: int = Field(description="Number of local constraint checks")
+    prompt_tokens: int
+    completion_tokens: int
+    retries_per_scene: List[int] = Field(default_factory=list, description="Regenerations per scene")
+    hedge_tokens: int = Field(default=0, description="Tokens spent on losing hedge copies")
+    candidate_tokens: int = Field(default=0, description="Tokens spent on scene candidates that came in after the pick")
+    prefix_reused_tokens: int = Field(default=0, description="Prompt tokens eligible for provider prefix caching")
+    cached_prompt_tokens: int = Field(default=0, description="Prompt tokens the provider served from cache")
+    json_repairs: Dict[str, int] = Field(default_factory=dict, description="Malformed JSON responses fixed, by how")
+    calls: List[CallMetrics] = Field(default_factory=list)
+
+
 class TransformationMetadata(BaseModel):
     """Stats about how the transformation went"""
     total_scenes: int
@@ -66,3 +107,8 @@ class TransformationMetadata(BaseModel):
     success_rate_first_try: str
     model_used: str
     total_tokens_estimated: Optional[int] = None
+    cached_stages: List[str] = Field(default_factory=list, description="Stages loaded from the stage cache")
+    retry_policy: Optional[Dict] = Field(
+        default=None, description="Retry policy counters plus generations and LLM calls per scene"
+    )
+    performance: Optional[PerformanceMetrics] = None
@@ -0,0 +1,145 @@
+"""
+Writes a run's output files - all at once or scene by scene.
+
+save_outputs used to write everything only after the whole pipeline
+finished, so a crash at scene 6 lost scenes 1-5 as well. OutputWriter
+writes the DNA and rulebook as soon as they exist, appends each scene to
+final_story_*.md (and its violation entries to constraint_log_*.jsonl) as
+it arrives, and writes the summary files at the end. Parallel mode finishes
+scenes out of order, so the story file only gets a scene once the ones
+before it are in - it always reads in story order. A scene that has to
+wait is appended to pending_scenes_*.jsonl the moment it arrives (and its
+violations to the constraint log), so a crash loses nothing that was done;
+the pending file is removed once every scene has made it into the story.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+from src.metrics import to_openmetrics
+from src.models import PerformanceMetrics, Rulebook, SceneResult, StoryDNA
+
+SCENE_SEPARATOR = "\n\n---\n\n"
+
+
+def safe_filename(name: str) -> str:
+    """Create safe filename from a story/world name (remove special chars)"""
+    safe = "".join(c if c.isalnum() or c in (' ', '-') else '' for c in name)
+    return safe.replace(' ', '_').lower()
+
+
+class OutputWriter:
+    """Output files for one story under output_dir"""
+
+    def __init__(self, output_dir: str, story_name: str, world_name: str):
+        self.output_dir = output_dir
+        self.story_name = story_name
+        self.world_name = world_name
+        self.safe_name = safe_filename(story_name)
+        self._story_file = None
+        self._log_file = None
+        self._pending_file = None
+        self._next_scene = 1
+        self._waiting: Dict[int, SceneResult] = {}  # finished early, waiting for their turn
+        os.makedirs(output_dir, exist_ok=True)
+
+    def path(self, prefix: str, ext: str) -> str:
+        return os.path.join(self.output_dir, f"{prefix}_{self.safe_name}.{ext}")
+
+    def write_dna(self, dna: StoryDNA):
+        with open(self.path("story_dna", "json"), "w") as f:
+            f.write(dna.model_dump_json(indent=2))
+
+    def write_rulebook(self, rulebook: Rulebook):
+        with open(self.path("transformation_rules", "json"), "w") as f:
+            f.write(rulebook.model_dump_json(indent=2))
+
+    def begin_story(self):
+        """Start final_story_*.md (title block) and the per-scene constraint log"""
+        self._story_file = open(self.path("final_story", "md"), "w")
+        self._story_file.write(f"# {self.story_name} {self.world_name}\n\n")
+        self._story_file.write(f"*A transformation of the classic tale to {self.world_name}*\n\n")
+        self._story_file.write("---\n\n")
+        self._story_file.flush()
+        self._log_file = open(self.path("constraint_log", "jsonl"), "w")
+        self._next_scene = 1
+        self._waiting = {}
+        self._remove_pending()
+
+    def add_scene(self, scene: SceneResult):
+        """
+        Write a finished scene: its violations straight to the constraint
+        log, its text to the story file once the scenes before it are in -
+        until then to pending_scenes_*.jsonl.
+        """
+        if self._story_file is None:
+            self.begin_story()
+        for entry in scene.violations:
+            self._log_file.write(json.dumps(entry) + "\n")
+        self._log_file.flush()
+        if scene.scene_number != self._next_scene:
+            if self._pending_file is None:
+                self._pending_file = open(self.path("pending_scenes", "jsonl"), "w")
+            self._pending_file.write(scene.model_dump_json() + "\n")
+            self._pending_file.flush()
+        self._waiting[scene.scene_number] = scene
+        while self._next_scene in self._waiting:
+            ready = self._waiting.pop(self._next_scene)
+            if self._next_scene > 1:
+                self._story_file.write(SCENE_SEPARATOR)
+            self._story_file.write(ready.text)
+            self._story_file.flush()
+            self._next_scene += 1
+
+    def write_story(self, story: str, log_entries=()):
+        """Whole story in one go - for when it wasn't written scene by scene"""
+        self.begin_story()
+        self._story_file.write(story)
+        for entry in log_entries:
+            self._log_file.write(json.dumps(entry) + "\n")
+
+    def finish(self, result: Dict, performance: Optional[PerformanceMetrics] = None):
+        """Close the story file and write the summary artifacts"""
+        if self._story_file is None:
+            self.write_story(result["story"], result["violations"].get("detailed_log", ()))
+        f = self._story_file
+        f.write(SCENE_SEPARATOR)
+        f.write("## About This Story\n\n")
+        f.write("This story was generated through a systematic 3-stage transformation pipeline:\n\n")
+        f.write("1. **DNA Extraction**: Identified themes, characters, and plot structure\n")
+        f.write("2. **Rulebook Building**: Created transformation rules for the target world\n")
+        f.write("3. **Constrained Generation**: Generated with active validation\n\n")
+        f.write(f"**Themes preserved**: {', '.join(result['dna'].themes)}\n\n")
+        f.write(f"**Innovation**: Constraint Enforcer detected and corrected {result['violations']['total_violations']} violations\n")
+        self.close()
+
+        with open(self.path("constraint_log", "json"), "w") as f:
+            json.dump(result["violations"], f, indent=2)
+        with open(self.path("metadata", "json"), "w") as f:
+            metadata = result["metadata"]
+            if hasattr(metadata, 'model_dump_json'):
+                f.write(metadata.model_dump_json(indent=2))
+            else:
+                json.dump(metadata, f, indent=2)
+        performance = getattr(result["metadata"], "performance", None) or performance
+        if performance is not None:
+            with open(self.path("metrics", "prom"), "w") as f:
+                f.write(to_openmetrics(performance, story=self.story_name, world=self.world_name))
+
+    def close(self):
+        for f in (self._story_file, self._log_file, self._pending_file):
+            if f is not None:
+                f.close()
+        self._story_file = self._log_file = self._pending_file = None
+        if not self._waiting:
+            self._remove_pending()  # every scene made it into the story file
+
+    def _remove_pending(self):
+        if self._pending_file is not None:
+            self._pending_file.close()
+            self._pending_file = None
+        try:
+            os.remove(self.path("pending_scenes", "jsonl"))
+        except FileNotFoundError:
+            pass
@@ -43,6 +43,43 @@ Extract the following in JSON format:
 CRITICAL: Be ABSTRACT. Focus on patterns that work in ANY setting.
 Avoid culture-specific or setting-specific language.
 
+Return ONLY valid JSON matching this structure."""
+
+    @staticmethod
+    def dna_chunk_extraction(chunk: str, part: int, total_parts: int) -> str:
+        """
+        Map step of chunked DNA extraction - same JSON shape as dna_extraction
+        but for one section of a long source. Partials get merged locally,
+        so names have to be spelled the same way in every section.
+        """
+        return f"""This is part {part} of about {total_parts} of a long story. Extract the DNA of THIS PART ONLY - the portable essence that can travel to any world.
+
+Story (part {part}):
+{chunk}
+
+Extract the following in JSON format:
+
+1. themes: 2-3 ABSTRACT, UNIVERSAL themes present in this part
+
+2. characters: Array of characters who ACT in this part with:
+   - name: Character name, exactly as the text usually writes it (full name if given)
+   - archetype: Universal role (hero, antagonist, mentor, etc.)
+   - core_trait: ONE defining characteristic
+   - role: Function in story
+
+3. plot_beats: 1-3 key moments from this part, in order, with:
+   - beat_name: Short name (e.g., "exile", "abduction")
+   - description: What happens (abstract, no specific setting)
+   - emotion: Primary emotion of this beat
+   - act: Act number (1, 2, or 3) within the whole story, as best you can tell
+
+4. emotional_arc: Emotional journey of this part in one sentence
+
+5. conflict_type: Core type of conflict (person vs person, person vs self, etc.)
+
+CRITICAL: Be ABSTRACT. Focus on patterns that work in ANY setting.
+Only include what actually happens in this part - other parts are handled separately.
+
 Return ONLY valid JSON matching this structure."""
 
     @staticmethod
@@ -94,29 +131,25 @@ IMPORTANT:
 Return ONLY valid JSON."""
 
     @staticmethod
-    def scene_generation(
-        scene_num: int,
-        beat: dict,
+    def scene_rules(
         world_setting: dict,
         character_mappings: list,
-        plot_translation: str,
         constraints: list,
         forbidden: list,
-        context: str,
         theme: str
     ) -> str:
-        """Prompt for actually writing a scene - includes all the rules to follow"""
+        """
+        The part of every scene prompt that only depends on the rulebook.
+        Sent as the system message and rendered once per rulebook, so every
+        scene (and every retry) starts with the same bytes and providers with
+        prefix caching only process it once.
+        """
         char_names = "\n".join([
             f"- {m['original']} is now called: {m['new_world']} ({m['role']})" 
             for m in character_mappings
         ])
         
-        return f"""Write Scene {scene_num} for our cyberpunk transformation of the Ramayana.
-
-PLOT BEAT: {beat['beat_name']}
-Description: {beat['description']}
-Target Emotion: {beat.get('emotion', 'intense')}
-Act: {beat.get('act', 1)}
+        return f"""You are writing the scenes of our cyberpunk transformation of the Ramayana, one scene at a time.
 
 WORLD SETTING (MUST FOLLOW):
 {world_setting}
@@ -124,19 +157,13 @@ WORLD SETTING (MUST FOLLOW):
 CHARACTER NAMES (USE THESE ONLY, NEVER USE ORIGINALS):
 {char_names}
 
-PLOT TRANSLATION:
-{plot_translation}
-
 HARD CONSTRAINTS (MUST FOLLOW):
 {chr(10).join(f"- {c}" for c in constraints)}
 
 FORBIDDEN (NEVER USE):
 {chr(10).join(f"- {f}" for f in forbidden)}
 
-PREVIOUS CONTEXT:
-{context}
-
-REQUIREMENTS:
+REQUIREMENTS FOR EVERY SCENE:
 - Write 350-450 words
 - Use vivid, engaging prose
 - Show character emotions and motivations
@@ -144,20 +171,200 @@ REQUIREMENTS:
 - Maintain theme: {theme}
 - Use ONLY the new character names provided above
 - NO supernatural elements - only technology
-- Make it feel like a natural continuation
+- Make it feel like a natural continuation"""
+
+    @staticmethod
+    def scene_request(
+        scene_num: int,
+        beat: dict,
+        plot_translation: str,
+        context: str
+    ) -> str:
+        """The per-scene part - goes in the user message after scene_rules"""
+        return f"""Write Scene {scene_num} for our cyberpunk transformation of the Ramayana.
+
+PLOT BEAT: {beat['beat_name']}
+Description: {beat['description']}
+Target Emotion: {beat.get('emotion', 'intense')}
+Act: {beat.get('act', 1)}
+
+PLOT TRANSLATION:
+{plot_translation}
+
+PREVIOUS CONTEXT:
+{context}
 
 Write the scene now:"""
 
     @staticmethod
-    def constraint_correction(base_prompt: str, violations: list) -> str:
+    def scene_synopses(
+        beats: list,
+        world_setting: dict,
+        character_mappings: list,
+        plot_translations: dict,
+        theme: str
+    ) -> str:
         """
-        When the LLM breaks rules, this enhances the prompt with specific corrections.
-        Basically tells it "you messed up in these specific ways, fix them."
+        Cheap planning prompt for parallel mode - one short synopsis per beat,
+        all in one call, so every scene can be written at the same time.
         """
+        char_names = "\n".join([
+            f"- {m['original']} is now called: {m['new_world']} ({m['role']})" 
+            for m in character_mappings
+        ])
+        beat_lines = "\n".join([
+            f"{i}. {b['beat_name']}: {plot_translations.get(b['beat_name'], b['description'])}"
+            for i, b in enumerate(beats, 1)
+        ])
+        
+        return f"""Plan the scenes for our transformed story before they get written.
+
+WORLD SETTING:
+{world_setting}
+
+CHARACTER NAMES (USE THESE ONLY, NEVER USE ORIGINALS):
+{char_names}
+
+PLOT BEATS (in order):
+{beat_lines}
+
+For EACH plot beat, write a 2-3 sentence synopsis of what happens in that scene
+in the new world. Keep continuity between scenes (who knows what, where people are)
+and maintain the theme: {theme}
+
+Return ONLY valid JSON in this format:
+{{"synopses": ["synopsis for beat 1", "synopsis for beat 2", ...]}}
+
+There must be exactly {len(beats)} synopses, one per beat, in order."""
+
+    @staticmethod
+    def synopsis_context(synopses: list, index: int) -> str:
+        """
+        Context block for parallel mode - neighbouring synopses instead of
+        the full text of earlier scenes (which don't exist yet).
+        """
+        lines = []
+        if index > 0:
+            lines.append(f"Previous scene (summary): {synopses[index - 1]}")
+        else:
+            lines.append("This is the opening scene.")
+        lines.append(f"THIS scene (summary): {synopses[index]}")
+        if index + 1 < len(synopses):
+            lines.append(f"Next scene (summary, do NOT write it): {synopses[index + 1]}")
+        else:
+            lines.append("This is the final scene.")
+        return "\n".join(lines)
+
+    @staticmethod
+    def rolling_summary(previous_summary: str, new_scenes: list, max_words: int) -> str:
+        """
+        Folds older scenes into the running story summary so long stories
+        keep continuity without the prompt growing every scene.
+        """
+        scenes_text = "\n\n---\n\n".join(new_scenes)
+        previous = previous_summary or "(nothing yet - these are the first scenes)"
+        
+        return f"""Update the running summary of a story in progress.
+
+SUMMARY SO FAR:
+{previous}
+
+NEW SCENES TO ADD:
+{scenes_text}
+
+Write ONE updated summary covering everything above, in at most {max_words} words.
+Keep: who is who (use the names exactly as written), key events in order,
+unresolved threads, and where each main character stands emotionally.
+Drop: descriptions, dialogue wording, anything that doesn't matter later.
+
+Return only the summary text."""
+
+    @staticmethod
+    def sentence_rewrite(
+        sentences: list,
+        violations: list,
+        character_mappings: list,
+        forbidden: list
+    ) -> str:
+        """
+        Small repair prompt - only the sentences that broke a rule go out and
+        only their rewrites come back, instead of regenerating the whole scene.
+        """
+        numbered = "\n".join(f"{i}. {s}" for i, s in enumerate(sentences, 1))
         violation_details = "\n".join([
             f"- {v['detail']}. {v.get('suggestion', '')}" 
             for v in violations
         ])
+        char_names = "\n".join([
+            f"- {m['original']} -> {m['new_world']}" for m in character_mappings
+        ])
+        
+        return f"""Rewrite these sentences from a story scene so they no longer break the rules below.
+Keep the meaning, tone and length of each sentence. Change as little as possible.
+
+SENTENCES:
+{numbered}
+
+PROBLEMS FOUND:
+{violation_details}
+
+CHARACTER NAMES (always use the new name):
+{char_names}
+
+FORBIDDEN (never use):
+{chr(10).join(f"- {f}" for f in forbidden)}
+
+NO supernatural or mystical wording - only technology and science.
+
+Return ONLY valid JSON in this format, with exactly {len(sentences)} sentences in the same order:
+{{"sentences": ["rewritten sentence 1", ...]}}"""
+
+    @staticmethod
+    def field_repair(base_prompt: str, model_name: str, schema: str, partial_json: str, problems: list) -> str:
+        """
+        Follow-up when a JSON response was missing or botched some fields.
+        Repeats the original request (the source story, DNA or world the
+        values have to come from) and asks for just those fields, so we
+        don't pay for generating the whole object again.
+        """
+        problem_lines = "\n".join(f"- {p}" for p in problems) or "- fields missing or unreadable"
+
+        return f"""{base_prompt}
+
+FOLLOW-UP:
+Your previous {model_name} JSON for the request above was incomplete or invalid.
+
+Problems found:
+{problem_lines}
+
+These fields were fine and are kept as they are:
+{partial_json}
+
+Return ONLY a JSON object with the missing/invalid fields, based on the request
+above, matching this schema and consistent with the fields above:
+{schema}"""
+
+    @staticmethod
+    def constraint_correction(base_prompt: str, violations: list, draft: str = None) -> str:
+        """
+        When the LLM breaks rules, this enhances the prompt with specific corrections.
+        Basically tells it "you messed up in these specific ways, fix them."
+        With a draft (the scene after local repair) it asks for a revision
+        of that instead of a fresh scene, so the fixes already made stay.
+        """
+        # The same slip often shows up several times - list each fix once
+        violation_details = "\n".join(dict.fromkeys(
+            f"- {v['detail']}. {v.get('suggestion') or ''}".rstrip()
+            for v in violations
+        ))
+        if draft:
+            task = f"""Here is the current draft of the scene - the rest of it is already fine:
+
+{draft}
+
+Please revise this draft, fixing ALL the above issues and keeping everything else, while maintaining:"""
+        else:
+            task = "Please regenerate the scene fixing ALL the above issues while maintaining:"
         
         return f"""{base_prompt}
 
@@ -166,7 +373,7 @@ Your previous attempt had these violations that MUST be fixed:
 
 {violation_details}
 
-Please regenerate the scene fixing ALL the above issues while maintaining:
+{task}
 - Narrative quality and engagement
 - Character development
 - Plot progression
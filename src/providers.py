@@ -0,0 +1,285 @@
+"""
+Provider registry and latency/health-aware routing.
+
+LLMClient used to be hardwired to Groq even though it took a provider
+argument. Providers are now built from a ProviderSpec through a small
+registry of kinds:
+
+    groq    - Groq cloud (GROQ_API_KEY)
+    openai  - OpenAI or anything OpenAI-compatible with a base_url (OPENAI_API_KEY)
+    local   - OpenAI-compatible server on this machine (vLLM, llama.cpp,
+              Ollama, benchmarks/stub_server.py...) at LOCAL_BASE_URL,
+              no real key needed
+
+RouterBackend sits on top of several of these. It keeps a rolling window of
+latency and errors per provider/model, sends each request to the fastest
+healthy one, and fails over down the list when a provider errors out.
+"""
+
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.backends import ChatCompletionsBackend, LLMBackend, pooled_client
+from src.scheduler import is_retryable
+
+
+class ProviderSpec(BaseModel):
+    """One provider/model the client can talk to"""
+    kind: str = Field(description="Registry kind: groq, openai, local, ...")
+    model: str = Field(description="Model name to send to this provider")
+    base_url: Optional[str] = Field(default=None, description="Endpoint override")
+    api_key: Optional[str] = Field(default=None, description="Defaults to the kind's env var")
+    name: Optional[str] = Field(default=None, description="Label for stats, defaults to kind:model")
+
+    @property
+    def label(self) -> str:
+        return self.name or f"{self.kind}:{self.model}"
+
+
+# Where each kind looks for its key when the spec doesn't carry one
+API_KEY_ENV = {
+    "groq": "GROQ_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "local": "LOCAL_API_KEY",
+}
+
+LOCAL_DEFAULT_URL = "http://localhost:8000/v1"
+
+
+def _groq_backend(spec: ProviderSpec, async_client=None) -> LLMBackend:
+    from groq import AsyncGroq, Groq
+
+    kwargs = {"api_key": spec.api_key, "max_retries": 0}
+    if spec.base_url:
+        kwargs["base_url"] = spec.base_url
+    return ChatCompletionsBackend(
+        pooled_client(Groq, **kwargs),
+        async_client=async_client,
+        async_factory=lambda: pooled_client(AsyncGroq, **kwargs)
+    )
+
+
+def _openai_backend(spec: ProviderSpec, async_client=None) -> LLMBackend:
+    from openai import AsyncOpenAI, OpenAI
+
+    kwargs = {"api_key": spec.api_key, "max_retries": 0}
+    if spec.base_url:
+        kwargs["base_url"] = spec.base_url
+    return ChatCompletionsBackend(
+        pooled_client(OpenAI, **kwargs),
+        async_client=async_client,
+        async_factory=lambda: pooled_client(AsyncOpenAI, **kwargs)
+    )
+
+
+def _local_backend(spec: ProviderSpec, async_client=None) -> LLMBackend:
+    # Local servers ignore the key but the SDK insists on having one
+    spec = spec.model_copy(update={
+        "base_url": spec.base_url or os.getenv("LOCAL_BASE_URL", LOCAL_DEFAULT_URL),
+        "api_key": spec.api_key or "local",
+    })
+    return _openai_backend(spec, async_client)
+
+
+PROVIDER_KINDS: Dict[str, Callable[..., LLMBackend]] = {
+    "groq": _groq_backend,
+    "openai": _openai_backend,
+    "local": _local_backend,
+}
+
+
+def register_provider(kind: str, factory: Callable[..., LLMBackend]):
+    """Add a provider kind - factory(spec, async_client=None) -> LLMBackend"""
+    PROVIDER_KINDS[kind] = factory
+
+
+def build_backend(spec: ProviderSpec, async_client=None) -> LLMBackend:
+    """Backend for one provider spec, filling the API key in from the environment"""
+    if spec.kind not in PROVIDER_KINDS:
+        raise ValueError(f"Unknown provider '{spec.kind}', expected one of {sorted(PROVIDER_KINDS)}")
+    if spec.api_key is None and spec.kind in API_KEY_ENV:
+        spec = spec.model_copy(update={"api_key": os.getenv(API_KEY_ENV[spec.kind])})
+    return PROVIDER_KINDS[spec.kind](spec, async_client=async_client)
+
+
+def parse_providers(value: str, default_model: Optional[str] = None) -> List[ProviderSpec]:
+    """
+    Parse a provider list like
+        "groq:llama-3.3-70b-versatile, openai:gpt-4o-mini, local:llama3@http://localhost:11434/v1"
+    i.e. kind[:model][@base_url] separated by commas.
+    """
+    specs = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        item, _, base_url = item.partition("@")
+        kind, _, model = item.partition(":")
+        model = model or default_model
+        if not model:
+            raise ValueError(f"Provider '{item}' needs a model (kind:model)")
+        specs.append(ProviderSpec(kind=kind.strip(), model=model.strip(), base_url=base_url.strip() or None))
+    return specs
+
+
+class _RouteStats:
+    """Rolling latency/error window for one route"""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = success
+        self.requests = 0
+        self.errors = 0
+        self.cooldown_until = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def latency(self) -> Optional[float]:
+        return statistics.median(self.latencies) if self.latencies else None
+
+
+class RouterBackend(LLMBackend):
+    """
+    Sends each request to the fastest healthy provider, failing over to the
+    next one on transient errors (429, 5xx, connection problems).
+
+    A provider is unhealthy while its error rate over the last `window`
+    calls is above max_error_rate (needs min_samples calls first) or it is
+    cooling down after consecutive failures. Providers with fewer than
+    min_samples successful calls go first (in configured order) so each
+    one gets measured before latency decides. If everything is unhealthy
+    we still try them all rather than fail without asking.
+    """
+
+    def __init__(
+        self,
+        specs: List[ProviderSpec],
+        window: int = 20,
+        min_samples: int = 3,
+        max_error_rate: float = 0.5,
+        cooldown: float = 30.0,
+        backends: Optional[List[LLMBackend]] = None
+    ):
+        if not specs:
+            raise ValueError("RouterBackend needs at least one provider")
+        self.specs = specs
+        self.backends = backends or [build_backend(spec) for spec in specs]
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self._stats = [_RouteStats(window) for _ in specs]
+        self._lock = threading.Lock()
+
+    def _healthy(self, stats: _RouteStats, now: float) -> bool:
+        if stats.cooldown_until > now:
+            return False
+        return len(stats.outcomes) < self.min_samples or stats.error_rate <= self.max_error_rate
+
+    def _ranked(self) -> List[int]:
+        """Route indexes in the order to try them"""
+        now = time.monotonic()
+        with self._lock:
+            def speed(i: int):
+                # Not enough samples yet counts as fastest, so it gets measured
+                stats = self._stats[i]
+                return (stats.latency if len(stats.latencies) >= self.min_samples else 0.0, i)
+
+            healthy = sorted((i for i, s in enumerate(self._stats) if self._healthy(s, now)), key=speed)
+            unhealthy = sorted(
+                (i for i, s in enumerate(self._stats) if not self._healthy(s, now)),
+                key=lambda i: (self._stats[i].cooldown_until, self._stats[i].error_rate)
+            )
+        return healthy + unhealthy
+
+    def _record(self, i: int, latency: Optional[float]):
+        """latency=None means the call failed"""
+        with self._lock:
+            stats = self._stats[i]
+            stats.requests += 1
+            stats.outcomes.append(latency is not None)
+            if latency is not None:
+                stats.latencies.append(latency)
+                return
+            stats.errors += 1
+            # Several failures in a row - stop sending it traffic for a while
+            recent = list(stats.outcomes)[-self.min_samples:]
+            if len(recent) >= self.min_samples and not any(recent):
+                stats.cooldown_until = time.monotonic() + self.cooldown
+
+    def _request_for(self, i: int, request: Dict) -> Dict:
+        return {**request, "model": self.specs[i].model}
+
+    def create(self, **request):
+        error = None
+        for i in self._ranked():
+            start = time.perf_counter()
+            try:
+                response = self.backends[i].create(**self._request_for(i, request))
+            except Exception as e:
+                self._record(i, None)
+                if not is_retryable(e):
+                    raise  # a bad request is bad everywhere
+                error = e
+                continue
+            self._record(i, time.perf_counter() - start)
+            return response
+        raise error
+
+    async def acreate(self, **request):
+        error = None
+        for i in self._ranked():
+            start = time.perf_counter()
+            try:
+                response = await self.backends[i].acreate(**self._request_for(i, request))
+            except Exception as e:
+                self._record(i, None)
+                if not is_retryable(e):
+                    raise
+                error = e
+                continue
+            self._record(i, time.perf_counter() - start)
+            return response
+        raise error
+
+    def warm_up(self):
+        """Warm every provider - any of them may end up taking the first request"""
+        for backend in self.backends:
+            try:
+                backend.warm_up()
+            except Exception:
+                continue  # an unreachable provider is the router's problem later, not now
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-provider requests, errors, rolling error rate and median latency"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                spec.label: {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "error_rate": round(stats.error_rate, 3),
+                    "median_latency": round(stats.latency, 3) if stats.latency is not None else None,
+                    "healthy": self._healthy(stats, now),
+                }
+                for spec, stats in zip(self.specs, self._stats)
+            }
+
+
+def router_from_env(default_model: Optional[str] = None) -> Optional[RouterBackend]:
+    """RouterBackend from LLM_PROVIDERS, or None if it isn't set"""
+    value = os.getenv("LLM_PROVIDERS")
+    if not value:
+        return None
+    return RouterBackend(parse_providers(value, default_model))
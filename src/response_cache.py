@@ -0,0 +1,178 @@
+"""
+Persistent response cache for LLM calls.
+
+Re-running the same story kept paying for the exact same DNA and rulebook
+prompts, so responses are stored in a small SQLite file keyed on a hash of
+everything that affects the output. Opt-in - LLMClient only uses it if you
+pass one in.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of LLM responses with LRU eviction.
+
+    Keys are a SHA-256 of model, messages, temperature, max_tokens,
+    response_format and seed. Entries older than max_age_seconds are dropped
+    on read, and once the store goes over max_entries or max_bytes the least
+    recently used entries get evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = ".cache/llm_responses.sqlite",
+        max_entries: int = 10000,
+        max_bytes: int = 200 * 1024 * 1024,
+        max_age_seconds: Optional[float] = 30 * 24 * 3600
+    ):
+        """Open (or create) the cache database at path"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        # One connection shared across threads, guarded by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " tokens INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def make_key(request: Dict) -> str:
+        """Hash the parts of a chat request that decide what comes back"""
+        keyed = {
+            "model": request.get("model"),
+            "messages": request.get("messages"),
+            "temperature": request.get("temperature"),
+            "max_tokens": request.get("max_tokens"),
+            "response_format": request.get("response_format"),
+            "seed": request.get("seed"),
+        }
+        blob = json.dumps(keyed, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response text, or None on a miss (expired counts as a miss)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, tokens, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._expired(row[2], now):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            self.tokens_saved += row[1]
+            return row[0]
+
+    def put(self, key: str, content: str, tokens: int = 0):
+        """Store a response and evict whatever no longer fits"""
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, content, tokens, size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def record_coalesced(self):
+        """Called by the client when a request piggybacked on an in-flight one"""
+        with self._lock:
+            self.coalesced += 1
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.max_age_seconds is not None and now - created > self.max_age_seconds
+
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used until under both limits"""
+        if self.max_age_seconds is not None:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.max_age_seconds,)
+            )
+            self.evictions += cur.rowcount
+
+        count, total = self._totals()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed ASC"
+        ).fetchall()
+        doomed = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def _totals(self) -> Tuple[int, int]:
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return count, total
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters plus current store size"""
+        with self._lock:
+            count, total = self._totals()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": f"{(self.hits / lookups * 100) if lookups else 0.0:.1f}%",
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "tokens_saved": self.tokens_saved,
+                "entries": count,
+                "bytes": total,
+            }
+
+    def clear(self):
+        """Wipe the store (counters are kept)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,234 @@
+"""
+Retry policies - when a scene with violations is worth regenerating.
+
+The enforcer used to regenerate on any violation at all. That includes the
+low-severity "missing tech context" check and medium anachronisms like
+"blessed", and every regeneration is a full scene-sized LLM round trip.
+A RetryPolicy makes that call instead:
+
+- RetryPolicy: the original behaviour - any violation left after local
+  repair means regenerate, up to max_retries
+- SeverityRetryPolicy: regenerate only when a severity reaches its
+  threshold, accept the rest with a warning in the violation log, cap the
+  regenerations a whole run may spend, and change temperature and/or
+  model on each regeneration
+
+A policy keeps its counters per run: StoryTransformer gives every run's
+enforcer policy.fresh(), so the budget isn't shared between jobs.
+"""
+
+import copy
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.models import ConstraintViolation
+
+SEVERITIES = ("low", "medium", "high")
+
+
+class RetryDecision(NamedTuple):
+    """retry=False means keep the scene; reason says why it was kept or retried"""
+    retry: bool
+    reason: str  # "retry", "aborted", "below_threshold", "budget_exhausted" or "max_retries"
+
+
+class RetryPolicy:
+    """
+    Regenerate on any violation, up to max_retries - the enforcer's
+    original behaviour. Subclass and override decide() and/or settings_for()
+    for something else; the counters and stats() come along.
+    """
+
+    name = "always"
+
+    def __init__(self):
+        self._reset()
+
+    def fresh(self) -> "RetryPolicy":
+        """Same settings, zeroed counters - one per run"""
+        policy = copy.copy(self)
+        policy._reset()
+        return policy
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def decide(
+        self,
+        violations: List[ConstraintViolation],
+        attempt: int,
+        max_retries: int,
+        aborted: bool = False
+    ) -> RetryDecision:
+        """
+        Called after attempt (1-based) still has violations, local repair
+        included. An aborted stream is only part of a scene, so it's always
+        retried when attempts are left.
+        """
+        if attempt > max_retries:
+            return self._count(RetryDecision(False, "max_retries"))
+        return self._count(RetryDecision(True, "aborted" if aborted else "retry"))
+
+    def settings_for(self, retry: int, temperature: float) -> Tuple[float, Optional[str]]:
+        """(temperature, model override) for regeneration number `retry` (1, 2, ...)"""
+        return temperature, None
+
+    def can_retry(self) -> bool:
+        """False once nothing more may be spent - streams then always run to the end"""
+        return True
+
+    def restore(self, regenerations: int):
+        """Count regenerations a resumed run already spent before it stopped"""
+        with self._lock:
+            self._counts["regenerations"] += regenerations
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "policy": self.name,
+                "regenerations": self._counts["regenerations"],
+                "accepted_with_warnings": self._counts["below_threshold"],
+                "accepted_over_budget": self._counts["budget_exhausted"],
+                "accepted_at_max_retries": self._counts["max_retries"],
+                "temperature_escalations": self._counts["temperature_escalations"],
+                "model_escalations": self._counts["model_escalations"],
+            }
+
+    def _count(self, decision: RetryDecision) -> RetryDecision:
+        with self._lock:
+            self._counts["regenerations" if decision.retry else decision.reason] += 1
+        return decision
+
+
+class SeverityRetryPolicy(RetryPolicy):
+    """
+    thresholds: severity -> how many violations of that severity it takes
+    to regenerate; 0 or missing = never regenerate for it, keep the scene
+    and flag it. The default regenerates on any high, on two or more
+    medium, and never for low.
+    budget: regenerations the whole run may spend (None = no cap). Once
+    it's gone scenes are kept as they are, with a warning.
+    temperature_step: added to the scene temperature on each regeneration
+    (negative = cooler, more literal retries), kept within 0..max_temperature.
+    models: model to switch to on the 1st, 2nd, ... regeneration - the last
+    one sticks. Can't be combined with a RouterBackend (LLM_PROVIDERS):
+    the router sets the model per provider, so StoryTransformer refuses
+    the pair rather than silently dropping the escalation.
+    """
+
+    name = "severity"
+
+    DEFAULT_THRESHOLDS = {"high": 1, "medium": 2, "low": 0}
+
+    def __init__(
+        self,
+        thresholds: Optional[Dict[str, int]] = None,
+        budget: Optional[int] = None,
+        temperature_step: float = 0.0,
+        max_temperature: float = 1.2,
+        models: Sequence[str] = ()
+    ):
+        thresholds = dict(self.DEFAULT_THRESHOLDS if thresholds is None else thresholds)
+        unknown = set(thresholds) - set(SEVERITIES)
+        if unknown:
+            raise ValueError(f"Unknown severities {sorted(unknown)}, expected some of {SEVERITIES}")
+        if budget is not None and budget < 0:
+            raise ValueError(f"budget must be 0 or more, got {budget}")
+        self.thresholds = thresholds
+        self.budget = budget
+        self.temperature_step = temperature_step
+        self.max_temperature = max_temperature
+        self.models = list(models)
+        super().__init__()
+
+    def decide(
+        self,
+        violations: List[ConstraintViolation],
+        attempt: int,
+        max_retries: int,
+        aborted: bool = False
+    ) -> RetryDecision:
+        if attempt > max_retries:
+            return self._count(RetryDecision(False, "max_retries"))
+        if not aborted and not self._over_threshold(violations):
+            return self._count(RetryDecision(False, "below_threshold"))
+        with self._lock:
+            # Aborted streams go over budget rather than hand back half a scene
+            if not aborted and self.budget is not None and self._counts["regenerations"] >= self.budget:
+                self._counts["budget_exhausted"] += 1
+                return RetryDecision(False, "budget_exhausted")
+            self._counts["regenerations"] += 1
+        return RetryDecision(True, "aborted" if aborted else "retry")
+
+    def settings_for(self, retry: int, temperature: float) -> Tuple[float, Optional[str]]:
+        stepped = temperature + self.temperature_step * retry
+        new_temperature = round(min(self.max_temperature, max(0.0, stepped)), 3)
+        model = self.models[min(retry, len(self.models)) - 1] if self.models else None
+        with self._lock:
+            if new_temperature != temperature:
+                self._counts["temperature_escalations"] += 1
+            if model:
+                self._counts["model_escalations"] += 1
+        return new_temperature, model
+
+    def can_retry(self) -> bool:
+        with self._lock:
+            return self.budget is None or self._counts["regenerations"] < self.budget
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["thresholds"] = dict(self.thresholds)
+        stats["budget"] = self.budget
+        if self.budget is not None:
+            stats["budget_left"] = max(0, self.budget - stats["regenerations"])
+        return stats
+
+    def _over_threshold(self, violations: List[ConstraintViolation]) -> bool:
+        counts = Counter(v.severity for v in violations)
+        return any(
+            self.thresholds.get(severity) and n >= self.thresholds[severity]
+            for severity, n in counts.items()
+        )
+
+
+def parse_thresholds(value: str) -> Dict[str, int]:
+    """"high:1,medium:2,low:0" -> {"high": 1, "medium": 2, "low": 0}"""
+    thresholds = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        severity, _, count = item.partition(":")
+        try:
+            thresholds[severity.strip()] = int(count)
+        except ValueError:
+            raise ValueError(f"Bad retry threshold '{item.strip()}', expected severity:count") from None
+    return thresholds
+
+
+def retry_policy_from_env() -> Optional[RetryPolicy]:
+    """
+    SeverityRetryPolicy from RETRY_POLICY=severity and its RETRY_* settings,
+    None (the enforcer's default, retry on anything) otherwise.
+    RETRY_MODELS together with LLM_PROVIDERS is an error - the router
+    would override every escalated model.
+    """
+    kind = os.getenv("RETRY_POLICY", "always").strip().lower()
+    if kind == "always":
+        return None
+    if kind != "severity":
+        raise ValueError(f"RETRY_POLICY must be always or severity, got '{kind}'")
+    thresholds = os.getenv("RETRY_THRESHOLDS")
+    budget = os.getenv("RETRY_BUDGET")
+    models = os.getenv("RETRY_MODELS", "")
+    if models.strip() and os.getenv("LLM_PROVIDERS"):
+        raise ValueError("RETRY_MODELS can't be used with LLM_PROVIDERS - the router picks "
+                         "each provider's model, so the escalation would be ignored")
+    return SeverityRetryPolicy(
+        thresholds=parse_thresholds(thresholds) if thresholds else None,
+        budget=int(budget) if budget else None,
+        temperature_step=float(os.getenv("RETRY_TEMPERATURE_STEP", "0")),
+        models=[m.strip() for m in models.split(",") if m.strip()]
+    )
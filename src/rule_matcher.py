@@ -0,0 +1,277 @@
+"""
+Compiled rule matcher - finds every rulebook term in one pass over the text.
+
+The old check_constraints lowercased the whole scene once per term, which got
+slow once rulebooks had hundreds of forbidden elements. Here all the terms go
+into a single trie-shaped regex (basically a poor man's Aho-Corasick that runs
+inside the C regex engine), so cost stays roughly linear in text length.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.models import Rulebook
+
+
+# Words that don't belong in a tech world - used to live inside check_constraints
+ANACHRONISMS = (
+    "divine", "gods", "supernatural", "mystical",
+    "enchanted", "blessed", "cursed", "magical"
+)
+
+# Any of these counts as "grounded in corporate/tech context".
+# Matched as word prefixes so "technology", "cyberpunk", "corporate" still count.
+TECH_TERMS = (
+    "company", "corporation", "corp", "tech", "startup",
+    "ai", "algorithm", "data", "software", "hardware",
+    "code", "digital", "cyber", "network"
+)
+
+# Match categories
+CHARACTER = "character"
+FORBIDDEN = "forbidden"
+ANACHRONISM = "anachronism"
+TECH = "tech"
+
+
+class RuleMatch(NamedTuple):
+    """One hit in the text - category, the rule term it matched, and offsets"""
+    category: str
+    term: str
+    start: int
+    end: int
+
+
+def _is_word_char(ch: str) -> bool:
+    """Same notion of 'word character' as regex \\w"""
+    return ch.isalnum() or ch == "_"
+
+
+def _word_ends_at(s: str, i: int) -> bool:
+    """True if a term ending at position i doesn't run into the next word"""
+    if i <= 0 or not _is_word_char(s[i - 1]):
+        return True  # term ends in punctuation, nothing to check
+    return i >= len(s) or not _is_word_char(s[i])
+
+
+class CompiledRulebook:
+    """
+    A Rulebook compiled down to one regex plus a few lookup tables.
+
+    Build it once per rulebook (the enforcer does this in __init__) and then
+    call find_matches as often as needed. Character names are
+    case-sensitive like before, everything else is case-insensitive. All
+    terms need a word boundary on both sides except tech terms, which only
+    need one at the start.
+    """
+
+    def __init__(self, rulebook: Rulebook):
+        self.rulebook = rulebook
+
+        # lowercased term -> list of (category, original term) it stands for
+        self._entries: Dict[str, List[Tuple[str, str]]] = {}
+        # lowercased term -> True if it only needs a boundary at the start
+        self._prefix_ok: Dict[str, bool] = {}
+
+        for mapping in rulebook.character_mappings:
+            self._add(mapping.original, CHARACTER, prefix=False)
+        for forbidden in rulebook.forbidden_elements:
+            self._add(forbidden, FORBIDDEN, prefix=False)
+        for term in ANACHRONISMS:
+            self._add(term, ANACHRONISM, prefix=False)
+        for term in TECH_TERMS:
+            self._add(term, TECH, prefix=True)
+
+        # How many constraints ask for corporate/tech grounding - the old code
+        # emitted one context violation per such constraint, so keep that
+        self.tech_constraint_count = sum(
+            1 for c in rulebook.constraints
+            if "corporate" in c.lower() or "tech" in c.lower()
+        )
+
+        # Shorter terms that are a complete word-bounded prefix of a longer
+        # one ("dark" inside "dark magic"). The regex only reports the longest
+        # term at each start position so these get added back by hand.
+        self._nested = self._find_nested_terms()
+        self._pattern = self._compile()
+        self.max_term_length = max((len(k) for k in self._entries), default=0)
+
+    def _add(self, term: str, category: str, prefix: bool):
+        key = term.lower()
+        if not key.strip():
+            return  # empty strings in the rulebook would match everywhere
+        self._entries.setdefault(key, []).append((category, term))
+        # A term only gets the relaxed prefix rule if every use of it allows it
+        self._prefix_ok[key] = self._prefix_ok.get(key, True) and prefix
+
+    def _terminal_ok(self, key: str, s: str, end: int) -> bool:
+        """Does a term ending at `end` in s satisfy its trailing-boundary rule?"""
+        return self._prefix_ok[key] or _word_ends_at(s, end)
+
+    def _find_nested_terms(self) -> Dict[str, List[str]]:
+        nested = {}
+        for key in self._entries:
+            inner = [
+                key[:i] for i in range(len(key) - 1, 0, -1)
+                if key[:i] in self._entries and self._terminal_ok(key[:i], key, i)
+            ]
+            if inner:
+                nested[key] = inner
+        return nested
+
+    def _compile(self) -> "re.Pattern":
+        """Turn all terms into one trie-shaped regex"""
+        if not self._entries:
+            return re.compile(r"(?!x)x")  # never matches
+
+        trie: Dict = {}
+        for key in self._entries:
+            node = trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[""] = True  # end-of-term marker
+
+        def render(node: Dict, root: bool = False) -> str:
+            branches = []
+            for ch, child in sorted(node.items()):
+                if ch == "":
+                    continue
+                # Terms that start with a letter can't start mid-word
+                guard = r"(?<!\w)" if root and _is_word_char(ch) else ""
+                branches.append(guard + re.escape(ch) + render(child))
+            if "" in node:
+                # Empty alternative last so the engine prefers longer terms
+                branches.append("")
+            if len(branches) == 1:
+                return branches[0]
+            return "(?:" + "|".join(branches) + ")"
+
+        # Zero-width lookahead so overlapping terms at different offsets
+        # ("magic" inside "dark magic") are all found in the same scan
+        return re.compile("(?=(" + render(trie, root=True) + "))", re.IGNORECASE)
+
+    def find_matches(
+        self,
+        text: str,
+        start: int = 0,
+        stop: Optional[int] = None,
+        exact_names: bool = True
+    ) -> List[RuleMatch]:
+        """
+        Every rule hit in the text, in order of position. start/stop limit
+        where a hit may begin - the regex still sees the whole text, so
+        boundaries right at the edges are judged correctly. exact_names=False
+        also reports character names in other casings ("RAMA").
+        """
+        matches = []
+        for m in self._pattern.finditer(text, start):
+            if stop is not None and m.start() >= stop:
+                break
+            start = m.start(1)
+            key = m.group(1).lower()
+            if key not in self._entries:
+                continue  # odd unicode case-folding, not worth handling
+            # The longest term at this spot might fail its trailing boundary
+            # (e.g. "magical" matched inside "magicals") - fall back to shorter ones
+            for cand in [key] + self._nested.get(key, []):
+                end = start + len(cand)
+                if not self._terminal_ok(cand, text, end):
+                    continue
+                for category, term in self._entries[cand]:
+                    # Character names stay case-sensitive like the old check
+                    if exact_names and category == CHARACTER and text[start:end] != term:
+                        continue
+                    matches.append(RuleMatch(category, term, start, end))
+        return matches
+
+
+# Compiled rulebooks shared across the process, most recently used last
+_COMPILED: "OrderedDict[str, CompiledRulebook]" = OrderedDict()
+_COMPILED_LOCK = threading.Lock()
+COMPILED_CACHE_SIZE = 32
+
+
+def compile_rulebook(rulebook: Rulebook) -> CompiledRulebook:
+    """
+    CompiledRulebook for this rulebook, reusing an earlier compile of an
+    identical one. A long-lived process (batch, the service) sees the same
+    rulebook for every job into that world - no point building the regex
+    each time. CompiledRulebook is read-only after __init__, so sharing is safe.
+    """
+    key = hashlib.sha256(rulebook.model_dump_json().encode("utf-8")).hexdigest()
+    with _COMPILED_LOCK:
+        compiled = _COMPILED.get(key)
+        if compiled is not None:
+            _COMPILED.move_to_end(key)
+            return compiled
+    compiled = CompiledRulebook(rulebook)
+    with _COMPILED_LOCK:
+        _COMPILED[key] = compiled
+        while len(_COMPILED) > COMPILED_CACHE_SIZE:
+            _COMPILED.popitem(last=False)
+    return compiled
+
+
+class StreamingMatcher:
+    """
+    Incremental version of find_matches for text that arrives in chunks.
+
+    A hit near the end of the buffer can't be trusted yet - "Ram" might
+    become "Rama", and "Rama" might become "Ramayana" - so each feed only
+    finalizes hits that start at least one max-length term (plus one char)
+    before the end. Every position still gets scanned exactly once, and
+    hits that span chunk boundaries come out the same as a full scan.
+
+    Only the unscanned tail (plus the one character before it, for the
+    start-of-word check) is kept as a string, with _offset saying where it
+    sits in the whole text, so a long stream costs linear time rather than
+    re-copying everything received on every chunk. The chunks themselves
+    are kept in a list and joined once if someone asks for text.
+    """
+
+    def __init__(self, compiled: CompiledRulebook):
+        self.compiled = compiled
+        self._chunks: List[str] = []
+        self._length = 0  # characters received so far
+        self._window = ""  # the text from _offset on
+        self._offset = 0
+        self._scanned = 0  # hits starting before this are already reported
+
+    @property
+    def text(self) -> str:
+        """Everything received so far"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> List[RuleMatch]:
+        """Add a chunk, return hits that are now certain"""
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        self._window += chunk
+        self._length += len(chunk)
+        limit = self._length - self.compiled.max_term_length - 1
+        return self._scan(limit)
+
+    def finish(self) -> List[RuleMatch]:
+        """Stream is done - report whatever is left at the tail"""
+        return self._scan(self._length)
+
+    def _scan(self, limit: int) -> List[RuleMatch]:
+        if limit <= self._scanned:
+            return []
+        offset = self._offset
+        matches = [
+            m._replace(start=m.start + offset, end=m.end + offset)
+            for m in self.compiled.find_matches(self._window, self._scanned - offset, limit - offset)
+        ]
+        self._scanned = limit
+        # Keep one character before the next scan start for the (?<!\w) guard
+        keep_from = max(0, limit - 1)
+        self._window = self._window[keep_from - offset:]
+        self._offset = keep_from
+        return matches
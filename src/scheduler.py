@@ -0,0 +1,276 @@
+"""
+Rate-limit-aware request scheduling.
+
+Groq enforces requests/minute and tokens/minute limits per key, and with
+parallel scenes or batch jobs we used to blow through them and get 429s -
+with nothing retrying, one 429 killed the whole transform. The scheduler
+sits between LLMClient and the backend:
+
+- token buckets keep us under the RPM / TPM budget before a request goes out
+- 429 / 5xx / connection errors are retried with jittered exponential
+  backoff, honouring Retry-After when the provider sends it
+- a Retry-After pauses every caller sharing the scheduler, not just the one
+  that got the 429, so we don't keep hammering a provider that said stop
+
+One scheduler is shared by every LLMClient in the process by default (see
+default_scheduler), so aggregate throughput sits at the provider ceiling
+instead of each client guessing on its own.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from src.tokens import estimate_tokens
+
+T = TypeVar("T")
+
+# Status codes worth retrying: timeout, conflict, rate limit, server errors
+RETRYABLE_STATUS = (408, 409, 429)
+# SDK exceptions without a status code that are still transient
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout")
+
+# Completion size assumed for TPM budgeting when the request has no max_tokens
+DEFAULT_COMPLETION_ESTIMATE = 1000
+
+
+class TokenBucket:
+    """
+    Classic token bucket, refilled continuously at rate_per_minute.
+
+    reserve() takes the tokens straight away (the balance may go negative)
+    and returns how long the caller has to wait before using them. Reserving
+    instead of blocking means the lock is never held while sleeping, so the
+    same bucket works for threads and asyncio alike.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens, return seconds to wait before they're really ours"""
+        # A single request bigger than the bucket would otherwise never fit
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge extra (negative) tokens after the fact"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, 5xx and connection-level failures - anything else is our bug"""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait, from retry-after-ms / retry-after
+    (seconds or an HTTP date). None if there's no usable header.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitScheduler:
+    """
+    Budgets and retries for LLM requests.
+
+    requests_per_minute / tokens_per_minute: None means no budget on that
+    axis (retries still apply). max_retries is per request; backoff delays
+    are full-jitter exponential, base_delay * 2^attempt capped at max_delay,
+    unless the provider sent Retry-After.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._paused_until = 0.0  # monotonic time - set by Retry-After
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "throttled_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    @staticmethod
+    def estimate_request_tokens(request: Dict) -> int:
+        """What a request will probably cost against the TPM budget"""
+        prompt = sum(estimate_tokens(m.get("content") or "") for m in request.get("messages", []))
+        return prompt + (request.get("max_tokens") or DEFAULT_COMPLETION_ESTIMATE)
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        """Book budget for one request, return how long to wait first"""
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+            self._stats["requests"] += 1
+            if wait > 0:
+                self._stats["throttled_seconds"] += wait
+        return max(wait, 0.0)
+
+    def _settle(self, estimated_tokens: int, response):
+        """Correct the TPM bucket once real usage is known (streams keep the estimate)"""
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if self.tokens and isinstance(total, int):
+            self.tokens.adjust(estimated_tokens - total)
+
+    def _refund(self, estimated_tokens: int):
+        """
+        A failed attempt used no tokens - give its TPM reservation back so
+        the retry's own reservation isn't charged on top of it
+        """
+        if self.tokens:
+            self.tokens.adjust(min(estimated_tokens, self.tokens.capacity))
+
+    def _backoff(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Delay before the next try, or None if we should give up"""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        status = _status_code(error)
+        delay = retry_after(error)
+        with self._lock:
+            self._stats["retries"] += 1
+            if status == 429:
+                self._stats["rate_limited"] += 1
+            elif status is not None and status >= 500:
+                self._stats["server_errors"] += 1
+            if delay is not None:
+                # The provider told everyone to back off, not just this request
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            else:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            self._stats["backoff_seconds"] += delay
+        return delay
+
+    def call(self, send: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """Run send() within budget, retrying transient failures"""
+        attempt = 0
+        while True:
+            wait = self._reserve(estimated_tokens)
+            if wait:
+                time.sleep(wait)
+            try:
+                response = send()
+            except Exception as e:
+                self._refund(estimated_tokens)
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._settle(estimated_tokens, response)
+            return response
+
+    async def acall(self, send: Callable[[], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        """Async version of call - send is a coroutine function"""
+        attempt = 0
+        while True:
+            wait = self._reserve(estimated_tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                response = await send()
+            except Exception as e:
+                self._refund(estimated_tokens)
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._settle(estimated_tokens, response)
+            return response
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["throttled_seconds"] = round(stats["throttled_seconds"], 3)
+        stats["backoff_seconds"] = round(stats["backoff_seconds"], 3)
+        return stats
+
+
+_default: Optional[RateLimitScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> RateLimitScheduler:
+    """
+    Process-wide scheduler every LLMClient uses unless given its own.
+    Budgets come from LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE
+    (unset = unlimited) and LLM_MAX_RETRIES (default 5).
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            rpm = os.getenv("LLM_REQUESTS_PER_MINUTE")
+            tpm = os.getenv("LLM_TOKENS_PER_MINUTE")
+            _default = RateLimitScheduler(
+                requests_per_minute=float(rpm) if rpm else None,
+                tokens_per_minute=float(tpm) if tpm else None,
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+            )
+        return _default
@@ -0,0 +1,382 @@
+"""
+Long-running transformation service - a local HTTP/JSON API over
+StoryTransformer.
+
+Every `python run.py` pays for imports, .env, a new SDK client and a TLS
+handshake, then throws all of it away. TransformService keeps one warm
+LLMClient (connection pool, scheduler budgets, hedger latency history,
+response cache) and a fixed pool of async workers alive between jobs.
+Compiled rulebooks are shared too (see rule_matcher.compile_rulebook).
+
+Jobs wait in a priority queue - interactive ahead of batch, first come
+first served within a level - and report per-scene progress as they run.
+Nothing beyond the standard library: the HTTP side is a small asyncio
+server, one request per connection, meant for localhost.
+
+    POST /jobs               {"story_file" | "story", "world", "story_name",
+                              "world_name", "priority": "interactive"|"batch"}
+    GET  /jobs               all jobs (most recent last)
+    GET  /jobs/<id>          status, scenes finished so far, summary when done
+    GET  /jobs/<id>/events   the same as server-sent events, live
+    GET  /health             workers, queue depth, client stats
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, Field, ValidationError
+
+from src.llm_client import LLMClient
+from src.models import SceneResult
+from src.output_writer import safe_filename
+from src.story_transformer import StoryTransformer
+
+# Lower runs first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Finished jobs kept for polling before the oldest are forgotten
+MAX_FINISHED_JOBS = 500
+
+# SSE comment sent this often so idle connections aren't dropped
+KEEPALIVE_SECONDS = 15.0
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class JobRequest(BaseModel):
+    """Body of POST /jobs - give either story_file or story"""
+    story_file: Optional[str] = Field(default=None, description="Path to the source story (on the server)")
+    story: Optional[str] = Field(default=None, description="Source story text")
+    story_name: str = Field(default="Unknown Story", description="Display name of the story")
+    world: str = Field(description="Target world description")
+    world_name: str = Field(default="2045", description="Short name for the world")
+    priority: str = Field(default="interactive", description="interactive or batch")
+
+
+class Job:
+    """One submitted transformation and everything it has reported so far"""
+
+    def __init__(self, request: JobRequest, output_dir: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.request = request
+        self.output_dir = output_dir
+        self.status = "queued"  # queued -> running -> done | failed
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.total_scenes: Optional[int] = None
+        self.scenes: List[Dict] = []
+        self.summary: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.events: List[Tuple[str, Dict]] = []  # full history, replayed to late subscribers
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def _emit(self, event: str, data: Dict):
+        self.events.append((event, data))
+        for queue in self._subscribers:
+            queue.put_nowait((event, data))
+
+    def start(self):
+        self.status = "running"
+        self.started = time.time()
+        self._emit("status", {"status": self.status})
+
+    def add_scene(self, scene: SceneResult, total_scenes: int):
+        self.total_scenes = total_scenes
+        progress = {
+            "scene_number": scene.scene_number,
+            "beat_name": scene.beat_name,
+            "attempts": scene.attempts,
+            "violations": sum(len(entry["violations"]) for entry in scene.violations),
+            "seconds": round(scene.seconds, 2),
+        }
+        self.scenes.append(progress)
+        self._emit("scene", {**progress, "done": len(self.scenes), "total": total_scenes})
+
+    def finish(self, summary: Dict):
+        self.status = "done"
+        self.finished = time.time()
+        self.summary = summary
+        self._emit("done", summary)
+
+    def fail(self, error: Exception):
+        self.status = "failed"
+        self.finished = time.time()
+        self.error = f"{type(error).__name__}: {error}"
+        self._emit("failed", {"error": self.error})
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue that gets every event so far, then each new one as it happens"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "priority": self.request.priority,
+            "story_name": self.request.story_name,
+            "world_name": self.request.world_name,
+            "output_dir": self.output_dir,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "scenes_done": len(self.scenes),
+            "total_scenes": self.total_scenes,
+            "scenes": self.scenes,
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+
+class TransformService:
+    """
+    Job queue + warm worker pool around one shared LLMClient.
+
+    workers: how many transformations run at once (the client's own
+    max_concurrency still caps in-flight LLM calls across all of them).
+    transformer_kwargs go to every StoryTransformer (temperatures,
+    scene_mode, stage_cache, violation_sink, ...).
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        workers: int = 2,
+        output_dir: str = "outputs/service",
+        transformer_kwargs: Optional[Dict] = None
+    ):
+        self.llm_client = llm_client
+        self.workers = workers
+        self.output_dir = output_dir
+        self.transformer_kwargs = transformer_kwargs or {}
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._order = itertools.count()  # FIFO within a priority level
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the workers and open the provider connection"""
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self.llm_client.preconnect()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, request: JobRequest) -> Job:
+        """Queue a job - raises ValueError for a request that can't run"""
+        if request.priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {sorted(PRIORITIES)}, got '{request.priority}'")
+        if (request.story is None) == (request.story_file is None):
+            raise ValueError("give exactly one of 'story' or 'story_file'")
+        if request.story_file is not None and not os.path.isfile(request.story_file):
+            raise ValueError(f"story file not found: {request.story_file}")
+        if self._queue is None:
+            raise RuntimeError("service not started")
+
+        job = Job(request)
+        job.output_dir = os.path.join(
+            self.output_dir,
+            f"{job.id}_{safe_filename(request.story_name)}__{safe_filename(request.world_name)}"
+        )
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        self._queue.put_nowait((PRIORITIES[request.priority], next(self._order), job))
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.start()
+        request = job.request
+        transformer = StoryTransformer(
+            llm_client=self.llm_client,
+            source_story_name=request.story_name,
+            target_world_name=request.world_name,
+            **self.transformer_kwargs
+        )
+        try:
+            story = request.story
+            if story is None:
+                story = await asyncio.to_thread(_read_text, request.story_file)
+            async for scene in transformer.atransform_iter(story, request.world, output_dir=job.output_dir):
+                job.add_scene(scene, len(transformer.story_dna.plot_beats))
+            metadata = transformer.result["metadata"]
+            performance = metadata.performance
+            job.finish({
+                "scenes": metadata.total_scenes,
+                "total_violations": metadata.total_violations,
+                "scenes_with_violations": metadata.scenes_with_violations,
+                "cached_stages": metadata.cached_stages,
+                "tokens": performance.prompt_tokens + performance.completion_tokens if performance else 0,
+                "stage_seconds": performance.stage_seconds if performance else {},
+                "story_file": transformer.make_writer(job.output_dir).path("final_story", "md"),
+            })
+        except Exception as e:
+            job.fail(e)
+
+    def health(self) -> Dict:
+        queued = sum(1 for job in self.jobs.values() if job.status == "queued")
+        running = sum(1 for job in self.jobs.values() if job.status == "running")
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "queued": queued,
+            "running": running,
+            "jobs": len(self.jobs),
+            "llm": {
+                "model": self.llm_client.model,
+                "tokens": self.llm_client.get_token_breakdown(),
+                "scheduler": self.llm_client.get_scheduler_stats(),
+                "cache": self.llm_client.get_cache_stats(),
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """Start workers and the HTTP server; returns the asyncio server"""
+        if self._queue is None:
+            await self.start()
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await self.serve(host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, path, body = await _read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                await _respond(writer, 400, {"error": "malformed request"})
+                return
+            parts = [p for p in path.split("/") if p]
+
+            if parts == ["health"] and method == "GET":
+                await _respond(writer, 200, self.health())
+            elif parts == ["jobs"] and method == "POST":
+                try:
+                    job = self.submit(JobRequest.model_validate_json(body or b"{}"))
+                except (ValidationError, ValueError) as e:
+                    await _respond(writer, 400, {"error": str(e)})
+                    return
+                await _respond(writer, 202, job.to_dict())
+            elif parts == ["jobs"] and method == "GET":
+                await _respond(writer, 200, {"jobs": [job.to_dict() for job in self.jobs.values()]})
+            elif len(parts) in (2, 3) and parts[0] == "jobs":
+                job = self.jobs.get(parts[1])
+                if job is None:
+                    await _respond(writer, 404, {"error": f"no job {parts[1]}"})
+                elif method != "GET":
+                    await _respond(writer, 405, {"error": "use GET"})
+                elif len(parts) == 2:
+                    await _respond(writer, 200, job.to_dict())
+                elif parts[2] == "events":
+                    await self._stream_events(job, writer)
+                else:
+                    await _respond(writer, 404, {"error": "not found"})
+            else:
+                await _respond(writer, 404, {"error": "not found"})
+        except ConnectionError:
+            pass  # client went away
+        except Exception as e:
+            await _respond(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            writer.close()
+
+    async def _stream_events(self, job: Job, writer: asyncio.StreamWriter):
+        """Server-sent events for one job until it's done or the client leaves"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        queue = job.subscribe()
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                    await writer.drain()
+                    continue
+                writer.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                await writer.drain()
+                if event in ("done", "failed"):
+                    return
+        finally:
+            job.unsubscribe(queue)
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+    """(method, path, body) of one HTTP/1.1 request"""
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    method, target, _ = request_line.split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path, body
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict):
+    body = json.dumps(payload, indent=2).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
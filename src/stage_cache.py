@@ -0,0 +1,75 @@
+"""
+Stage-level memoization for the pipeline.
+
+Stages 1 and 2 only depend on their inputs, so if the source story and
+target world haven't changed there's no reason to pay for them again when
+iterating on Stage 3. Artifacts are stored as JSON files named by a content
+hash of everything that went into them.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from src.models import StoryDNA
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def _hash(*parts) -> str:
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """
+    Directory of stage artifacts keyed by content hash:
+      <directory>/dna/<hash>.json       - source text + model + temperature
+      <directory>/rulebook/<hash>.json  - DNA + target world + model + temperature
+    """
+
+    def __init__(self, directory: str = ".cache/stages"):
+        self.directory = directory
+
+    @staticmethod
+    def dna_key(source_text: str, model: str, temperature: float) -> str:
+        return _hash("dna", source_text, model, temperature)
+
+    @staticmethod
+    def rulebook_key(dna: StoryDNA, target_world: str, model: str, temperature: float) -> str:
+        dna_hash = hashlib.sha256(dna.model_dump_json().encode("utf-8")).hexdigest()
+        return _hash("rulebook", dna_hash, target_world, model, temperature)
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.directory, stage, f"{key}.json")
+
+    def load(self, stage: str, key: str, model_cls: Type[T]) -> Optional[T]:
+        """Stored artifact for this key, or None if missing or unreadable"""
+        path = self._path(stage, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return model_cls.model_validate_json(f.read())
+        except (OSError, ValidationError):
+            return None  # corrupt or from an older schema - just redo the stage
+
+    def save(self, stage: str, key: str, artifact: BaseModel):
+        """Write atomically so a crash mid-write never leaves a half file behind"""
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temp name - concurrent saves of the same key (duplicate
+        # stories in a batch, service workers) must not share one
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(path), prefix=f"{key}.", suffix=".tmp", delete=False
+        ) as f:
+            f.write(artifact.model_dump_json(indent=2))
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
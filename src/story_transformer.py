@@ -4,12 +4,31 @@ Story Transformer - the main class that runs everything.
 This orchestrates the whole pipeline from start to finish.
 """
 
-import json
-from typing import Dict
-from src.models import StoryDNA, Rulebook, TransformationMetadata
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
+from src.models import StoryDNA, Rulebook, SceneResult, TransformationMetadata
 from src.llm_client import LLMClient
 from src.prompts import PromptTemplates
 from src.constraint_enforcer import ConstraintEnforcer
+from src.stage_cache import StageCache
+from src.journal import RunJournal
+from src.providers import RouterBackend
+from src.retry_policy import RetryPolicy
+from src.violation_log import JsonlSink, ViolationLog
+from src.context_manager import StoryContext
+from src.tokens import estimate_tokens
+from src.metrics import MetricsRecorder, timed_stage
+from src.output_writer import SCENE_SEPARATOR, OutputWriter
+from src.structured import aparse_with_repair, load_json, parse_with_repair
+from src.ingest import (
+    CHARS_PER_TOKEN, estimate_file_chunks, file_digest, iter_file_chunks, merge_dna, split_story
+)
 
 
 class StoryTransformer:
@@ -20,8 +39,18 @@ class StoryTransformer:
     Stage 3: Actually write the new story with validation
     
     The multi-temperature strategy came from testing - 0.3/0.4/0.7 worked best.
+    
+    Stage 3 has two modes:
+    - "sequential": each scene sees the last 2 scenes (original behaviour)
+    - "parallel": one cheap call plans a synopsis per beat, then all scenes
+      are written at once, each seeing its neighbours' synopses
     """
     
+    SCENE_MODES = ("sequential", "parallel")
+    
+    # Stands in for the main theme when the DNA came back without any
+    DEFAULT_THEME = "the characters' struggle to stay true to themselves"
+    
     def __init__(
         self, 
         llm_client: LLMClient,
@@ -30,14 +59,66 @@ class StoryTransformer:
         story_temperature: float = 0.7,  # Higher for creativity
         max_retries: int = 2,
         source_story_name: str = "Unknown Story",
-        target_world_name: str = "2045"
+        target_world_name: str = "2045",
+        scene_mode: str = "sequential",
+        stage_cache: Optional[StageCache] = None,
+        stream_scenes: bool = False,
+        local_repair: bool = True,
+        context_budget: Optional[int] = None,
+        dna_chunk_tokens: Optional[int] = None,
+        violation_sink: Optional[JsonlSink] = None,
+        json_field_retries: int = 1,
+        journal: Optional[RunJournal] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        scene_candidates: int = 1
     ):
         """
         Set up the transformer with different creativity levels for each stage.
         Low temp (0.3) for extraction = more factual
         Medium temp (0.4) for rules = balanced
         High temp (0.7) for writing = more creative
+        
+        With a stage_cache, Stages 1 and 2 are skipped whenever a matching
+        artifact from an earlier run exists. stream_scenes streams each scene
+        and aborts it early on a high-severity violation. local_repair lets
+        the enforcer patch names/sentences before regenerating a whole scene.
+        
+        context_budget (tokens) switches sequential mode from "last 2 scenes"
+        to a rolling summary + recent tail, trimmed so every scene prompt
+        stays under that many tokens however long the story gets.
+        
+        dna_chunk_tokens turns on map-reduce DNA extraction for sources
+        longer than that: each chunk is extracted concurrently and the
+        partial DNAs are merged locally (see src/ingest.py).
+        
+        violation_sink (a JsonlSink) gets every logged violation entry,
+        tagged with story/world; in memory only the recent ones are kept.
+        
+        Malformed DNA/rulebook JSON is repaired locally first; whatever is
+        still missing gets up to json_field_retries follow-up calls asking
+        for just those fields (see src/structured.py).
+        
+        journal (a RunJournal) gets the DNA, rulebook and every accepted
+        scene as soon as they exist. If it already holds some of them (a
+        resumed run), those stages and scenes are loaded instead of run.
+        
+        retry_policy decides which leftover violations are worth regenerating
+        a scene for (see src/retry_policy.py); every run gets a fresh copy,
+        so its budget and counters are per run. Default: retry on anything.
+        A policy that switches models can't be used with a RouterBackend.
+        
+        scene_candidates > 1 samples that many versions of every scene
+        attempt at once and keeps the one with the fewest/least severe
+        violations, trading tokens for fewer serial correction round trips.
         """
+        if scene_mode not in self.SCENE_MODES:
+            raise ValueError(f"scene_mode must be one of {self.SCENE_MODES}, got '{scene_mode}'")
+        if scene_candidates < 1:
+            raise ValueError(f"scene_candidates must be at least 1, got {scene_candidates}")
+        if getattr(retry_policy, "models", None) and isinstance(getattr(llm_client, "backend", None), RouterBackend):
+            raise ValueError("A retry policy with models can't escalate through a RouterBackend - "
+                             "the router sets each provider's model. Drop the models or the router.")
+        
         self.llm_client = llm_client
         self.dna_temperature = dna_temperature
         self.rulebook_temperature = rulebook_temperature
@@ -45,45 +126,293 @@ class StoryTransformer:
         self.max_retries = max_retries
         self.source_story_name = source_story_name
         self.target_world_name = target_world_name
+        self.scene_mode = scene_mode
+        self.stage_cache = stage_cache
+        self.stream_scenes = stream_scenes
+        self.local_repair = local_repair
+        self.context_budget = context_budget
+        self.dna_chunk_tokens = dna_chunk_tokens
+        self.violation_sink = violation_sink
+        self.json_field_retries = json_field_retries
+        self.journal = journal
+        self.retry_policy = retry_policy
+        self.scene_candidates = scene_candidates
+        self.cached_stages = []  # which stages were loaded instead of run
         
         self.story_dna = None
         self.rulebook = None
         self.enforcer = None
+        self.synopses = None
+        self.story_context = None
+        self._rules_cache = None  # (rulebook, theme, rendered scene rules)
+        self.scene_attempts = []  # attempts taken per scene, in beat order
+        self.result = None  # last transform_iter result
+        self.metrics = MetricsRecorder()  # stage timings, per-call latency/tokens
         
+    def _make_enforcer(self, rulebook: Rulebook) -> ConstraintEnforcer:
+        violations_log = ViolationLog(
+            sink=self.violation_sink,
+            labels={"story": self.source_story_name, "world": self.target_world_name}
+        )
+        return ConstraintEnforcer(
+            rulebook,
+            local_repair=self.local_repair,
+            violations_log=violations_log,
+            retry_policy=self.retry_policy.fresh() if self.retry_policy else None
+        )
+    
+    @timed_stage("dna")
     def extract_dna(self, original_story: str) -> StoryDNA:
         """
         Stage 1: Pull out the core elements that can travel to any world.
         Things like "hero's journey" or "forbidden love" work anywhere.
         """
+        chunked = self._needs_chunking(len(original_story))
+        key = self._dna_key(original_story, chunked)
+        if self._load_cached_dna(key):
+            return self.story_dna
+        
+        if chunked:
+            chunks = split_story(original_story, self.dna_chunk_tokens)
+            return self._store_dna(self._map_reduce_dna(chunks, len(chunks)), key)
+        
         prompt = PromptTemplates.dna_extraction(original_story)
         
         response = self.llm_client.generate_json(
             prompt=prompt,
             temperature=self.dna_temperature
         )
-        dna_data = json.loads(response)
-        self.story_dna = StoryDNA(**dna_data)
+        return self._store_dna(self._parse_json(response, StoryDNA, prompt, self.dna_temperature), key)
+    
+    @timed_stage("dna")
+    async def aextract_dna(self, original_story: str) -> StoryDNA:
+        """Async version of extract_dna"""
+        chunked = self._needs_chunking(len(original_story))
+        key = self._dna_key(original_story, chunked)
+        if self._load_cached_dna(key):
+            return self.story_dna
+        
+        if chunked:
+            chunks = split_story(original_story, self.dna_chunk_tokens)
+            return self._store_dna(await self._amap_reduce_dna(chunks, len(chunks)), key)
+        
+        prompt = PromptTemplates.dna_extraction(original_story)
+        
+        response = await self.llm_client.agenerate_json(
+            prompt=prompt,
+            temperature=self.dna_temperature
+        )
+        return self._store_dna(await self._aparse_json(response, StoryDNA, prompt, self.dna_temperature), key)
+    
+    def extract_dna_from_file(self, path: str) -> StoryDNA:
+        """
+        Stage 1 straight from a file. Small files are read and handled like
+        extract_dna; big ones (with dna_chunk_tokens set) are memory-mapped
+        and streamed chunk by chunk instead of being read into memory.
+        """
+        if self._load_journaled_dna():
+            return self.story_dna  # resumed run - the file isn't even opened
+        if not self._needs_chunking(os.path.getsize(path)):
+            with open(path, "r") as f:
+                return self.extract_dna(f.read())
+        return self._extract_dna_from_large_file(path)
+    
+    async def aextract_dna_from_file(self, path: str) -> StoryDNA:
+        """Async version of extract_dna_from_file"""
+        if self._load_journaled_dna():
+            return self.story_dna
+        if not self._needs_chunking(os.path.getsize(path)):
+            with open(path, "r") as f:
+                return await self.aextract_dna(f.read())
+        return await self._aextract_dna_from_large_file(path)
+    
+    @timed_stage("dna")
+    def _extract_dna_from_large_file(self, path: str) -> StoryDNA:
+        key = self._dna_key(f"sha256:{file_digest(path)}", chunked=True)
+        if self._load_cached_dna(key):
+            return self.story_dna
+        total = estimate_file_chunks(path, self.dna_chunk_tokens)
+        return self._store_dna(self._map_reduce_dna(iter_file_chunks(path, self.dna_chunk_tokens), total), key)
+    
+    @timed_stage("dna")
+    async def _aextract_dna_from_large_file(self, path: str) -> StoryDNA:
+        key = self._dna_key(f"sha256:{file_digest(path)}", chunked=True)
+        if self._load_cached_dna(key):
+            return self.story_dna
+        total = estimate_file_chunks(path, self.dna_chunk_tokens)
+        return self._store_dna(
+            await self._amap_reduce_dna(iter_file_chunks(path, self.dna_chunk_tokens), total), key
+        )
+    
+    def _needs_chunking(self, length: int) -> bool:
+        """length in chars (or bytes for files) - same ~4/token yardstick as the chunker"""
+        return bool(self.dna_chunk_tokens) and length > self.dna_chunk_tokens * CHARS_PER_TOKEN
+    
+    def _map_reduce_dna(self, chunks: Iterable[str], total: int) -> StoryDNA:
+        """
+        Extract partial DNA from every chunk on a thread pool, then merge.
+        A few chunks ahead of the workers are decoded at most, so a
+        memory-mapped file is never held in memory whole.
+        """
+        workers = max(1, min(total, self.llm_client.max_concurrency))
+        ahead = threading.BoundedSemaphore(workers * 2)
+        
+        def extract_chunk(chunk: str, part: int) -> StoryDNA:
+            try:
+                prompt = PromptTemplates.dna_chunk_extraction(chunk, part, total)
+                response = self.llm_client.generate_json(prompt=prompt, temperature=self.dna_temperature)
+                return self._parse_json(response, StoryDNA, prompt, self.dna_temperature)
+            finally:
+                ahead.release()
+        
+        futures = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for part, chunk in enumerate(chunks, 1):
+                ahead.acquire()
+                futures.append(pool.submit(contextvars.copy_context().run, extract_chunk, chunk, part))
+            partials = [future.result() for future in futures]
+        return merge_dna(partials)
+    
+    async def _amap_reduce_dna(self, chunks: Iterable[str], total: int) -> StoryDNA:
+        """Async version of _map_reduce_dna - the client's semaphore caps in-flight calls"""
+        ahead = asyncio.Semaphore(max(1, self.llm_client.max_concurrency) * 2)
+        
+        async def extract_chunk(chunk: str, part: int) -> StoryDNA:
+            try:
+                prompt = PromptTemplates.dna_chunk_extraction(chunk, part, total)
+                response = await self.llm_client.agenerate_json(prompt=prompt, temperature=self.dna_temperature)
+                return await self._aparse_json(response, StoryDNA, prompt, self.dna_temperature)
+            finally:
+                ahead.release()
+        
+        tasks = []
+        try:
+            for part, chunk in enumerate(chunks, 1):
+                await ahead.acquire()
+                tasks.append(asyncio.ensure_future(extract_chunk(chunk, part)))
+            partials = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        return merge_dna(partials)
+    
+    def _dna_key(self, source: str, chunked: bool = False) -> str:
+        # Chunked extraction gives a different DNA, so it gets its own entry
+        model = f"{self.llm_client.model}|chunks={self.dna_chunk_tokens}" if chunked else self.llm_client.model
+        return StageCache.dna_key(source, model, self.dna_temperature)
+    
+    def _load_cached_dna(self, key: str) -> bool:
+        if self._load_journaled_dna():
+            return True
+        if not self.stage_cache:
+            return False
+        dna = self.stage_cache.load("dna", key, StoryDNA)
+        if dna is None:
+            return False
+        self.story_dna = dna
+        self.cached_stages.append("dna")
+        if self.journal:
+            self.journal.record_dna(dna)
+        return True
+    
+    def _load_journaled_dna(self) -> bool:
+        if not self.journal or self.journal.dna is None:
+            return False
+        self.story_dna = self.journal.dna
+        self.cached_stages.append("dna")
+        return True
+    
+    def _parse_json(self, response: str, model, prompt: str, temperature: float):
+        """
+        Response to prompt -> model, fixing bad JSON locally or by re-asking
+        (with prompt repeated) for the broken fields
+        """
+        def request(follow_up: str) -> str:
+            return self.llm_client.generate_json(prompt=follow_up, temperature=temperature)
+        return parse_with_repair(response, model, prompt, request, self.json_field_retries)
+    
+    async def _aparse_json(self, response: str, model, prompt: str, temperature: float):
+        """Async version of _parse_json"""
+        async def request(follow_up: str) -> str:
+            return await self.llm_client.agenerate_json(prompt=follow_up, temperature=temperature)
+        return await aparse_with_repair(response, model, prompt, request, self.json_field_retries)
+    
+    def _store_dna(self, dna: StoryDNA, key: str) -> StoryDNA:
+        self.story_dna = dna
+        if self.stage_cache:
+            self.stage_cache.save("dna", key, self.story_dna)
+        if self.journal:
+            self.journal.record_dna(dna)
         
         return self.story_dna
     
+    @timed_stage("rulebook")
     def build_rulebook(self, dna: StoryDNA, target_world: str) -> Rulebook:
         """
         Stage 2: Figure out how to map the old story to the new world.
         Like "kingdom" becomes "corporation" or "sword fight" becomes "legal battle".
         """
-        prompt = PromptTemplates.rulebook_building(
-            dna_json=dna.model_dump_json(indent=2),
-            target_world=target_world,
-            themes=dna.themes
-        )
+        if self._load_cached_rulebook(dna, target_world):
+            return self.rulebook
         
+        prompt = self._rulebook_prompt(dna, target_world)
         response = self.llm_client.generate_json(
             prompt=prompt,
             temperature=self.rulebook_temperature
         )
-        rulebook_data = json.loads(response)
-        self.rulebook = Rulebook(**rulebook_data)
-        self.enforcer = ConstraintEnforcer(self.rulebook)
+        rulebook = self._parse_json(response, Rulebook, prompt, self.rulebook_temperature)
+        return self._store_rulebook(rulebook, dna, target_world)
+    
+    @timed_stage("rulebook")
+    async def abuild_rulebook(self, dna: StoryDNA, target_world: str) -> Rulebook:
+        """Async version of build_rulebook"""
+        if self._load_cached_rulebook(dna, target_world):
+            return self.rulebook
+        
+        prompt = self._rulebook_prompt(dna, target_world)
+        response = await self.llm_client.agenerate_json(
+            prompt=prompt,
+            temperature=self.rulebook_temperature
+        )
+        rulebook = await self._aparse_json(response, Rulebook, prompt, self.rulebook_temperature)
+        return self._store_rulebook(rulebook, dna, target_world)
+    
+    def _rulebook_key(self, dna: StoryDNA, target_world: str) -> str:
+        return StageCache.rulebook_key(
+            dna, target_world, self.llm_client.model, self.rulebook_temperature
+        )
+    
+    def _load_cached_rulebook(self, dna: StoryDNA, target_world: str) -> bool:
+        if self.journal and self.journal.rulebook is not None:
+            rulebook = self.journal.rulebook
+        elif self.stage_cache:
+            rulebook = self.stage_cache.load("rulebook", self._rulebook_key(dna, target_world), Rulebook)
+            if rulebook is not None and self.journal:
+                self.journal.record_rulebook(rulebook)
+        else:
+            return False
+        if rulebook is None:
+            return False
+        self.rulebook = rulebook
+        self.enforcer = self._make_enforcer(self.rulebook)
+        self.cached_stages.append("rulebook")
+        return True
+    
+    def _rulebook_prompt(self, dna: StoryDNA, target_world: str) -> str:
+        return PromptTemplates.rulebook_building(
+            dna_json=dna.model_dump_json(indent=2),
+            target_world=target_world,
+            themes=dna.themes or [self.DEFAULT_THEME]
+        )
+    
+    def _store_rulebook(self, rulebook: Rulebook, dna: StoryDNA, target_world: str) -> Rulebook:
+        self.rulebook = rulebook
+        self.enforcer = self._make_enforcer(self.rulebook)
+        if self.stage_cache:
+            self.stage_cache.save("rulebook", self._rulebook_key(dna, target_world), self.rulebook)
+        if self.journal:
+            self.journal.record_rulebook(rulebook)
         
         return self.rulebook
     
@@ -94,41 +423,331 @@ class StoryTransformer:
         
         Context management: only pass last 2 scenes to avoid token overflow.
         Tried passing all scenes but hit limits around scene 5-6.
+        (Set context_budget to use a rolling summary instead.)
+        """
+        scenes = sorted(self.generate_story_iter(dna, rulebook), key=lambda s: s.scene_number)
+        return SCENE_SEPARATOR.join(scene.text for scene in scenes)
+    
+    async def agenerate_story(self, dna: StoryDNA, rulebook: Rulebook) -> str:
+        """
+        Async version of generate_story. In sequential mode scenes still go
+        in order because each one needs the previous scenes as context.
+        """
+        scenes = [scene async for scene in self.agenerate_story_iter(dna, rulebook)]
+        scenes.sort(key=lambda s: s.scene_number)
+        return SCENE_SEPARATOR.join(scene.text for scene in scenes)
+    
+    @timed_stage("scenes")
+    def generate_story_iter(self, dna: StoryDNA, rulebook: Rulebook) -> Iterator[SceneResult]:
+        """
+        Stage 3 as a generator - yields each SceneResult as soon as the scene
+        is done, so callers can show or save it straight away. Sequential mode
+        yields in story order and only keeps the scenes it needs as context;
+        parallel mode yields in whatever order scenes finish.
+        
+        Scenes already in the run journal are yielded as they were (with
+        resumed=True) and only the missing beats are written.
         """
         if not self.enforcer:
-            self.enforcer = ConstraintEnforcer(rulebook)
+            self.enforcer = self._make_enforcer(rulebook)
         
-        scenes = []
+        if self.scene_mode == "parallel":
+            yield from self._generate_scenes_parallel(dna, rulebook)
+            return
+        
+        recent = deque(maxlen=2)
+        self.scene_attempts = []
+        self.story_context = self._new_story_context()
+        done = self._journaled_scenes(dna)
         
         for i, beat in enumerate(dna.plot_beats, 1):
-            # Give it context from what we've written so far (last 2 scenes)
-            context = "\n\n".join(scenes[-2:]) if scenes else "This is the opening scene."
-            plot_translation = rulebook.plot_translations.get(
-                beat.beat_name, 
-                beat.description
+            if i in done:
+                scene = self._replay_scene(done[i])
+            else:
+                started = time.perf_counter()
+                base_prompt = self._scene_prompt(i, beat, dna, rulebook, self._context_for(i, beat, dna, rulebook, list(recent)))
+                scene_text, attempts = self.enforcer.generate_with_enforcement(
+                    llm_client=self.llm_client,
+                    base_prompt=base_prompt,
+                    scene_number=i,
+                    temperature=self.story_temperature,
+                    max_retries=self.max_retries,
+                    stream=self.stream_scenes,
+                    system=self._scene_rules(dna, rulebook),
+                    candidates=self.scene_candidates
+                )
+                scene = self._scene_result(i, beat, scene_text, attempts, started)
+            
+            recent.append(scene.text)
+            self.scene_attempts.append(scene.attempts)
+            if self.story_context:
+                self.story_context.add_scene(scene.text)
+            yield scene
+    
+    @timed_stage("scenes")
+    async def agenerate_story_iter(self, dna: StoryDNA, rulebook: Rulebook) -> AsyncIterator[SceneResult]:
+        """Async version of generate_story_iter"""
+        if not self.enforcer:
+            self.enforcer = self._make_enforcer(rulebook)
+        
+        if self.scene_mode == "parallel":
+            async for scene in self._agenerate_scenes_parallel(dna, rulebook):
+                yield scene
+            return
+        
+        recent = deque(maxlen=2)
+        self.scene_attempts = []
+        self.story_context = self._new_story_context()
+        done = self._journaled_scenes(dna)
+        
+        for i, beat in enumerate(dna.plot_beats, 1):
+            if i in done:
+                scene = self._replay_scene(done[i])
+            else:
+                started = time.perf_counter()
+                base_prompt = self._scene_prompt(i, beat, dna, rulebook, self._context_for(i, beat, dna, rulebook, list(recent)))
+                scene_text, attempts = await self.enforcer.agenerate_with_enforcement(
+                    llm_client=self.llm_client,
+                    base_prompt=base_prompt,
+                    scene_number=i,
+                    temperature=self.story_temperature,
+                    max_retries=self.max_retries,
+                    stream=self.stream_scenes,
+                    system=self._scene_rules(dna, rulebook),
+                    candidates=self.scene_candidates
+                )
+                scene = self._scene_result(i, beat, scene_text, attempts, started)
+            
+            recent.append(scene.text)
+            self.scene_attempts.append(scene.attempts)
+            if self.story_context:
+                await self.story_context.aadd_scene(scene.text)
+            yield scene
+    
+    def _scene_result(self, scene_num: int, beat, text: str, attempts: int, started: float) -> SceneResult:
+        """Package an accepted scene - and journal it before anyone else sees it"""
+        scene = SceneResult(
+            scene_number=scene_num,
+            beat_name=beat.beat_name,
+            text=text,
+            attempts=attempts,
+            violations=[e for e in self.enforcer.violations_log.entries() if e["scene"] == scene_num],
+            seconds=round(time.perf_counter() - started, 4)
+        )
+        if self.journal:
+            self.journal.record_scene(scene)
+        return scene
+    
+    def _journaled_scenes(self, dna: StoryDNA) -> Dict[int, SceneResult]:
+        """Scenes a resumed run already has, keyed by scene number"""
+        if not self.journal:
+            return {}
+        return {
+            n: scene for n, scene in self.journal.scenes.items()
+            if 1 <= n <= len(dna.plot_beats) and scene.beat_name == dna.plot_beats[n - 1].beat_name
+        }
+    
+    def _replay_scene(self, scene: SceneResult) -> SceneResult:
+        """Put a journaled scene's violations (and retries) back so the summary covers the whole run"""
+        for entry in scene.violations:
+            self.enforcer.violations_log.restore(entry)
+        self.enforcer.retry_policy.restore(scene.attempts - 1)
+        return scene
+    
+    def _generate_scenes_parallel(self, dna: StoryDNA, rulebook: Rulebook) -> Iterator[SceneResult]:
+        """
+        Parallel Stage 3: plan synopses in one call, then write every scene
+        at the same time on a thread pool. Wall time ends up close to the
+        slowest single scene instead of the sum of all of them.
+        """
+        self.scene_attempts = [0] * len(dna.plot_beats)
+        done = self._journaled_scenes(dna)
+        for n in sorted(done):
+            self.scene_attempts[n - 1] = done[n].attempts
+            yield self._replay_scene(done[n])
+        missing = [i for i in range(len(dna.plot_beats)) if i + 1 not in done]
+        if not missing:
+            return
+        
+        synopses = self._journaled_synopses(dna)
+        if synopses is None:
+            response = self.llm_client.generate_json(
+                prompt=self._synopsis_prompt(dna, rulebook),
+                temperature=self.rulebook_temperature
             )
-            base_prompt = PromptTemplates.scene_generation(
-                scene_num=i,
-                beat=beat.model_dump(),
-                world_setting=rulebook.world_setting,
-                character_mappings=[m.model_dump() for m in rulebook.character_mappings],
-                plot_translation=plot_translation,
-                constraints=rulebook.constraints,
-                forbidden=rulebook.forbidden_elements,
-                context=context,
-                theme=dna.themes[0]
+            synopses = self._parse_synopses(response, dna, rulebook)
+        
+        def write_scene(i: int) -> SceneResult:
+            started = time.perf_counter()
+            beat = dna.plot_beats[i]
+            base_prompt = self._scene_prompt(
+                i + 1, beat, dna, rulebook,
+                PromptTemplates.synopsis_context(synopses, i)
             )
             scene_text, attempts = self.enforcer.generate_with_enforcement(
                 llm_client=self.llm_client,
                 base_prompt=base_prompt,
-                scene_number=i,
+                scene_number=i + 1,
                 temperature=self.story_temperature,
-                max_retries=self.max_retries
+                max_retries=self.max_retries,
+                stream=self.stream_scenes,
+                system=self._scene_rules(dna, rulebook),
+                candidates=self.scene_candidates
             )
-            
-            scenes.append(scene_text)
+            self.scene_attempts[i] = attempts
+            return self._scene_result(i + 1, beat, scene_text, attempts, started)
+        
+        workers = max(1, min(len(missing), self.llm_client.max_concurrency))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            # Threads don't inherit context vars - carry the metrics stage over
+            futures = [
+                pool.submit(contextvars.copy_context().run, write_scene, i)
+                for i in missing
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Consumer stopped early - don't start scenes nobody will read
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    async def _agenerate_scenes_parallel(self, dna: StoryDNA, rulebook: Rulebook) -> AsyncIterator[SceneResult]:
+        """Async parallel Stage 3 - same idea, scenes are tasks instead of threads"""
+        self.scene_attempts = [0] * len(dna.plot_beats)
+        done = self._journaled_scenes(dna)
+        for n in sorted(done):
+            self.scene_attempts[n - 1] = done[n].attempts
+            yield self._replay_scene(done[n])
+        missing = [i for i in range(len(dna.plot_beats)) if i + 1 not in done]
+        if not missing:
+            return
+        
+        synopses = self._journaled_synopses(dna)
+        if synopses is None:
+            response = await self.llm_client.agenerate_json(
+                prompt=self._synopsis_prompt(dna, rulebook),
+                temperature=self.rulebook_temperature
+            )
+            synopses = self._parse_synopses(response, dna, rulebook)
+        
+        async def write_scene(i: int) -> SceneResult:
+            started = time.perf_counter()
+            beat = dna.plot_beats[i]
+            base_prompt = self._scene_prompt(
+                i + 1, beat, dna, rulebook,
+                PromptTemplates.synopsis_context(synopses, i)
+            )
+            scene_text, attempts = await self.enforcer.agenerate_with_enforcement(
+                llm_client=self.llm_client,
+                base_prompt=base_prompt,
+                scene_number=i + 1,
+                temperature=self.story_temperature,
+                max_retries=self.max_retries,
+                stream=self.stream_scenes,
+                system=self._scene_rules(dna, rulebook),
+                candidates=self.scene_candidates
+            )
+            self.scene_attempts[i] = attempts
+            return self._scene_result(i + 1, beat, scene_text, attempts, started)
         
-        return "\n\n---\n\n".join(scenes)
+        tasks = [asyncio.ensure_future(write_scene(i)) for i in missing]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def _synopsis_prompt(self, dna: StoryDNA, rulebook: Rulebook) -> str:
+        return PromptTemplates.scene_synopses(
+            beats=[b.model_dump() for b in dna.plot_beats],
+            world_setting=rulebook.world_setting,
+            character_mappings=[m.model_dump() for m in rulebook.character_mappings],
+            plot_translations=rulebook.plot_translations,
+            theme=self._main_theme(dna)
+        )
+    
+    def _parse_synopses(self, response: str, dna: StoryDNA, rulebook: Rulebook) -> List[str]:
+        """
+        Pull the synopsis list out of the planning response. If the model gave
+        us too few (happens sometimes), fall back to the beat translation so
+        every scene still has something to go on.
+        """
+        plan = load_json(response)
+        synopses = plan.get("synopses", []) if isinstance(plan, dict) else []
+        synopses = [str(s) for s in synopses][:len(dna.plot_beats)]
+        for beat in dna.plot_beats[len(synopses):]:
+            synopses.append(rulebook.plot_translations.get(beat.beat_name, beat.description))
+        self.synopses = synopses
+        if self.journal:
+            self.journal.record_synopses(synopses)
+        return synopses
+    
+    def _journaled_synopses(self, dna: StoryDNA) -> Optional[List[str]]:
+        """A resumed run keeps its original plan, so new scenes fit the ones already written"""
+        if not self.journal or not self.journal.synopses or len(self.journal.synopses) != len(dna.plot_beats):
+            return None
+        self.synopses = list(self.journal.synopses)
+        return self.synopses
+    
+    def _new_story_context(self) -> Optional[StoryContext]:
+        if self.context_budget is None:
+            return None
+        return StoryContext(self.llm_client, temperature=self.dna_temperature)
+    
+    def _context_for(self, scene_num: int, beat, dna: StoryDNA, rulebook: Rulebook, scenes: list) -> str:
+        """Context block for a sequential scene - budgeted if context_budget is set"""
+        if self.story_context is None:
+            # Give it context from what we've written so far (last 2 scenes)
+            return "\n\n".join(scenes[-2:]) if scenes else "This is the opening scene."
+        # Whatever the rest of the prompt doesn't use is what the context gets
+        fixed = (estimate_tokens(self._scene_rules(dna, rulebook))
+                 + estimate_tokens(self._scene_prompt(scene_num, beat, dna, rulebook, "")))
+        return self.story_context.render(max(0, self.context_budget - fixed))
+    
+    def _scene_rules(self, dna: StoryDNA, rulebook: Rulebook) -> str:
+        """
+        System message for every scene call - rendered once per rulebook and
+        reused, so all scene prompts share one stable prefix.
+        """
+        theme = self._main_theme(dna)
+        cached = self._rules_cache
+        if cached and cached[0] is rulebook and cached[1] == theme:
+            return cached[2]
+        rules = PromptTemplates.scene_rules(
+            world_setting=rulebook.world_setting,
+            character_mappings=[m.model_dump() for m in rulebook.character_mappings],
+            constraints=rulebook.constraints,
+            forbidden=rulebook.forbidden_elements,
+            theme=theme
+        )
+        self._rules_cache = (rulebook, theme, rules)
+        return rules
+    
+    def _main_theme(self, dna: StoryDNA) -> str:
+        """First theme - a chunked merge or a terse model can leave none"""
+        return dna.themes[0] if dna.themes else self.DEFAULT_THEME
+    
+    def _scene_prompt(
+        self,
+        scene_num: int,
+        beat,
+        dna: StoryDNA,
+        rulebook: Rulebook,
+        context: str
+    ) -> str:
+        """Per-scene user message - the only part that changes between scenes"""
+        plot_translation = rulebook.plot_translations.get(
+            beat.beat_name, 
+            beat.description
+        )
+        return PromptTemplates.scene_request(
+            scene_num=scene_num,
+            beat=beat.model_dump(),
+            plot_translation=plot_translation,
+            context=context
+        )
     
     def transform(
         self, 
@@ -136,10 +755,135 @@ class StoryTransformer:
         target_world: str
     ) -> Dict:
         """Run the full transformation from start to finish"""
+        self.cached_stages = []
+        self.metrics.reset()
         dna = self.extract_dna(original_story)
+        return self.transform_from_dna(dna, target_world)
+    
+    def transform_from_dna(self, dna: StoryDNA, target_world: str) -> Dict:
+        """
+        Stages 2-3 only, for when the DNA is already known - batch mode
+        extracts it once per story and fans it out to every target world.
+        """
+        self.story_dna = dna
+        if self.journal and self.journal.dna is None:
+            self.journal.record_dna(dna)
         rulebook = self.build_rulebook(dna, target_world)
         story = self.generate_story(dna, rulebook)
+        return self._build_result(story, dna, rulebook)
+    
+    def transform_iter(
+        self,
+        original_story: str,
+        target_world: str,
+        output_dir: Optional[str] = None
+    ) -> Iterator[SceneResult]:
+        """
+        Streaming version of transform - yields each SceneResult as soon as
+        the scene is done. Once the generator is exhausted, the dict that
+        transform would have returned is in self.result.
+        
+        With output_dir the files are written as the run goes: DNA and
+        rulebook as soon as they exist, each scene appended to the story
+        and constraint log as it arrives, summaries at the end. A crash
+        mid-way keeps every finished scene on disk. Scenes are then not
+        kept in memory either - self.result["story"] is None and the text
+        is in the final_story file.
+        """
+        self.cached_stages = []
+        self.metrics.reset()
+        self.result = None
+        writer = self.make_writer(output_dir) if output_dir else None
+        try:
+            dna = self.extract_dna(original_story)
+            self.story_dna = dna
+            if writer:
+                writer.write_dna(dna)
+            rulebook = self.build_rulebook(dna, target_world)
+            if writer:
+                writer.write_rulebook(rulebook)
+                writer.begin_story()
+            
+            scenes = {}
+            for scene in self.generate_story_iter(dna, rulebook):
+                if writer:
+                    writer.add_scene(scene)
+                else:
+                    scenes[scene.scene_number] = scene.text
+                yield scene
+            
+            story = SCENE_SEPARATOR.join(scenes[i] for i in sorted(scenes)) if not writer else None
+            self.result = self._build_result(story, dna, rulebook)
+            if writer:
+                writer.finish(self.result)
+        finally:
+            if writer:
+                writer.close()
+    
+    async def atransform_iter(
+        self,
+        original_story: str,
+        target_world: str,
+        output_dir: Optional[str] = None
+    ) -> AsyncIterator[SceneResult]:
+        """Async version of transform_iter"""
+        self.cached_stages = []
+        self.metrics.reset()
+        self.result = None
+        writer = self.make_writer(output_dir) if output_dir else None
+        try:
+            dna = await self.aextract_dna(original_story)
+            self.story_dna = dna
+            if writer:
+                writer.write_dna(dna)
+            rulebook = await self.abuild_rulebook(dna, target_world)
+            if writer:
+                writer.write_rulebook(rulebook)
+                writer.begin_story()
+            
+            scenes = {}
+            async for scene in self.agenerate_story_iter(dna, rulebook):
+                if writer:
+                    writer.add_scene(scene)
+                else:
+                    scenes[scene.scene_number] = scene.text
+                yield scene
+            
+            story = SCENE_SEPARATOR.join(scenes[i] for i in sorted(scenes)) if not writer else None
+            self.result = self._build_result(story, dna, rulebook)
+            if writer:
+                writer.finish(self.result)
+        finally:
+            if writer:
+                writer.close()
+    
+    async def atransform(
+        self,
+        original_story: str,
+        target_world: str
+    ) -> Dict:
+        """
+        Async version of transform. Lets one process drive lots of
+        transformations at once, e.g. asyncio.gather over several transformers
+        sharing one LLMClient (which caps total in-flight calls).
+        """
+        self.cached_stages = []
+        self.metrics.reset()
+        dna = await self.aextract_dna(original_story)
+        return await self.atransform_from_dna(dna, target_world)
+    
+    async def atransform_from_dna(self, dna: StoryDNA, target_world: str) -> Dict:
+        """Async version of transform_from_dna"""
+        self.story_dna = dna
+        if self.journal and self.journal.dna is None:
+            self.journal.record_dna(dna)
+        rulebook = await self.abuild_rulebook(dna, target_world)
+        story = await self.agenerate_story(dna, rulebook)
+        return self._build_result(story, dna, rulebook)
+    
+    def _build_result(self, story: str, dna: StoryDNA, rulebook: Rulebook) -> Dict:
         violation_summary = self.enforcer.get_violation_summary()
+        performance = self.metrics.snapshot(self.scene_attempts)
         metadata = TransformationMetadata(
             total_scenes=len(dna.plot_beats),
             scenes_with_violations=violation_summary["scenes_with_violations"],
@@ -147,7 +891,10 @@ class StoryTransformer:
             violation_types=violation_summary["violation_types"],
             success_rate_first_try=f"{((len(dna.plot_beats) - violation_summary['scenes_with_violations']) / len(dna.plot_beats) * 100):.1f}%",
             model_used=self.llm_client.model,
-            total_tokens_estimated=self.llm_client.get_token_usage()
+            total_tokens_estimated=self.llm_client.get_token_usage(),
+            cached_stages=list(self.cached_stages),
+            retry_policy=self.retry_stats(performance),
+            performance=performance
         )
         
         return {
@@ -158,37 +905,28 @@ class StoryTransformer:
             "metadata": metadata
         }
     
+    def retry_stats(self, performance=None) -> Dict:
+        """
+        The retry policy's counters plus what they cost: scene generations
+        and Stage 3 LLM calls (local repairs and synopses included) per scene.
+        """
+        performance = performance or self.metrics.snapshot(self.scene_attempts)
+        scenes = len(self.scene_attempts) or 1
+        stats = self.enforcer.retry_policy.stats()
+        stats["scene_candidates"] = self.scene_candidates
+        stats["generations_per_scene"] = round(sum(self.scene_attempts) / scenes, 2)
+        stats["llm_calls_per_scene"] = round(
+            sum(1 for call in performance.calls if call.stage == "scenes") / scenes, 2
+        )
+        return stats
+    
+    def make_writer(self, output_dir: str) -> OutputWriter:
+        return OutputWriter(output_dir, self.source_story_name, self.target_world_name)
+    
     def save_outputs(self, result: Dict, output_dir: str = "outputs"):
         """Save everything to files so you can see what happened at each stage"""
-        import os
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Create safe filename from story name (remove special chars)
-        safe_story_name = "".join(c if c.isalnum() or c in (' ', '-') else '' for c in self.source_story_name)
-        safe_story_name = safe_story_name.replace(' ', '_').lower()
-        
-        with open(f"{output_dir}/story_dna_{safe_story_name}.json", "w") as f:
-            f.write(result["dna"].model_dump_json(indent=2))
-        with open(f"{output_dir}/transformation_rules_{safe_story_name}.json", "w") as f:
-            f.write(result["rulebook"].model_dump_json(indent=2))
-        with open(f"{output_dir}/final_story_{safe_story_name}.md", "w") as f:
-            f.write(f"# {self.source_story_name} {self.target_world_name}\n\n")
-            f.write(f"*A transformation of the classic tale to {self.target_world_name}*\n\n")
-            f.write("---\n\n")
-            f.write(result["story"])
-            f.write("\n\n---\n\n")
-            f.write("## About This Story\n\n")
-            f.write("This story was generated through a systematic 3-stage transformation pipeline:\n\n")
-            f.write("1. **DNA Extraction**: Identified themes, characters, and plot structure\n")
-            f.write("2. **Rulebook Building**: Created transformation rules for the target world\n")
-            f.write("3. **Constrained Generation**: Generated with active validation\n\n")
-            f.write(f"**Themes preserved**: {', '.join(result['dna'].themes)}\n\n")
-            f.write(f"**Innovation**: Constraint Enforcer detected and corrected {result['violations']['total_violations']} violations\n")
-        with open(f"{output_dir}/constraint_log_{safe_story_name}.json", "w") as f:
-            json.dump(result["violations"], f, indent=2)
-        with open(f"{output_dir}/metadata_{safe_story_name}.json", "w") as f:
-            metadata = result["metadata"]
-            if hasattr(metadata, 'model_dump_json'):
-                f.write(metadata.model_dump_json(indent=2))
-            else:
-                json.dump(metadata, f, indent=2)
+        writer = self.make_writer(output_dir)
+        writer.write_dna(result["dna"])
+        writer.write_rulebook(result["rulebook"])
+        # run.py passes plain-dict metadata, so fall back to our own recorder
+        writer.finish(result, self.metrics.snapshot(self.scene_attempts))
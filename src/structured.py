@@ -0,0 +1,322 @@
+"""
+Structured output parsing - validate fast, repair locally, re-ask narrowly.
+
+Stages 1 and 2 used to do json.loads + StoryDNA(**data). One stray code
+fence, trailing comma or cut-off response and the stage raised, so the
+whole run had to start over. Parsing now goes:
+
+1. model_validate_json on the raw text - the fast path, one pass in
+   pydantic-core, no intermediate dict
+2. if that fails, repair the text locally (strip fences and chatter,
+   drop trailing commas, close a truncated response) and validate again.
+   The field a response was cut off in counts as invalid even if what's
+   left of it validates - a cut list is just missing its last items
+3. if some fields are still missing or invalid, repeat the original
+   request and ask for just those fields - showing the model what we
+   already have - and merge them in, instead of regenerating the whole
+   object
+"""
+
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from src.metrics import record_json_repair
+from src.prompts import PromptTemplates
+
+M = TypeVar("M", bound=BaseModel)
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)(?:\n?```|$)", re.DOTALL)
+_CLOSERS = {"{": "}", "[": "]"}
+# How far back to cut when closing a truncated response doesn't parse
+_MAX_CUTS = 8
+
+
+class StructuredOutputError(ValueError):
+    """The response couldn't be turned into the model, even after repairs"""
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        data: Any,
+        errors: List[Dict],
+        result: Optional[BaseModel] = None
+    ):
+        self.model = model
+        self.data = data
+        self.errors = errors
+        self.result = result  # validates as-is, only flagged for being cut off
+        fields = ", ".join(invalid_fields(model, data, errors)) or "?"
+        super().__init__(f"Could not parse {model.__name__} from the response (bad fields: {fields})")
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort fix-up of almost-JSON from an LLM: code fences and text
+    around the object are dropped, trailing commas removed, and a response
+    cut off mid-way is closed (unfinished string closed, a dangling key or
+    value cut back to the last complete one, open brackets closed).
+    """
+    return _repair(text)[0]
+
+
+def _repair(text: str) -> Tuple[str, Optional[str]]:
+    """repair_json, plus the top-level key whose value was cut off (None if nothing was)"""
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text.strip(), None
+    text = text[min(starts):]
+
+    out = []
+    stack = []
+    commas = []  # (len(out) at the comma, open brackets then) - places to cut back to
+    in_string = escaped = False
+    top_key = None  # top-level key whose value is being read
+    key_start = None  # where in out the top-level key being read starts
+    expect_key = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if key_start is not None:
+                    top_key = _key_name(out[key_start:])
+                    key_start = None
+                    expect_key = False
+            continue
+        if char == '"':
+            in_string = True
+            if expect_key and stack == ["{"]:
+                key_start = len(out)
+        elif char in _CLOSERS:
+            stack.append(char)
+            expect_key = stack == ["{"]
+        elif char in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                break  # end of the object, anything after it is chatter
+            continue
+        elif char == ",":
+            commas.append((len(out), list(stack)))
+            expect_key = stack == ["{"]
+        out.append(char)
+    else:
+        if stack or in_string:
+            cut_key = None if expect_key else top_key
+            return _close_truncated(out, stack, in_string, commas), cut_key
+    return "".join(out), None
+
+
+def _key_name(chars: List[str]) -> str:
+    try:
+        return json.loads("".join(chars))
+    except ValueError:
+        return "".join(chars).strip('"')
+
+
+def _strip_trailing_comma(out: List[str]):
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i:]
+
+
+def _closed(out: List[str], stack: List[str], in_string: bool) -> str:
+    text = "".join(out) + ('"' if in_string else "")
+    text = text.rstrip().rstrip(",").rstrip()
+    if text.endswith(":"):
+        text += " null"  # key with no value yet - validation will flag the field
+    return text + "".join(_CLOSERS[b] for b in reversed(stack))
+
+
+def _close_truncated(out: List[str], stack: List[str], in_string: bool, commas) -> str:
+    candidate = _closed(out, stack, in_string)
+    try:
+        json.loads(candidate)
+        return candidate
+    except ValueError:
+        pass
+    # Cut off in the middle of a key or literal - fall back to the last complete item
+    for position, open_brackets in reversed(commas[-_MAX_CUTS:]):
+        cut = _closed(out[:position], open_brackets, False)
+        try:
+            json.loads(cut)
+            return cut
+        except ValueError:
+            continue
+    return candidate
+
+
+def load_json(text: str) -> Any:
+    """json.loads, falling back to repair_json - raises ValueError if neither works"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        data = json.loads(repair_json(text))
+    record_json_repair("local")
+    return data
+
+
+def invalid_fields(model: Type[BaseModel], data: Any, errors: List[Dict]) -> List[str]:
+    """Top-level fields of model that are missing or failed validation"""
+    if not isinstance(data, dict):
+        return list(model.model_fields)
+    bad = {error["loc"][0] for error in errors if error.get("loc")}
+    return [name for name in model.model_fields if name in bad]
+
+
+def parse_model(text: str, model: Type[M]) -> M:
+    """
+    Steps 1-2: validate the raw text, then the locally repaired text. A
+    repaired response that validates but was cut off inside a field still
+    raises, with that field flagged and the model on error.result.
+    """
+    try:
+        return model.model_validate_json(text)
+    except ValidationError:
+        pass
+    repaired, cut_key = _repair(text)
+    try:
+        data = json.loads(repaired)
+    except ValueError:
+        raise StructuredOutputError(model, None, [])
+    try:
+        result = model.model_validate(data)
+    except ValidationError as e:
+        raise StructuredOutputError(model, data, e.errors(include_url=False) + _cut_errors(model, cut_key))
+    cut = _cut_errors(model, cut_key)
+    if cut:
+        raise StructuredOutputError(model, data, cut, result=result)
+    record_json_repair("local")
+    return result
+
+
+def _cut_errors(model: Type[BaseModel], cut_key: Optional[str]) -> List[Dict]:
+    if cut_key not in model.model_fields:
+        return []
+    return [{"loc": (cut_key,), "msg": "response was cut off here, items may be missing", "type": "truncated"}]
+
+
+def field_schema(model: Type[BaseModel], fields: List[str]) -> str:
+    """JSON schema of just the given fields (with any nested definitions)"""
+    schema = model.model_json_schema()
+    subset = {
+        "type": "object",
+        "properties": {name: schema["properties"][name] for name in fields},
+        "required": fields,
+    }
+    if "$defs" in schema:
+        subset["$defs"] = schema["$defs"]
+    return json.dumps(subset, indent=2)
+
+
+def _fields_prompt(error: StructuredOutputError, prompt: str) -> str:
+    fields = invalid_fields(error.model, error.data, error.errors)
+    partial = {k: v for k, v in error.data.items() if k not in fields} if isinstance(error.data, dict) else {}
+    problems = [
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors if e.get("loc")
+    ]
+    return PromptTemplates.field_repair(
+        base_prompt=prompt,
+        model_name=error.model.__name__,
+        schema=field_schema(error.model, fields),
+        partial_json=json.dumps(partial, indent=2, ensure_ascii=False),
+        problems=problems
+    )
+
+
+def _merge_fields(error: StructuredOutputError, response: str) -> Dict:
+    fields = invalid_fields(error.model, error.data, error.errors)
+    patch = load_json(response)
+    if not isinstance(patch, dict):
+        raise StructuredOutputError(error.model, error.data, error.errors)
+    data = dict(error.data) if isinstance(error.data, dict) else {}
+    data.update({name: patch[name] for name in fields if name in patch})
+    return data
+
+
+def _accept_cut_short(result: Optional[M], error: StructuredOutputError) -> M:
+    """Fall back to the cut-off but valid parse when asking again didn't fix it"""
+    if result is None:
+        raise error
+    record_json_repair("local")
+    return result
+
+
+def _validate_merged(model: Type[M], data: Dict) -> M:
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise StructuredOutputError(model, data, e.errors(include_url=False))
+
+
+def parse_with_repair(
+    text: str,
+    model: Type[M],
+    prompt: str,
+    request: Optional[Callable[[str], str]] = None,
+    attempts: int = 1
+) -> M:
+    """
+    Parse text - the response to prompt - into model, asking
+    request(follow_up) -> JSON text for the bad fields up to `attempts`
+    times. Each follow-up repeats prompt, since that's where the values
+    come from. Raises StructuredOutputError if it still doesn't validate;
+    a response that was only cut off is accepted as it is once the
+    follow-ups are used up.
+    """
+    try:
+        return parse_model(text, model)
+    except StructuredOutputError as e:
+        error = e
+    cut_short = error.result
+    for _ in range(attempts if request else 0):
+        if not invalid_fields(model, error.data, error.errors):
+            break  # nothing narrower to ask for
+        record_json_repair("field_request")
+        try:
+            return _validate_merged(model, _merge_fields(error, request(_fields_prompt(error, prompt))))
+        except StructuredOutputError as e:
+            error = e
+        except ValueError:
+            pass  # the follow-up wasn't JSON either - try again or give up
+    return _accept_cut_short(cut_short, error)
+
+
+async def aparse_with_repair(
+    text: str,
+    model: Type[M],
+    prompt: str,
+    request: Optional[Callable[[str], Awaitable[str]]] = None,
+    attempts: int = 1
+) -> M:
+    """Async version of parse_with_repair"""
+    try:
+        return parse_model(text, model)
+    except StructuredOutputError as e:
+        error = e
+    cut_short = error.result
+    for _ in range(attempts if request else 0):
+        if not invalid_fields(model, error.data, error.errors):
+            break  # nothing narrower to ask for
+        record_json_repair("field_request")
+        try:
+            return _validate_merged(model, _merge_fields(error, await request(_fields_prompt(error, prompt))))
+        except StructuredOutputError as e:
+            error = e
+        except ValueError:
+            pass  # the follow-up wasn't JSON either - try again or give up
+    return _accept_cut_short(cut_short, error)
@@ -0,0 +1,21 @@
+"""
+Local token estimates - no tokenizer dependency.
+
+Kept apart from context_manager so the transport layer (scheduler,
+LLMClient) can budget tokens without pulling in the prompt templates.
+"""
+
+import re
+
+_WORDS = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough local token count. Takes the bigger of ~4 chars/token and ~1.3
+    tokens/word-ish piece, which lands close enough to llama/gpt tokenizers
+    for English prose to budget with.
+    """
+    if not text:
+        return 0
+    return max(len(text) // 4, int(len(_WORDS.findall(text)) * 1.3))
@@ -0,0 +1,117 @@
+"""
+Violation log with O(1) summaries.
+
+The enforcer used to append every violation entry to a plain list and walk
+the whole list for every summary. Fine for one story, but a batch worker
+that lives for hours kept every entry (with text previews) forever and paid
+O(n) per summary. Now:
+
+- counters by type, severity and scene are bumped on insert, so
+  summary() doesn't depend on how much has been logged
+- detailed entries go into a ring buffer that keeps the most recent ones
+- an optional JSONL sink gets every entry, for when the full history is
+  wanted on disk rather than in memory
+"""
+
+import json
+import threading
+from collections import Counter, deque
+from typing import Dict, Iterator, List, Optional
+
+
+class JsonlSink:
+    """
+    Append-only JSONL file. One sink can be shared by every transformer
+    in a process (batch mode) - writes are serialized by a lock and each
+    line is flushed as it's written so a crash loses at most one entry.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ViolationLog:
+    """
+    Thread-safe violation log (parallel scene mode logs from several threads).
+
+    capacity: how many detailed entries to keep in memory.
+    sink: optional JsonlSink that gets every entry, plus `labels` (e.g.
+    story/world) so entries from different runs can be told apart.
+    """
+
+    def __init__(self, capacity: int = 200, sink: Optional[JsonlSink] = None, labels: Optional[Dict] = None):
+        self.capacity = capacity
+        self.sink = sink
+        self.labels = labels or {}
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries = deque(maxlen=self.capacity)
+            self._logged = 0
+            self._total = 0
+            self._by_type = Counter()
+            self._by_severity = Counter()
+            self._by_scene = Counter()
+
+    def record(self, entry: Dict):
+        """Add one entry - {"scene", "attempt", "violations": [dicts], ...}"""
+        self.restore(entry)
+        if self.sink is not None:
+            self.sink.write({**self.labels, **entry})
+
+    def restore(self, entry: Dict):
+        """
+        Count an entry logged by an earlier process (a resumed run) - it's
+        in the summary again but not written to the sink a second time.
+        """
+        with self._lock:
+            self._entries.append(entry)
+            self._logged += 1
+            self._total += len(entry["violations"])
+            self._by_scene[entry["scene"]] += len(entry["violations"])
+            for violation in entry["violations"]:
+                self._by_type[violation["type"]] += 1
+                self._by_severity[violation["severity"]] += 1
+
+    def __len__(self) -> int:
+        """Entries logged so far, including ones the ring buffer has dropped"""
+        return self._logged
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.entries())
+
+    def entries(self) -> List[Dict]:
+        """The most recent entries still in memory"""
+        with self._lock:
+            return list(self._entries)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "total_violations": self._total,
+                "scenes_with_violations": len(self._by_scene),
+                "violation_types": dict(self._by_type),
+                "violation_severities": dict(self._by_severity),
+                "violations_per_scene": {str(scene): n for scene, n in sorted(self._by_scene.items())},
+                "logged_entries": self._logged,
+                "dropped_entries": self._logged - len(self._entries),
+                "detailed_log": list(self._entries),
+            }
@@ -0,0 +1,11 @@
+"""
+Puts the repo root on sys.path, so plain `pytest` (from anywhere) can import
+src/, run.py and benchmarks/ the same way python -m pytest from the root does.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,144 @@
+"""
+Tests for src/batch_runner.py over the replay fixture - no network.
+
+Run with: pytest
+"""
+
+import json
+import os
+import shutil
+import threading
+
+import pytest
+
+from src.backends import ReplayBackend
+from src.batch_runner import JOURNAL_FILE, BatchJob, BatchRunner, load_manifest
+from src.llm_client import LLMClient
+from src.scheduler import RateLimitScheduler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "romeo_juliet.jsonl")
+STORY = os.path.join(ROOT, "data", "romeo_juliet_story.txt")
+
+
+class Traffic:
+    """What every job's backend sent, shared across the batch"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.dna_calls = 0
+        self.calls = 0
+
+
+class TrackedReplay(ReplayBackend):
+    def __init__(self, traffic: Traffic, latency: float = 0.0):
+        super().__init__(FIXTURE, latency=latency)
+        self.traffic = traffic
+
+    async def acreate(self, **request):
+        traffic = self.traffic
+        with traffic.lock:
+            traffic.calls += 1
+            traffic.dna_calls += request["messages"][-1]["content"].startswith("Analyze this story")
+            traffic.in_flight += 1
+            traffic.max_in_flight = max(traffic.max_in_flight, traffic.in_flight)
+        try:
+            return await super().acreate(**request)
+        finally:
+            with traffic.lock:
+                traffic.in_flight -= 1
+
+    def create(self, **request):
+        raise AssertionError("batch jobs should only use the async API")
+
+
+def runner(traffic: Traffic, output_dir, latency: float = 0.0, **kwargs) -> BatchRunner:
+    def factory():
+        return LLMClient(api_key="offline", backend=TrackedReplay(traffic, latency), scheduler=RateLimitScheduler())
+    return BatchRunner(factory, output_dir=str(output_dir), **kwargs)
+
+
+def job(job_id: int, story_file: str = STORY, world_name: str = "2045") -> BatchJob:
+    return BatchJob(job_id=job_id, story_file=story_file, story_name="Romeo and Juliet",
+                    world=f"Cyberpunk {world_name}", world_name=world_name)
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+def test_manifest_jsonl_and_csv(tmp_path):
+    (tmp_path / "jobs.jsonl").write_text(
+        json.dumps({"story_file": "a.txt", "world": "Mars"}) + "\n\n"
+        + json.dumps({"story_file": "/abs/b.txt", "story_name": "B", "world": "Moon", "world_name": "moon"}) + "\n"
+    )
+    (tmp_path / "jobs.csv").write_text("story_file,world\na.txt,Mars\n")
+    jobs = load_manifest(str(tmp_path / "jobs.jsonl"))
+    assert [(j.job_id, j.story_file, j.story_name, j.world_name) for j in jobs] == [
+        (1, str(tmp_path / "a.txt"), "a", "world_1"),
+        (2, "/abs/b.txt", "B", "moon"),
+    ]
+    assert load_manifest(str(tmp_path / "jobs.csv"))[0].world == "Mars"
+
+
+def test_manifest_rows_need_story_and_world(tmp_path):
+    (tmp_path / "jobs.jsonl").write_text(json.dumps({"story_file": "a.txt"}) + "\n")
+    with pytest.raises(ValueError, match="row 1"):
+        load_manifest(str(tmp_path / "jobs.jsonl"))
+
+
+# ---------------------------------------------------------------------------
+# Running a batch
+# ---------------------------------------------------------------------------
+
+def test_dna_is_extracted_once_per_story(tmp_path):
+    other_story = str(tmp_path / "copy_of_story.txt")
+    shutil.copy(STORY, other_story)
+    jobs = [job(1, world_name="mars"), job(2, world_name="moon"), job(3, world_name="sea"),
+            job(4, other_story, world_name="mars")]
+    traffic = Traffic()
+    summary = runner(traffic, tmp_path / "out", workers=4).run(jobs)
+
+    assert summary["succeeded"] == 4
+    assert traffic.dna_calls == summary["dna_extractions"] == 2
+    # The two extractions are charged once, on top of the jobs' own tokens
+    assert summary["total_tokens"] > sum(r["tokens"] for r in summary["job_results"])
+    for row in summary["job_results"]:
+        assert os.path.isfile(os.path.join(row["output_dir"], JOURNAL_FILE))
+    assert os.path.isfile(tmp_path / "out" / "batch_summary.json")
+
+
+def test_workers_bound_requests_in_flight(tmp_path):
+    traffic = Traffic()
+    jobs = [job(n, world_name=f"w{n}") for n in range(1, 7)]
+    summary = runner(traffic, tmp_path, latency=0.01, workers=2).run(jobs)
+    assert summary["succeeded"] == 6
+    assert traffic.max_in_flight == 2
+
+
+def test_a_failing_job_does_not_stop_the_others(tmp_path):
+    jobs = [job(1), job(2, str(tmp_path / "missing.txt"), world_name="moon")]
+    summary = runner(Traffic(), tmp_path / "out").run(jobs)
+    statuses = {row["job_id"]: row["status"] for row in summary["job_results"]}
+    assert statuses == {1: "ok", 2: "failed"}
+    assert "missing.txt" in summary["job_results"][1]["error"]
+
+
+def test_resume_continues_each_job_from_its_journal(tmp_path):
+    jobs = [job(1)]
+    first = runner(Traffic(), tmp_path).run(jobs)
+    path = os.path.join(first["job_results"][0]["output_dir"], JOURNAL_FILE)
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        f.writelines(lines[:5])  # header, DNA, rulebook and two scenes
+
+    traffic = Traffic()
+    again = runner(traffic, tmp_path, resume=True).run(jobs)
+    row = again["job_results"][0]
+    assert (row["status"], row["resumed_scenes"]) == ("ok", 2)
+    assert row["scenes"] == first["job_results"][0]["scenes"]
+    assert traffic.dna_calls == 0
+    assert traffic.calls == row["scenes"] - 2
@@ -0,0 +1,45 @@
+"""
+Tests for benchmarks/bench_constraints.py - the synthetic grid and the baseline check.
+
+Run with: pytest
+"""
+
+from benchmarks.bench_constraints import HIT_EVERY, bench_cell, compare, make_rulebook, make_text
+
+
+def test_rulebook_has_the_requested_number_of_terms():
+    rulebook = make_rulebook(100)
+    assert len(rulebook.character_mappings) == len(rulebook.forbidden_elements) == 100
+    assert make_rulebook(100) == rulebook  # seeded, so baselines compare like for like
+
+
+def test_text_is_the_requested_size_with_rule_terms_in_it():
+    rulebook = make_rulebook(10)
+    text = make_text(10_000, rulebook)
+    assert len(text) == 10_000
+    assert make_text(10_000, rulebook) == text
+    terms = [m.original for m in rulebook.character_mappings] + rulebook.forbidden_elements
+    hits = sum(text.count(term) for term in terms)
+    assert hits >= 10_000 // HIT_EVERY
+
+
+def test_bench_cell_finds_violations():
+    row = bench_cell(10, 10_000, min_seconds=0, min_runs=1)
+    assert (row["terms"], row["text_bytes"]) == (10, 10_000)
+    assert row["violations"] > 0
+    assert row["mb_per_s"] > 0
+
+
+def test_compare_flags_throughput_drops_beyond_tolerance():
+    baseline = {"results": [
+        {"terms": 10, "text_bytes": 1000, "mb_per_s": 100.0},
+        {"terms": 10, "text_bytes": 9000, "mb_per_s": 100.0},
+    ]}
+    results = [
+        {"terms": 10, "text_bytes": 1000, "mb_per_s": 80.0},
+        {"terms": 10, "text_bytes": 9000, "mb_per_s": 70.0},
+        {"terms": 99, "text_bytes": 1000, "mb_per_s": 1.0},  # no baseline cell
+    ]
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert [(row["text_bytes"], prev["mb_per_s"]) for row, prev in regressions] == [(9000, 100.0)]
+    assert compare(results, {}, tolerance=0.25) == []
@@ -0,0 +1,71 @@
+"""
+Tests for src/constraint_enforcer.py with a scripted client - no network.
+
+Run with: pytest
+"""
+
+import asyncio
+
+from src.constraint_enforcer import ConstraintEnforcer
+from src.models import CharacterMapping, Rulebook
+
+CLEAN = "The corporation's data center hummed."
+DIRTY = "Romeo walked into the corporation's data center."
+
+
+def enforcer() -> ConstraintEnforcer:
+    rulebook = Rulebook(
+        world_setting={"era": "2045"},
+        character_mappings=[CharacterMapping(original="Romeo", new_world="Ray", role="lead", trait_preserved="love")],
+        plot_translations={},
+        constraints=["Keep it corporate"],
+        forbidden_elements=[],
+    )
+    return ConstraintEnforcer(rulebook, local_repair=False)
+
+
+class HedgedClient:
+    """Races two copies: judges both with accept, returns the first acceptable one"""
+
+    def __init__(self, *copies):
+        self.copies = list(copies)
+
+    def generate(self, prompt, temperature=0.7, accept=None, system=None, model=None):
+        return next((text for text in self.copies if accept is None or accept(text)), self.copies[0])
+
+    async def agenerate(self, prompt, temperature=0.7, accept=None, system=None, model=None):
+        return self.generate(prompt, temperature, accept, system, model)
+
+
+def counting(enforcer: ConstraintEnforcer) -> list:
+    checked = []
+    check = enforcer.check_constraints
+    enforcer.check_constraints = lambda text: checked.append(text) or check(text)
+    return checked
+
+
+def test_hedged_winner_is_not_checked_again():
+    scene_enforcer = enforcer()
+    checked = counting(scene_enforcer)
+    text, attempts = scene_enforcer.generate_with_enforcement(HedgedClient(DIRTY, CLEAN), "PROMPT", scene_number=1)
+    assert (text, attempts) == (CLEAN, 1)
+    assert checked == [DIRTY, CLEAN]
+
+
+def test_unhedged_call_is_checked_once():
+    scene_enforcer = enforcer()
+    checked = counting(scene_enforcer)
+    client = HedgedClient(CLEAN)
+    client.generate = lambda prompt, **kwargs: CLEAN  # accept never called, as without a hedge
+    assert scene_enforcer.generate_with_enforcement(client, "PROMPT", scene_number=1) == (CLEAN, 1)
+    assert checked == [CLEAN]
+
+
+def test_async_path_reuses_the_verdict_too():
+    scene_enforcer = enforcer()
+    checked = counting(scene_enforcer)
+    text, attempts = asyncio.run(scene_enforcer.agenerate_with_enforcement(
+        HedgedClient(DIRTY, DIRTY), "PROMPT", scene_number=1, max_retries=0
+    ))
+    assert (text, attempts) == (DIRTY, 1)
+    assert checked == [DIRTY]  # both copies are the same text - one check
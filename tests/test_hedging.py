@@ -0,0 +1,154 @@
+"""
+Tests for src/hedging.py - racing a duplicate of slow calls.
+
+Run with: pytest
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+
+import pytest
+
+from src.hedging import Hedger
+
+
+def trained(delay: float = 0.05, **kwargs) -> Hedger:
+    """Hedger that has seen enough calls to hedge anything slower than `delay`"""
+    hedger = Hedger(percentile=0.5, min_samples=4, **kwargs)
+    for _ in range(4):
+        hedger.observe("text", delay)
+    return hedger
+
+
+class Copies:
+    """send() for the sync hedger: call i sleeps delays[i], then returns f"copy {i}" (or raises)"""
+
+    def __init__(self, *delays, fail=()):
+        self.delays = delays
+        self.fail = fail
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            i = next(self.counter)
+        time.sleep(self.delays[i])
+        if i in self.fail:
+            raise ConnectionError(f"copy {i} failed")
+        return f"copy {i}"
+
+    async def acall(self):
+        with self.lock:
+            i = next(self.counter)
+        await asyncio.sleep(self.delays[i])
+        if i in self.fail:
+            raise ConnectionError(f"copy {i} failed")
+        return f"copy {i}"
+
+
+# ---------------------------------------------------------------------------
+# delay_for
+# ---------------------------------------------------------------------------
+
+def test_no_hedging_until_enough_samples():
+    hedger = Hedger(percentile=0.9, min_samples=3)
+    hedger.observe("text", 1.0)
+    hedger.observe("text", 2.0)
+    assert hedger.delay_for("text") is None
+    hedger.observe("text", 3.0)
+    assert hedger.delay_for("text") == 3.0
+
+
+def test_delay_is_the_percentile_latency():
+    hedger = Hedger(percentile=0.9, min_samples=1)
+    for latency in range(1, 11):
+        hedger.observe("text", float(latency))
+    assert hedger.delay_for("text") == 9.0
+
+
+def test_only_configured_kinds_are_hedged():
+    hedger = Hedger(min_samples=1, kinds=("text",))
+    hedger.observe("json", 1.0)
+    assert hedger.delay_for("json") is None
+
+
+def test_min_delay_floor():
+    hedger = Hedger(min_samples=1, min_delay=0.5)
+    hedger.observe("text", 0.01)
+    assert hedger.delay_for("text") == 0.5
+
+
+@pytest.mark.parametrize("percentile", [0, 1, 1.5])
+def test_percentile_must_be_a_fraction(percentile):
+    with pytest.raises(ValueError):
+        Hedger(percentile=percentile)
+
+
+# ---------------------------------------------------------------------------
+# run (threads)
+# ---------------------------------------------------------------------------
+
+def test_fast_call_is_not_hedged():
+    send = Copies(0.0)
+    assert trained(0.2).run(send, "text") == ("copy 0", False)
+
+
+def test_slow_call_gets_hedged_and_the_hedge_wins():
+    hedger = trained(0.02)
+    losers = []
+    response, hedged = hedger.run(Copies(0.5, 0.0), "text", on_loser=losers.append)
+    assert (response, hedged) == ("copy 1", True)
+    assert hedger.get_stats()["hedge_wins"] == 1
+    time.sleep(0.6)
+    assert losers == ["copy 0"]  # settled once the slow copy finished
+
+
+def test_accept_passes_over_a_rejected_first_answer():
+    response, _ = trained(0.02).run(Copies(0.1, 0.2), "text", accept=lambda text: text == "copy 1")
+    assert response == "copy 1"
+
+
+def test_nothing_acceptable_returns_the_first_back():
+    response, _ = trained(0.02).run(Copies(0.1, 0.2), "text", accept=lambda text: False)
+    assert response == "copy 0"
+
+
+def test_one_failed_copy_is_survivable():
+    response, hedged = trained(0.02).run(Copies(0.1, 0.0, fail={1}), "text")
+    assert (response, hedged) == ("copy 0", True)
+
+
+def test_both_copies_failing_raises():
+    with pytest.raises(ConnectionError):
+        trained(0.02).run(Copies(0.1, 0.0, fail={0, 1}), "text")
+
+
+# ---------------------------------------------------------------------------
+# arun (asyncio)
+# ---------------------------------------------------------------------------
+
+def test_async_hedge_wins_and_the_loser_is_cancelled():
+    hedger = trained(0.02)
+    send = Copies(5.0, 0.0)
+    losers = []
+    start = time.perf_counter()
+    response, hedged = asyncio.run(hedger.arun(send.acall, "text", on_loser=losers.append))
+    assert (response, hedged) == ("copy 1", True)
+    assert time.perf_counter() - start < 1.0
+    assert losers == [None]  # cancelled - no usage to settle
+
+
+def test_async_accept_and_failures():
+    hedger = trained(0.02)
+    response, _ = asyncio.run(hedger.arun(Copies(0.1, 0.2).acall, "text", accept=lambda text: text == "copy 1"))
+    assert response == "copy 1"
+    with pytest.raises(ConnectionError):
+        asyncio.run(hedger.arun(Copies(0.1, 0.0, fail={0, 1}).acall, "text"))
+
+
+def test_async_fast_call_is_not_hedged():
+    send = Copies(0.0)
+    assert asyncio.run(trained(0.2).arun(send.acall, "text")) == ("copy 0", False)
+    assert next(send.counter) == 1  # only one copy was sent
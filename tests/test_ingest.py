@@ -0,0 +1,87 @@
+"""
+Tests for src/ingest.py - chunking and the local DNA merge.
+
+Run with: pytest
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.ingest import iter_file_chunks, merge_dna, split_story
+from src.models import Character, CharacterMapping, PlotBeat, Rulebook, StoryDNA
+from src.story_transformer import StoryTransformer
+
+
+def dna(themes=(), names=(), beats=(), arc="calm", conflict="person vs self") -> StoryDNA:
+    return StoryDNA(
+        themes=list(themes),
+        characters=[Character(name=n, archetype="hero", core_trait="brave", role="lead") for n in names],
+        plot_beats=[PlotBeat(beat_name=b, description=f"{b} happens", emotion="hope", act=1) for b in beats],
+        emotional_arc=arc,
+        conflict_type=conflict,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Chunking
+# ---------------------------------------------------------------------------
+
+def test_split_story_cuts_at_paragraphs():
+    text = "\n\n".join(f"Paragraph {i} " + "word " * 30 for i in range(10))
+    chunks = split_story(text, chunk_tokens=60)
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert all(chunk.endswith("\n\n") for chunk in chunks[:-1])
+
+
+def test_file_chunks_match_string_chunks(tmp_path):
+    text = "\n\n".join("Ünïcode paragraph " + "wörd " * 25 for _ in range(8))
+    path = tmp_path / "story.txt"
+    path.write_text(text, encoding="utf-8")
+    assert "".join(iter_file_chunks(str(path), chunk_tokens=50)) == text
+
+
+# ---------------------------------------------------------------------------
+# merge_dna
+# ---------------------------------------------------------------------------
+
+def test_merge_needs_a_partial():
+    with pytest.raises(ValueError):
+        merge_dna([])
+
+
+def test_merge_dedupes_characters_and_ranks_themes():
+    merged = merge_dna([
+        dna(themes=["Duty", "love"], names=["Rama", "Sita"], beats=["exile"]),
+        dna(themes=["Love ", "exile"], names=["rama", "Ravana"], beats=["abduction", "Exile"]),
+        dna(themes=["love"], names=["Ravana"], beats=["war"]),
+    ])
+    assert merged.themes[0] == "love"
+    assert [c.name for c in merged.characters] == ["Rama", "Ravana", "Sita"]
+    assert [b.beat_name for b in merged.plot_beats] == ["exile", "abduction", "war"]
+    assert [b.act for b in merged.plot_beats] == [1, 2, 3]
+
+
+def test_merge_skips_blank_themes():
+    merged = merge_dna([dna(themes=["", "  "]), dna(themes=["loyalty"])])
+    assert merged.themes == ["loyalty"]
+
+
+def test_merge_without_any_theme_gives_empty_themes():
+    assert merge_dna([dna(), dna(themes=[" "])]).themes == []
+
+
+def test_prompts_fall_back_to_default_theme():
+    transformer = StoryTransformer(SimpleNamespace())
+    themeless = merge_dna([dna(beats=["exile"]), dna(beats=["war"])])
+    rulebook = Rulebook(
+        world_setting={"era": "2045"},
+        character_mappings=[CharacterMapping(original="Rama", new_world="Ray", role="lead", trait_preserved="duty")],
+        plot_translations={},
+        constraints=[],
+        forbidden_elements=[],
+    )
+    assert StoryTransformer.DEFAULT_THEME in transformer._synopsis_prompt(themeless, rulebook)
+    assert StoryTransformer.DEFAULT_THEME in transformer._scene_rules(themeless, rulebook)
+    assert StoryTransformer.DEFAULT_THEME in transformer._rulebook_prompt(themeless, "2045")
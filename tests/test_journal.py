@@ -0,0 +1,178 @@
+"""
+Tests for src/journal.py and resuming a run from it.
+
+Run with: pytest
+"""
+
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import run
+from src.backends import ReplayBackend
+from src.journal import JournalError, RunJournal
+from src.llm_client import LLMClient
+from src.models import SceneResult
+from src.scheduler import RateLimitScheduler
+from src.story_transformer import StoryTransformer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "romeo_juliet.jsonl")
+STORY = os.path.join(ROOT, "data", "romeo_juliet_story.txt")
+
+
+def scene(n: int) -> SceneResult:
+    return SceneResult(scene_number=n, beat_name=f"beat {n}", text=f"Scene {n} text.", attempts=1, seconds=0.1)
+
+
+def tear(path, text='{"type": "scene", "scene": {"scene_nu'):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+# ---------------------------------------------------------------------------
+# RunJournal
+# ---------------------------------------------------------------------------
+
+def test_journal_replays_what_was_recorded(tmp_path):
+    path = tmp_path / "run.jsonl"
+    journal = RunJournal.create(str(path), run_id="r1", story_name="R&J", model="m1")
+    journal.record_synopses(["a", "b"])
+    journal.record_scene(scene(1))
+    journal.record_scene(scene(2))
+    journal.close()
+
+    reopened = RunJournal.open(str(path))
+    assert reopened.run == {"run_id": "r1", "story_name": "R&J", "model": "m1"}
+    assert reopened.synopses == ["a", "b"]
+    assert sorted(reopened.scenes) == [1, 2]
+    assert all(s.resumed for s in reopened.scenes.values())
+    reopened.close()
+
+
+def test_torn_last_line_is_dropped_and_the_journal_keeps_going(tmp_path):
+    path = tmp_path / "run.jsonl"
+    journal = RunJournal.create(str(path), run_id="r1")
+    journal.record_scene(scene(1))
+    journal.close()
+    good_size = path.stat().st_size
+    tear(path)
+
+    journal = RunJournal.open(str(path))
+    assert sorted(journal.scenes) == [1]
+    assert path.stat().st_size == good_size  # torn record cut off
+    journal.record_scene(scene(2))
+    journal.close()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["type"] for line in lines] == ["run", "scene", "scene"]
+    assert sorted(RunJournal.open(str(path)).scenes) == [1, 2]
+
+
+def test_complete_last_line_without_newline_is_dropped(tmp_path):
+    path = tmp_path / "run.jsonl"
+    RunJournal.create(str(path), run_id="r1").close()
+    tear(path, json.dumps({"type": "scene", "scene": scene(1).model_dump()}))
+    assert RunJournal.open(str(path)).scenes == {}
+
+
+def test_damage_before_the_last_line_is_an_error(tmp_path):
+    path = tmp_path / "run.jsonl"
+    journal = RunJournal.create(str(path), run_id="r1")
+    journal.close()
+    tear(path, "not json\n")
+    tear(path, json.dumps({"type": "scene", "scene": scene(1).model_dump()}) + "\n")
+    with pytest.raises(JournalError):
+        RunJournal.open(str(path))
+
+
+def test_missing_or_headerless_journal_is_an_error(tmp_path):
+    with pytest.raises(JournalError):
+        RunJournal.open(str(tmp_path / "nope.jsonl"))
+    path = tmp_path / "headless.jsonl"
+    path.write_text(json.dumps({"type": "scene", "scene": scene(1).model_dump()}) + "\n")
+    with pytest.raises(JournalError):
+        RunJournal.open(str(path))
+
+
+# ---------------------------------------------------------------------------
+# Resuming a run
+# ---------------------------------------------------------------------------
+
+class DiesAt(ReplayBackend):
+    """Replays the fixture but fails the Nth plain-text (scene) call"""
+
+    def __init__(self, fail_at=None):
+        super().__init__(FIXTURE)
+        self.fail_at = fail_at
+        self.scene_calls = 0
+
+    def _tick(self, request):
+        if request.get("response_format") is None:
+            self.scene_calls += 1
+            if self.scene_calls == self.fail_at:
+                raise ConnectionError("network down")
+
+    def create(self, **request):
+        self._tick(request)
+        return super().create(**request)
+
+    async def acreate(self, **request):
+        self._tick(request)
+        return await super().acreate(**request)
+
+
+def transformer(backend, journal) -> StoryTransformer:
+    client = LLMClient(api_key="offline", backend=backend, scheduler=RateLimitScheduler())
+    return StoryTransformer(client, source_story_name="Romeo and Juliet", target_world_name="2045", journal=journal)
+
+
+def test_resume_after_a_crash_skips_everything_journaled(tmp_path):
+    story = open(STORY).read()
+    path = str(tmp_path / "run.jsonl")
+    journal = RunJournal.create(path, run_id="r1")
+    with pytest.raises(ConnectionError):
+        for _ in transformer(DiesAt(fail_at=4), journal).transform_iter(story, "Cyberpunk", output_dir=str(tmp_path)):
+            pass
+    journal.close()
+    tear(path)
+
+    journal = RunJournal.open(path)
+    done = sorted(journal.scenes)
+    assert done == [1, 2, 3] and journal.dna and journal.rulebook
+    backend = DiesAt()
+    resumed = transformer(backend, journal)
+    scenes = list(resumed.transform_iter(story, "Cyberpunk", output_dir=str(tmp_path)))
+    journal.close()
+
+    assert [s.scene_number for s in scenes if s.resumed] == done
+    assert len(scenes) == journal.total_scenes
+    # No DNA/rulebook calls, one call per scene that was still missing
+    assert backend.calls == backend.scene_calls == len(scenes) - len(done)
+    assert RunJournal.open(path).complete
+
+
+# ---------------------------------------------------------------------------
+# run.py --resume settings
+# ---------------------------------------------------------------------------
+
+def args(**flags):
+    return SimpleNamespace(**{"model": None, "provider": None, "scene_mode": None, **flags})
+
+
+def test_resume_uses_the_journaled_settings():
+    journal = SimpleNamespace(run_id="r1", run={"model": "big", "provider": "openai", "scene_mode": "parallel"})
+    config = {"model": "env-model", "provider": "groq", "scene_mode": "sequential"}
+    assert run.resumed_settings(config, args(model="big"), journal) == []
+    assert config == {"model": "big", "provider": "openai", "scene_mode": "parallel"}
+
+
+def test_resume_refuses_flags_that_disagree_with_the_journal():
+    journal = SimpleNamespace(run_id="r1", run={"model": "big", "scene_mode": "parallel"})
+    config = {"model": "env-model", "provider": "groq", "scene_mode": "sequential"}
+    problems = run.resumed_settings(config, args(model="small", scene_mode="sequential"), journal)
+    assert len(problems) == 2
+    assert "--model small" in problems[0] and "--scene-mode sequential" in problems[1]
+    assert config["provider"] == "groq"  # older journal without a provider keeps the current one
@@ -0,0 +1,257 @@
+"""
+Tests for src/llm_client.py against in-process fake backends - no network.
+
+Run with: pytest
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.backends import LLMBackend
+from src.llm_client import LLMClient
+from src.scheduler import RateLimitScheduler
+from src.tokens import estimate_tokens
+
+
+def completion(text: str, tokens: int = 20):
+    usage = SimpleNamespace(prompt_tokens=tokens // 2, completion_tokens=tokens // 2, total_tokens=tokens)
+    message = SimpleNamespace(content=text)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+
+class SlowBackend(LLMBackend):
+    """Answers every request after `delay` seconds and tracks how many are in flight"""
+
+    def __init__(self, delay: float = 0.05, text: str = "ok"):
+        self.delay = delay
+        self.text = text
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    def create(self, **request):
+        self.calls += 1
+        time.sleep(self.delay)
+        return completion(self.text)
+
+    async def acreate(self, **request):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return completion(f"{self.text} {request.get('seed')}")
+
+
+def make_client(backend: LLMBackend, **kwargs) -> LLMClient:
+    return LLMClient(api_key="offline", backend=backend, scheduler=RateLimitScheduler(), **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# agenerate: concurrency limit, timeouts, cancellation
+# ---------------------------------------------------------------------------
+
+def test_agenerate_stays_within_max_concurrency():
+    backend = SlowBackend(delay=0.05)
+    client = make_client(backend, max_concurrency=3)
+
+    async def run():
+        return await asyncio.gather(*[client.agenerate(f"prompt {i}") for i in range(10)])
+
+    assert len(asyncio.run(run())) == 10
+    assert backend.max_in_flight == 3
+    assert backend.in_flight == 0
+
+
+def test_agenerate_overlaps_calls():
+    client = make_client(SlowBackend(delay=0.1), max_concurrency=8)
+
+    async def run():
+        return await asyncio.gather(*[client.agenerate(f"prompt {i}") for i in range(8)])
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    assert time.perf_counter() - start < 0.5  # 8 x 0.1s, not one after another
+
+
+def test_agenerate_default_and_per_call_timeout():
+    client = make_client(SlowBackend(delay=0.3), timeout=0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.agenerate("prompt"))
+    # A per-call timeout overrides the client default
+    assert asyncio.run(client.agenerate("prompt", timeout=2.0)).startswith("ok")
+
+
+def test_timed_out_call_frees_its_slot():
+    backend = SlowBackend(delay=0.3)
+    client = make_client(backend, max_concurrency=1)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await client.agenerate("slow", timeout=0.05)
+        backend.delay = 0.0
+        return await asyncio.wait_for(client.agenerate("next"), timeout=1.0)
+
+    assert asyncio.run(run()).startswith("ok")
+    assert backend.in_flight == 0
+
+
+def test_cancelling_agenerate_cancels_the_request():
+    backend = SlowBackend(delay=5.0)
+    client = make_client(backend, max_concurrency=1)
+
+    async def run():
+        task = asyncio.ensure_future(client.agenerate("prompt"))
+        await asyncio.sleep(0.05)
+        assert backend.in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return backend.in_flight
+
+    start = time.perf_counter()
+    assert asyncio.run(run()) == 0
+    assert time.perf_counter() - start < 1.0
+
+
+def test_client_works_across_event_loops():
+    backend = SlowBackend(delay=0.01)
+    client = make_client(backend, max_concurrency=2)
+    for _ in range(3):
+        asyncio.run(client.agenerate("prompt"))  # a fresh loop each time
+    assert backend.calls == 3
+
+
+# ---------------------------------------------------------------------------
+# generate_candidates / agenerate_candidates
+# ---------------------------------------------------------------------------
+
+def test_async_candidates_stay_within_max_concurrency():
+    backend = SlowBackend(delay=0.05)
+    client = make_client(backend, max_concurrency=2)
+    results = asyncio.run(client.agenerate_candidates("prompt", n=5))
+    assert len(results) == 5
+    assert backend.max_in_flight == 2
+
+
+def test_async_candidates_time_out_per_call():
+    client = make_client(SlowBackend(delay=5.0), timeout=0.05)
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.agenerate_candidates("prompt", n=3))
+    assert time.perf_counter() - start < 1.0
+
+
+def test_async_candidates_stop_at_first_clean_sample():
+    backend = SlowBackend(delay=0.05)
+    client = make_client(backend, max_concurrency=1)
+    results = asyncio.run(client.agenerate_candidates("prompt", n=4, check=lambda text: []))
+    assert len(results) == 1
+    # The others were still waiting for the only slot - never sent, never charged
+    assert backend.calls == 1
+    assert client.candidate_tokens == 0
+
+
+def test_candidates_check_each_sample_once():
+    checked = []
+    client = make_client(SlowBackend(delay=0.01))
+    results = client.generate_candidates("prompt", n=3, check=lambda text: checked.append(text) or ["bad"])
+    assert len(results) == 3
+    assert sorted(checked) == sorted(text for text, _ in results)
+
+
+@pytest.mark.parametrize("n", [0, -1])
+def test_candidates_need_at_least_one_sample(n):
+    client = make_client(SlowBackend())
+    with pytest.raises(ValueError):
+        client.generate_candidates("prompt", n=n)
+    with pytest.raises(ValueError):
+        asyncio.run(client.agenerate_candidates("prompt", n=n))
+
+
+# ---------------------------------------------------------------------------
+# Streams
+# ---------------------------------------------------------------------------
+
+class StreamBackend(LLMBackend):
+    """Streams words of `text` one chunk each; no usage chunk unless asked"""
+
+    def __init__(self, text: str, usage=None):
+        self.text = text
+        self.usage = usage
+
+    def _chunks(self):
+        chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))], usage=None)
+            for word in self.text.split()
+        ]
+        if self.usage:
+            chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(**self.usage)))
+        return chunks
+
+    def create(self, **request):
+        return iter(self._chunks())
+
+    async def acreate(self, **request):
+        async def chunks():
+            for chunk in self._chunks():
+                yield chunk
+        return chunks()
+
+
+def test_cut_off_stream_is_counted_with_estimate_tokens():
+    text = "Neon rain, data-ghosts, and a corporation that never sleeps. " * 20
+    client = make_client(StreamBackend(text))
+    chunks = client.stream("Write, with punctuation: a scene!", system="Rules.")
+    received = "".join(next(chunks) for _ in range(30))
+    chunks.close()  # cut off early - the provider never sent usage
+    breakdown = client.get_token_breakdown()
+    assert breakdown["prompt_tokens"] == estimate_tokens("Rules.") + estimate_tokens("Write, with punctuation: a scene!")
+    assert breakdown["completion_tokens"] == estimate_tokens(received)
+    assert client.get_token_usage() == breakdown["prompt_tokens"] + breakdown["completion_tokens"]
+    assert estimate_tokens(received) > len(received) // 4  # punctuation-heavy prose
+
+
+def test_finished_stream_uses_reported_usage():
+    usage = {"prompt_tokens": 11, "completion_tokens": 7, "total_tokens": 18}
+    client = make_client(StreamBackend("a few words", usage))
+    assert "".join(client.stream("prompt")) == "a few words "
+    assert client.get_token_usage() == 18
+
+
+def test_async_stream_is_counted_the_same_way():
+    client = make_client(StreamBackend("one two three four"))
+
+    async def read():
+        return "".join([chunk async for chunk in client.astream("prompt")])
+
+    text = asyncio.run(read())
+    assert client.get_token_breakdown()["completion_tokens"] == estimate_tokens(text)
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+def test_backend_needs_create_and_acreate():
+    class SyncOnly(LLMBackend):
+        def create(self, **request):
+            return completion("ok")
+
+    with pytest.raises(TypeError):
+        SyncOnly()
+
+
+def test_every_shipped_backend_implements_both():
+    import benchmarks.bench_pipeline as bench
+    from src.backends import ChatCompletionsBackend, RecordingBackend, ReplayBackend
+    from src.providers import RouterBackend
+
+    for cls in (ChatCompletionsBackend, RecordingBackend, ReplayBackend, RouterBackend,
+                bench.CountingBackend, bench.OutputsBackend):
+        assert not cls.__abstractmethods__, cls.__name__
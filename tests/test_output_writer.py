@@ -0,0 +1,96 @@
+"""
+Tests for src/output_writer.py - scene-by-scene output, in story order.
+
+Run with: pytest
+"""
+
+import json
+from types import SimpleNamespace
+
+from src.models import SceneResult
+from src.output_writer import SCENE_SEPARATOR, OutputWriter
+
+
+def scene(n: int, violations=()) -> SceneResult:
+    return SceneResult(scene_number=n, beat_name=f"beat {n}", text=f"Scene {n} text.", attempts=1,
+                       violations=list(violations), seconds=0.1)
+
+
+def story_scenes(writer: OutputWriter) -> list:
+    """Scene texts in final_story_*.md, after the title block"""
+    with open(writer.path("final_story", "md")) as f:
+        body = f.read().split("---\n\n", 1)[1]
+    return [part for part in body.split(SCENE_SEPARATOR) if part]
+
+
+def pending(writer: OutputWriter) -> list:
+    with open(writer.path("pending_scenes", "jsonl")) as f:
+        return [SceneResult.model_validate_json(line).scene_number for line in f]
+
+
+def test_in_order_scenes_go_straight_into_the_story(tmp_path):
+    writer = OutputWriter(str(tmp_path), "Romeo and Juliet", "2045")
+    writer.add_scene(scene(1))
+    assert story_scenes(writer) == ["Scene 1 text."]  # flushed, readable mid-run
+    writer.add_scene(scene(2))
+    writer.close()
+    assert story_scenes(writer) == ["Scene 1 text.", "Scene 2 text."]
+    assert not (tmp_path / "pending_scenes_romeo_and_juliet.jsonl").exists()
+
+
+def test_out_of_order_scenes_wait_in_the_pending_file(tmp_path):
+    writer = OutputWriter(str(tmp_path), "Romeo and Juliet", "2045")
+    writer.add_scene(scene(3))
+    writer.add_scene(scene(2))
+    assert story_scenes(writer) == []
+    assert pending(writer) == [3, 2]
+
+    writer.add_scene(scene(1))
+    assert story_scenes(writer) == ["Scene 1 text.", "Scene 2 text.", "Scene 3 text."]
+    writer.add_scene(scene(4))
+    writer.close()
+    assert story_scenes(writer) == [f"Scene {n} text." for n in range(1, 5)]
+    assert not (tmp_path / "pending_scenes_romeo_and_juliet.jsonl").exists()
+
+
+def test_crash_keeps_scenes_that_were_still_waiting(tmp_path):
+    writer = OutputWriter(str(tmp_path), "Romeo and Juliet", "2045")
+    writer.add_scene(scene(1))
+    writer.add_scene(scene(3, violations=[{"scene": 3, "type": "character_name"}]))
+    writer.add_scene(scene(4))
+    writer.close()  # scene 2 never arrived
+
+    assert story_scenes(writer) == ["Scene 1 text."]
+    assert pending(writer) == [3, 4]
+    with open(writer.path("constraint_log", "jsonl")) as f:
+        assert [json.loads(line) for line in f] == [{"scene": 3, "type": "character_name"}]
+
+
+def test_begin_story_starts_over(tmp_path):
+    writer = OutputWriter(str(tmp_path), "Romeo and Juliet", "2045")
+    writer.add_scene(scene(2))
+    writer.close()
+    writer.begin_story()
+    assert not (tmp_path / "pending_scenes_romeo_and_juliet.jsonl").exists()
+    writer.add_scene(scene(1))
+    writer.close()
+    assert story_scenes(writer) == ["Scene 1 text."]
+
+
+def test_finish_closes_the_story_and_writes_the_artifacts(tmp_path):
+    writer = OutputWriter(str(tmp_path), "Romeo and Juliet", "2045")
+    writer.add_scene(scene(2))
+    writer.add_scene(scene(1))
+    writer.finish({
+        "dna": SimpleNamespace(themes=["love", "fate"]),
+        "violations": {"total_violations": 0, "detailed_log": []},
+        "metadata": {"model": "test"},
+    })
+    with open(writer.path("final_story", "md")) as f:
+        story = f.read()
+    assert story.index("Scene 1 text.") < story.index("Scene 2 text.") < story.index("## About This Story")
+    assert "**Themes preserved**: love, fate" in story
+    with open(writer.path("metadata", "json")) as f:
+        assert json.load(f) == {"model": "test"}
+    assert (tmp_path / "constraint_log_romeo_and_juliet.json").exists()
+    assert not (tmp_path / "pending_scenes_romeo_and_juliet.jsonl").exists()
@@ -0,0 +1,145 @@
+"""
+Tests for src/retry_policy.py - when leftover violations are worth a regeneration.
+
+Run with: pytest
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.models import ConstraintViolation
+from src.providers import ProviderSpec, RouterBackend
+from src.retry_policy import RetryPolicy, SeverityRetryPolicy, parse_thresholds, retry_policy_from_env
+from src.story_transformer import StoryTransformer
+
+
+def violations(*severities):
+    return [ConstraintViolation(type="test", severity=s, detail=f"{s} problem") for s in severities]
+
+
+# ---------------------------------------------------------------------------
+# decide
+# ---------------------------------------------------------------------------
+
+def test_default_policy_retries_anything_until_max_retries():
+    policy = RetryPolicy()
+    assert policy.decide(violations("low"), attempt=1, max_retries=2) == (True, "retry")
+    assert policy.decide(violations("low"), attempt=3, max_retries=2) == (False, "max_retries")
+
+
+@pytest.mark.parametrize("severities, retry", [
+    (("high",), True),
+    (("medium",), False),
+    (("medium", "medium"), True),
+    (("low", "low", "low", "low"), False),
+    (("low", "medium"), False),
+])
+def test_default_thresholds(severities, retry):
+    decision = SeverityRetryPolicy().decide(violations(*severities), attempt=1, max_retries=2)
+    assert decision.retry is retry
+    assert decision.reason == ("retry" if retry else "below_threshold")
+
+
+def test_custom_thresholds():
+    policy = SeverityRetryPolicy(thresholds={"high": 0, "low": 2})
+    assert not policy.decide(violations("high", "high"), attempt=1, max_retries=2).retry
+    assert policy.decide(violations("low", "low"), attempt=1, max_retries=2).retry
+
+
+def test_unknown_severity_is_rejected():
+    with pytest.raises(ValueError):
+        SeverityRetryPolicy(thresholds={"critical": 1})
+
+
+def test_max_retries_wins_over_threshold():
+    decision = SeverityRetryPolicy().decide(violations("high"), attempt=3, max_retries=2)
+    assert decision == (False, "max_retries")
+
+
+def test_budget_caps_regenerations_for_the_run():
+    policy = SeverityRetryPolicy(budget=2)
+    decisions = [policy.decide(violations("high"), attempt=1, max_retries=2) for _ in range(3)]
+    assert [d.reason for d in decisions] == ["retry", "retry", "budget_exhausted"]
+    assert not policy.can_retry()
+    stats = policy.stats()
+    assert (stats["regenerations"], stats["accepted_over_budget"], stats["budget_left"]) == (2, 1, 0)
+
+
+def test_aborted_stream_is_retried_below_threshold_and_over_budget():
+    policy = SeverityRetryPolicy(budget=0)
+    assert policy.decide(violations("low"), attempt=1, max_retries=2, aborted=True) == (True, "aborted")
+
+
+def test_restore_counts_against_the_budget():
+    policy = SeverityRetryPolicy(budget=3)
+    policy.restore(3)
+    assert not policy.can_retry()
+    assert policy.decide(violations("high"), attempt=1, max_retries=2).reason == "budget_exhausted"
+
+
+def test_fresh_copy_has_its_own_counters():
+    policy = SeverityRetryPolicy(budget=1)
+    policy.decide(violations("high"), attempt=1, max_retries=2)
+    fresh = policy.fresh()
+    assert fresh.can_retry() and not policy.can_retry()
+    assert fresh.thresholds == policy.thresholds
+
+
+# ---------------------------------------------------------------------------
+# settings_for
+# ---------------------------------------------------------------------------
+
+def test_default_settings_keep_temperature_and_model():
+    assert RetryPolicy().settings_for(1, 0.7) == (0.7, None)
+    assert SeverityRetryPolicy().settings_for(2, 0.7) == (0.7, None)
+
+
+def test_temperature_steps_per_retry_within_bounds():
+    policy = SeverityRetryPolicy(temperature_step=0.2, max_temperature=1.0)
+    assert [policy.settings_for(retry, 0.7)[0] for retry in (1, 2, 3)] == [0.9, 1.0, 1.0]
+    cooler = SeverityRetryPolicy(temperature_step=-0.5)
+    assert [cooler.settings_for(retry, 0.7)[0] for retry in (1, 2)] == [0.2, 0.0]
+    assert policy.stats()["temperature_escalations"] == 3
+
+
+def test_models_escalate_and_the_last_one_sticks():
+    policy = SeverityRetryPolicy(models=["bigger", "biggest"])
+    assert [policy.settings_for(retry, 0.7)[1] for retry in (1, 2, 3)] == ["bigger", "biggest", "biggest"]
+    assert policy.stats()["model_escalations"] == 3
+
+
+# ---------------------------------------------------------------------------
+# from the environment
+# ---------------------------------------------------------------------------
+
+def test_parse_thresholds():
+    assert parse_thresholds("high:1, medium:3,low:0") == {"high": 1, "medium": 3, "low": 0}
+    with pytest.raises(ValueError):
+        parse_thresholds("high")
+
+
+def test_policy_from_env(monkeypatch):
+    monkeypatch.delenv("LLM_PROVIDERS", raising=False)
+    monkeypatch.setenv("RETRY_POLICY", "severity")
+    monkeypatch.setenv("RETRY_BUDGET", "4")
+    monkeypatch.setenv("RETRY_MODELS", "a, b")
+    policy = retry_policy_from_env()
+    assert (policy.budget, policy.models) == (4, ["a", "b"])
+    monkeypatch.setenv("RETRY_POLICY", "always")
+    assert retry_policy_from_env() is None
+
+
+def test_models_are_refused_with_a_router(monkeypatch):
+    monkeypatch.setenv("RETRY_POLICY", "severity")
+    monkeypatch.setenv("RETRY_MODELS", "bigger")
+    monkeypatch.setenv("LLM_PROVIDERS", "groq:small,openai:other")
+    with pytest.raises(ValueError, match="RETRY_MODELS"):
+        retry_policy_from_env()
+
+    router = RouterBackend([ProviderSpec(kind="local", model="small")], backends=[object()])
+    client = SimpleNamespace(backend=router)
+    with pytest.raises(ValueError, match="RouterBackend"):
+        StoryTransformer(client, retry_policy=SeverityRetryPolicy(models=["bigger"]))
+    # Temperature escalation alone is fine
+    StoryTransformer(client, retry_policy=SeverityRetryPolicy(temperature_step=0.1))
@@ -0,0 +1,214 @@
+"""
+Tests for src/rule_matcher.py - the one-pass rulebook matcher.
+
+Run with: pytest
+"""
+
+import random
+
+import pytest
+
+from src.models import CharacterMapping, Rulebook
+from src.rule_matcher import (
+    ANACHRONISM,
+    CHARACTER,
+    FORBIDDEN,
+    TECH,
+    CompiledRulebook,
+    StreamingMatcher,
+    compile_rulebook,
+)
+
+
+def rulebook(forbidden=(), names=(), constraints=()) -> Rulebook:
+    return Rulebook(
+        world_setting={"era": "2045"},
+        character_mappings=[
+            CharacterMapping(original=name, new_world=f"New {name}", role="lead", trait_preserved="grit")
+            for name in names
+        ],
+        plot_translations={},
+        constraints=list(constraints),
+        forbidden_elements=list(forbidden),
+    )
+
+
+def hits(compiled: CompiledRulebook, text: str, category: str = None, **kwargs):
+    return [
+        (m.term, text[m.start:m.end])
+        for m in compiled.find_matches(text, **kwargs)
+        if category is None or m.category == category
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Word boundaries
+# ---------------------------------------------------------------------------
+
+def test_terms_need_whole_words():
+    compiled = CompiledRulebook(rulebook(forbidden=["magic"]))
+    assert hits(compiled, "The magician and his magics.", FORBIDDEN) == []
+    assert hits(compiled, "Not magic, pure-magic!", FORBIDDEN) == [("magic", "magic"), ("magic", "magic")]
+    assert hits(compiled, "blackmagic", FORBIDDEN) == []
+
+
+def test_term_at_the_very_start_and_end():
+    compiled = CompiledRulebook(rulebook(forbidden=["magic"]))
+    assert hits(compiled, "magic", FORBIDDEN) == [("magic", "magic")]
+
+
+def test_tech_terms_only_need_a_start_boundary():
+    compiled = CompiledRulebook(rulebook())
+    assert ("tech", "tech") in hits(compiled, "technology everywhere", TECH)
+    assert hits(compiled, "biotech", TECH) == []
+
+
+def test_anachronisms_are_always_checked():
+    compiled = CompiledRulebook(rulebook())
+    assert hits(compiled, "A blessed day, not a blessedness.", ANACHRONISM) == [("blessed", "blessed")]
+
+
+# ---------------------------------------------------------------------------
+# Nested and overlapping terms
+# ---------------------------------------------------------------------------
+
+def test_nested_terms_are_all_reported():
+    compiled = CompiledRulebook(rulebook(forbidden=["dark magic", "magic", "dark"]))
+    assert sorted(hits(compiled, "She used dark magic.", FORBIDDEN)) == [
+        ("dark", "dark"), ("dark magic", "dark magic"), ("magic", "magic")
+    ]
+
+
+def test_longest_term_failing_its_boundary_falls_back_to_shorter():
+    compiled = CompiledRulebook(rulebook(forbidden=["magic", "magic wand"]))
+    assert hits(compiled, "a magic wands shop", FORBIDDEN) == [("magic", "magic")]
+
+
+def test_same_term_in_two_categories():
+    compiled = CompiledRulebook(rulebook(forbidden=["cursed"]))
+    categories = sorted(m.category for m in compiled.find_matches("the cursed ring"))
+    assert categories == [ANACHRONISM, FORBIDDEN]
+
+
+def test_empty_terms_are_ignored():
+    compiled = CompiledRulebook(rulebook(forbidden=["", "  "]))
+    assert hits(compiled, "anything at all", FORBIDDEN) == []
+
+
+# ---------------------------------------------------------------------------
+# Case handling
+# ---------------------------------------------------------------------------
+
+def test_forbidden_terms_ignore_case():
+    compiled = CompiledRulebook(rulebook(forbidden=["Magic Sword"]))
+    assert hits(compiled, "the MAGIC sword", FORBIDDEN) == [("Magic Sword", "MAGIC sword")]
+
+
+def test_character_names_are_case_sensitive():
+    compiled = CompiledRulebook(rulebook(names=["Rama"]))
+    assert hits(compiled, "Rama met RAMA and rama.", CHARACTER) == [("Rama", "Rama")]
+
+
+def test_exact_names_false_finds_other_casings():
+    compiled = CompiledRulebook(rulebook(names=["Rama"]))
+    found = hits(compiled, "Rama met RAMA and rama.", CHARACTER, exact_names=False)
+    assert found == [("Rama", "Rama"), ("Rama", "RAMA"), ("Rama", "rama")]
+
+
+def test_longer_names_win_over_prefixes():
+    compiled = CompiledRulebook(rulebook(names=["Ram", "Rama"]))
+    assert hits(compiled, "Rama and Ramayana", CHARACTER) == [("Rama", "Rama")]
+
+
+# ---------------------------------------------------------------------------
+# start / stop
+# ---------------------------------------------------------------------------
+
+def test_start_and_stop_limit_where_hits_begin():
+    compiled = CompiledRulebook(rulebook(forbidden=["magic"]))
+    text = "magic one, magic two, magic three"
+    starts = [m.start for m in compiled.find_matches(text, start=1, stop=20)]
+    assert starts == [text.index("magic two")]
+
+
+def test_start_mid_word_still_sees_the_boundary():
+    compiled = CompiledRulebook(rulebook(forbidden=["magic"]))
+    assert compiled.find_matches("blackmagic", start=5) == []
+
+
+# ---------------------------------------------------------------------------
+# compile_rulebook
+# ---------------------------------------------------------------------------
+
+def test_compile_rulebook_reuses_identical_rulebooks():
+    first = compile_rulebook(rulebook(forbidden=["magic"]))
+    assert compile_rulebook(rulebook(forbidden=["magic"])) is first
+    assert compile_rulebook(rulebook(forbidden=["sorcery"])) is not first
+
+
+def test_tech_constraint_count():
+    compiled = CompiledRulebook(rulebook(constraints=["Keep it corporate", "Tech is everywhere", "No swords"]))
+    assert compiled.tech_constraint_count == 2
+
+
+@pytest.mark.parametrize("text", ["", "   ", "no rules broken here"])
+def test_clean_text(text):
+    compiled = CompiledRulebook(rulebook(forbidden=["magic"], names=["Rama"]))
+    assert hits(compiled, text, FORBIDDEN) + hits(compiled, text, CHARACTER) == []
+
+
+# ---------------------------------------------------------------------------
+# StreamingMatcher
+# ---------------------------------------------------------------------------
+
+STREAM_RULEBOOK = rulebook(
+    forbidden=["magic", "dark magic", "dark", "sword", "magic sword", "x"],
+    names=["Ram", "Rama", "Sita", "Ravana"],
+)
+WORDS = ["Rama", "Ram", "Ramayana", "rama", "Sita", "Ravana", "dark", "magic", "magician", "sword",
+         "swords", "technology", "biotech", "blessed", "x", "xx", "the", "and", "a", ",", ".", "-", "\n"]
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return "".join(rng.choice(WORDS) + rng.choice(["", " ", " ", "  "]) for _ in range(words))
+
+
+def random_chunks(rng: random.Random, text: str):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 30)))) if len(text) > 1 else []
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+
+def stream(compiled: CompiledRulebook, chunks):
+    matcher = StreamingMatcher(compiled)
+    found = []
+    for chunk in chunks:
+        found.extend(matcher.feed(chunk))
+    found.extend(matcher.finish())
+    return matcher, found
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_streaming_matches_full_scan_for_any_chunking(seed):
+    rng = random.Random(seed)
+    compiled = CompiledRulebook(STREAM_RULEBOOK)
+    text = random_text(rng, rng.randint(0, 80))
+    chunks = random_chunks(rng, text)
+    matcher, found = stream(compiled, chunks)
+    assert found == compiled.find_matches(text)
+    assert matcher.text == text
+
+
+def test_streaming_one_character_at_a_time():
+    compiled = CompiledRulebook(STREAM_RULEBOOK)
+    text = "Ramayana: Rama drew the magic sword; dark magic, x-xx. Ram"
+    _, found = stream(compiled, list(text))
+    assert found == compiled.find_matches(text)
+
+
+def test_streaming_keeps_only_a_tail_window():
+    compiled = CompiledRulebook(STREAM_RULEBOOK)
+    matcher = StreamingMatcher(compiled)
+    for _ in range(500):
+        matcher.feed("the Ravana and dark magic walk on. ")
+    assert len(matcher._window) <= compiled.max_term_length + 2 + len("the Ravana and dark magic walk on. ")
+    assert len(matcher.text) == 500 * len("the Ravana and dark magic walk on. ")
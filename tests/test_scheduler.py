@@ -0,0 +1,209 @@
+"""
+Tests for src/scheduler.py on a fake clock - nothing here really sleeps.
+
+Run with: pytest
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import src.scheduler as scheduler_module
+from src.scheduler import RateLimitScheduler, TokenBucket, is_retryable, retry_after
+
+
+class FakeClock:
+    """Stands in for the scheduler's time module; sleeping just moves the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+    async def asleep(self, seconds: float):
+        self.sleep(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler_module, "time", fake)
+    monkeypatch.setattr(scheduler_module, "asyncio", SimpleNamespace(sleep=fake.asleep))
+    # Full jitter always picks the top of the range, so delays are exact
+    monkeypatch.setattr(scheduler_module.random, "uniform", lambda low, high: high)
+    return fake
+
+
+class ProviderError(Exception):
+    def __init__(self, status: int, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = SimpleNamespace(status_code=status, headers=headers or {})
+
+
+def flaky(*errors, total_tokens=None):
+    """send() that raises each error in turn, then succeeds"""
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=total_tokens))
+
+    send.calls = calls
+    return send
+
+
+# ---------------------------------------------------------------------------
+# TokenBucket
+# ---------------------------------------------------------------------------
+
+def test_bucket_waits_for_the_shortfall(clock):
+    bucket = TokenBucket(rate_per_minute=60)  # 1 token/s, 60 capacity
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(3) == pytest.approx(3.0)
+    clock.now += 10
+    assert bucket.reserve(5) == 0.0  # 10 refilled, 3 owed
+
+
+def test_bucket_refill_is_capped(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=10)
+    clock.now += 3600
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_oversized_request_still_fits(clock):
+    bucket = TokenBucket(rate_per_minute=60)
+    assert bucket.reserve(10_000) == 0.0  # clamped to capacity
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_adjust_gives_back_and_charges(clock):
+    bucket = TokenBucket(rate_per_minute=60)
+    bucket.reserve(60)
+    bucket.adjust(30)
+    assert bucket.reserve(30) == 0.0
+    bucket.adjust(-6)
+    assert bucket.reserve(0) == pytest.approx(6.0)
+
+
+# ---------------------------------------------------------------------------
+# Budgets
+# ---------------------------------------------------------------------------
+
+def test_requests_per_minute_spaces_requests_out(clock):
+    scheduler = RateLimitScheduler(requests_per_minute=2)
+    for _ in range(4):
+        scheduler.call(flaky())
+    assert clock.sleeps == [30.0, 30.0]
+    assert scheduler.get_stats()["throttled_seconds"] == 60.0
+
+
+def test_real_usage_settles_the_token_budget(clock):
+    scheduler = RateLimitScheduler(tokens_per_minute=600)  # 10 tokens/s
+    scheduler.call(flaky(total_tokens=100), estimated_tokens=600)
+    # 500 of the 600 reserved came back, so 500 more go out without waiting
+    scheduler.call(flaky(total_tokens=500), estimated_tokens=500)
+    assert clock.sleeps == []
+
+
+def test_failed_attempts_refund_their_token_reservation(clock):
+    scheduler = RateLimitScheduler(tokens_per_minute=600, base_delay=1.0)
+    send = flaky(ProviderError(500), ProviderError(503), total_tokens=600)
+    scheduler.call(send, estimated_tokens=600)
+    assert len(send.calls) == 3
+    # Only the backoff delays - the retries didn't wait for tokens the failures never used
+    assert clock.sleeps == [1.0, 2.0]
+    assert scheduler.get_stats()["throttled_seconds"] == 0.0
+
+
+# ---------------------------------------------------------------------------
+# Retries
+# ---------------------------------------------------------------------------
+
+def test_backoff_doubles_up_to_max_delay(clock):
+    scheduler = RateLimitScheduler(max_retries=5, base_delay=1.0, max_delay=5.0)
+    send = flaky(*[ProviderError(502)] * 5)
+    scheduler.call(send)
+    assert clock.sleeps == [1.0, 2.0, 4.0, 5.0, 5.0]
+    stats = scheduler.get_stats()
+    assert (stats["retries"], stats["server_errors"], stats["backoff_seconds"]) == (5, 5, 17.0)
+
+
+def test_gives_up_after_max_retries(clock):
+    scheduler = RateLimitScheduler(max_retries=2)
+    send = flaky(*[ProviderError(500)] * 3)
+    with pytest.raises(ProviderError):
+        scheduler.call(send)
+    assert len(send.calls) == 3
+
+
+def test_client_errors_are_not_retried(clock):
+    scheduler = RateLimitScheduler()
+    send = flaky(ProviderError(400))
+    with pytest.raises(ProviderError):
+        scheduler.call(send)
+    assert len(send.calls) == 1 and clock.sleeps == []
+
+
+def test_retry_after_pauses_every_caller(clock):
+    scheduler = RateLimitScheduler()
+    scheduler.call(flaky(ProviderError(429, {"retry-after": "7"})))
+    assert clock.sleeps == [7.0]
+    assert scheduler.get_stats()["rate_limited"] == 1
+
+    # One caller's 429 makes a caller arriving 1s later wait out the other 3s
+    clock.sleeps.clear()
+    scheduler._backoff(ProviderError(429, {"retry-after-ms": "4000"}), attempt=0)
+    clock.now += 1
+    scheduler.call(flaky())
+    assert clock.sleeps == [3.0]
+
+
+def test_async_call_uses_the_same_budget_and_backoff(clock):
+    scheduler = RateLimitScheduler(tokens_per_minute=1200)
+    errors = [ProviderError(429, {"retry-after": "2"})]
+
+    async def send():
+        if errors:
+            raise errors.pop()
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=10))
+
+    asyncio.run(scheduler.acall(send, estimated_tokens=600))
+    # Just the Retry-After - the 429 didn't use up the token budget for the retry
+    assert clock.sleeps == [2.0]
+
+
+# ---------------------------------------------------------------------------
+# Error classification
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("status, retryable", [(429, True), (500, True), (503, True), (408, True),
+                                               (400, False), (401, False), (404, False)])
+def test_is_retryable_by_status(status, retryable):
+    assert is_retryable(ProviderError(status)) is retryable
+
+
+def test_connection_errors_are_retryable():
+    APIConnectionError = type("APIConnectionError", (Exception,), {})
+    assert is_retryable(APIConnectionError())
+    assert not is_retryable(ValueError())
+
+
+def test_retry_after_formats(clock):
+    assert retry_after(ProviderError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(ProviderError(429, {"retry-after": "3"})) == 3.0
+    assert retry_after(ProviderError(429, {"retry-after": "soon"})) is None
+    assert retry_after(ProviderError(429)) is None
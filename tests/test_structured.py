@@ -0,0 +1,162 @@
+"""
+Tests for src/structured.py - local JSON repair and field follow-ups.
+
+Run with: pytest
+"""
+
+import json
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from src.structured import StructuredOutputError, parse_with_repair, repair_json
+
+
+class Item(BaseModel):
+    name: str
+    kind: str
+
+
+class Doc(BaseModel):
+    title: str
+    items: List[Item]
+    tags: List[str]
+    summary: str
+
+
+DOC = {
+    "title": "A Tale",
+    "items": [{"name": "one", "kind": "a"}, {"name": "two", "kind": "b"}, {"name": "three", "kind": "c"}],
+    "tags": ["x", "y", "z"],
+    "summary": "Things happen, then more things happen.",
+}
+FULL = json.dumps(DOC)
+
+
+def cut_after(marker: str, extra: int = 0) -> str:
+    """FULL cut off `extra` characters past the end of marker"""
+    return FULL[:FULL.index(marker) + len(marker) + extra]
+
+
+# ---------------------------------------------------------------------------
+# repair_json
+# ---------------------------------------------------------------------------
+
+def test_valid_json_is_unchanged():
+    assert json.loads(repair_json(FULL)) == DOC
+
+
+def test_strips_code_fence_and_chatter():
+    text = f"Sure! Here's the JSON:\n```json\n{FULL}\n```\nLet me know if you need more."
+    assert json.loads(repair_json(text)) == DOC
+
+
+def test_drops_text_after_the_object():
+    assert json.loads(repair_json(FULL + "\n\nHope this helps {really}")) == DOC
+
+
+def test_removes_trailing_commas():
+    assert json.loads(repair_json('{"a": [1, 2, ], "b": {"c": 1,},}')) == {"a": [1, 2], "b": {"c": 1}}
+
+
+def test_closes_truncated_string_and_brackets():
+    assert json.loads(repair_json('{"a": [1, 2], "b": "half a sen')) == {"a": [1, 2], "b": "half a sen"}
+
+
+def test_cuts_back_dangling_literal():
+    assert json.loads(repair_json('{"a": [1, 2, 3], "b": tr')) == {"a": [1, 2, 3]}
+
+
+def test_dangling_key_gets_null():
+    assert json.loads(repair_json('{"a": 1, "b":')) == {"a": 1, "b": None}
+
+
+def test_truncated_list_keeps_complete_items():
+    repaired = json.loads(repair_json(cut_after('"name": "three", "ki')))
+    assert [item["name"] for item in repaired["items"]][:2] == ["one", "two"]
+
+
+def test_escaped_quotes_and_brackets_inside_strings():
+    text = '{"a": "say \\"hi\\" [not a list] {nor this}", "b": [1'
+    assert json.loads(repair_json(text)) == {"a": 'say "hi" [not a list] {nor this}', "b": [1]}
+
+
+def test_no_json_at_all():
+    assert repair_json("  I can't help with that.  ") == "I can't help with that."
+
+
+# ---------------------------------------------------------------------------
+# parse_with_repair
+# ---------------------------------------------------------------------------
+
+def test_valid_response_needs_no_follow_up():
+    def request(prompt):
+        raise AssertionError("should not ask again")
+    assert parse_with_repair(FULL, Doc, "PROMPT", request) == Doc(**DOC)
+
+
+def test_truncated_list_is_re_requested_with_original_prompt():
+    # Cut inside the third item: what's left would validate with 2 items
+    text = cut_after('{"name": "three"')
+    prompts = []
+
+    def request(prompt):
+        prompts.append(prompt)
+        return json.dumps({k: DOC[k] for k in ("items", "tags", "summary")})
+
+    doc = parse_with_repair(text, Doc, "ORIGINAL PROMPT with the source", request)
+    assert doc == Doc(**DOC)
+    assert len(prompts) == 1
+    assert prompts[0].startswith("ORIGINAL PROMPT with the source")
+    assert '"title": "A Tale"' in prompts[0]  # kept fields are shown
+    assert "cut off" in prompts[0]
+
+
+def test_cut_off_field_counts_as_invalid_even_when_it_validates():
+    text = cut_after('"tags": ["x", "y"')  # tags would validate as ["x", "y"]
+    asked = []
+
+    def request(prompt):
+        asked.append(prompt)
+        return json.dumps({"tags": DOC["tags"], "summary": DOC["summary"]})
+
+    doc = parse_with_repair(text, Doc, "PROMPT", request)
+    assert doc.tags == ["x", "y", "z"]
+    assert asked
+
+
+def test_cut_off_response_is_kept_without_follow_ups():
+    text = cut_after('"summary": "Things happen')
+    doc = parse_with_repair(text, Doc, "PROMPT")
+    assert doc.summary == "Things happen"
+
+
+def test_cut_off_response_is_kept_when_follow_up_fails():
+    text = cut_after('"summary": "Things happen')
+    doc = parse_with_repair(text, Doc, "PROMPT", lambda prompt: "not json", attempts=2)
+    assert doc.summary == "Things happen"
+
+
+def test_missing_field_is_merged_in():
+    partial = {k: v for k, v in DOC.items() if k != "tags"}
+    doc = parse_with_repair(json.dumps(partial), Doc, "PROMPT", lambda prompt: '{"tags": ["x", "y", "z"]}')
+    assert doc == Doc(**DOC)
+
+
+def test_nothing_parsed_asks_for_every_field_with_the_prompt():
+    prompts = []
+
+    def request(prompt):
+        prompts.append(prompt)
+        return FULL
+
+    assert parse_with_repair("Sorry, something went wrong.", Doc, "ORIGINAL PROMPT", request) == Doc(**DOC)
+    assert prompts[0].startswith("ORIGINAL PROMPT")
+
+
+def test_raises_when_still_invalid():
+    partial = {k: v for k, v in DOC.items() if k != "tags"}
+    with pytest.raises(StructuredOutputError) as error:
+        parse_with_repair(json.dumps(partial), Doc, "PROMPT", lambda prompt: '{"tags": "not a list"}')
+    assert "tags" in str(error.value)